@@ -2,28 +2,102 @@ from __future__ import annotations
 
 from django.contrib import admin
 
-from .models import Appointment, ContactMessage, GalleryImage, Review, Service
+from .models import (
+    ApiToken,
+    Appointment,
+    AppointmentReminder,
+    Branch,
+    CalendarToken,
+    ChangeLogEntry,
+    ContactMessage,
+    GalleryImage,
+    MediaBlob,
+    OpeningHours,
+    ReconciliationItem,
+    ReconciliationRun,
+    Resource,
+    ResourceSchedule,
+    Review,
+    ScheduleException,
+    Service,
+    ServicePromotion,
+)
+
+
+@admin.register(Branch)
+class BranchAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "address", "phone", "is_default", "is_active", "display_order")
+    list_editable = ("is_active", "display_order")
+    list_filter = ("is_active",)
+    search_fields = ("name", "address")
+    prepopulated_fields = {"slug": ("name",)}
+
+
+class ServicePromotionInline(admin.TabularInline):
+    model = ServicePromotion
+    extra = 0
 
 
 @admin.register(Service)
 class ServiceAdmin(admin.ModelAdmin):
-    list_display = ("name", "price", "duration_minutes", "is_active")
-    list_editable = ("price", "duration_minutes", "is_active")
-    list_filter = ("is_active",)
+    list_display = ("name", "branch", "price", "deposit_percentage", "deposit_fixed_amount", "duration_minutes", "is_active")
+    list_editable = ("price", "deposit_percentage", "deposit_fixed_amount", "duration_minutes", "is_active")
+    inlines = [ServicePromotionInline]
+    list_filter = ("branch", "is_active")
     search_fields = ("name", "description")
     ordering = ("display_order", "name")
 
 
+@admin.register(OpeningHours)
+class OpeningHoursAdmin(admin.ModelAdmin):
+    list_display = ("weekday", "branch", "opens_at", "closes_at", "slot_minutes")
+    list_filter = ("branch", "weekday")
+
+
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    list_display = ("date", "branch", "is_closed", "opens_at", "closes_at", "note")
+    list_filter = ("branch", "is_closed")
+    search_fields = ("note",)
+    date_hierarchy = "date"
+
+
+class ResourceScheduleInline(admin.TabularInline):
+    model = ResourceSchedule
+    extra = 0
+
+
+@admin.register(Resource)
+class ResourceAdmin(admin.ModelAdmin):
+    list_display = ("name", "branch", "kind", "display_order", "is_active")
+    list_editable = ("display_order", "is_active")
+    list_filter = ("branch", "kind", "is_active")
+    search_fields = ("name",)
+    filter_horizontal = ("services",)
+    inlines = [ResourceScheduleInline]
+
+
 @admin.register(GalleryImage)
 class GalleryImageAdmin(admin.ModelAdmin):
-    list_display = ("title", "is_featured", "created_at")
-    list_filter = ("is_featured",)
+    list_display = ("title", "branch", "is_featured", "created_at")
+    list_filter = ("branch", "is_featured")
     search_fields = ("title", "description")
 
 
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "references", "updated_at")
+    list_filter = ("references",)
+    search_fields = ("name", "digest")
+    readonly_fields = ("name", "digest", "size", "references", "created_at", "updated_at")
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
-    list_display = ("user", "rating", "created_at", "is_visible")
+    list_display = ("user", "rating", "created_at", "repeat_count", "is_visible")
     list_filter = ("rating", "is_visible")
     search_fields = ("user__username", "comment")
     autocomplete_fields = ("user",)
@@ -31,8 +105,8 @@ class ReviewAdmin(admin.ModelAdmin):
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
-    list_display = ("name", "email", "phone", "created_at", "is_resolved")
-    list_filter = ("is_resolved", "created_at")
+    list_display = ("name", "email", "phone", "branch", "created_at", "repeat_count", "is_resolved")
+    list_filter = ("branch", "is_resolved", "created_at")
     search_fields = ("name", "email", "message")
 
 
@@ -41,27 +115,31 @@ class AppointmentAdmin(admin.ModelAdmin):
     list_display = (
         "service",
         "user",
+        "branch",
         "appointment_date",
         "appointment_time",
+        "resource",
         "status",
         "deposit_status",
         "deposit_amount",
         "created_at",
     )
-    list_filter = ("status", "deposit_status", "appointment_date", "service", "payment_method")
+    list_filter = ("branch", "status", "deposit_status", "appointment_date", "service", "resource", "payment_method")
     search_fields = ("user__username", "service__name", "payment_reference")
     autocomplete_fields = ("service", "user")
     ordering = ("-appointment_date", "appointment_time")
-    readonly_fields = ("created_at", "deposit_amount", "deposit_verified_by", "deposit_verified_at")
+    readonly_fields = ("created_at", "service_price", "deposit_amount", "deposit_verified_by", "deposit_verified_at")
     fieldsets = (
         (
             "Detalle del turno",
             {
                 "fields": (
+                    "branch",
                     "user",
                     "service",
                     "appointment_date",
                     "appointment_time",
+                    "resource",
                     "status",
                     "notes",
                     "created_at",
@@ -72,13 +150,85 @@ class AppointmentAdmin(admin.ModelAdmin):
             "Seña",
             {
                 "fields": (
+                    "service_price",
                     "deposit_amount",
                     "deposit_status",
                     "payment_method",
                     "payment_reference",
                     "deposit_verified_by",
                     "deposit_verified_at",
+                    "payment_deadline",
                 )
             },
         ),
     )
+
+
+@admin.register(AppointmentReminder)
+class AppointmentReminderAdmin(admin.ModelAdmin):
+    list_display = ("appointment", "kind", "channel", "status", "attempts", "sent_at")
+    list_filter = ("kind", "status", "channel")
+    search_fields = ("appointment__user__username", "appointment__user__email")
+    autocomplete_fields = ("appointment",)
+    readonly_fields = ("created_at", "claimed_at", "attempts", "sent_at")
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ("user", "name", "created_at", "is_active")
+    list_filter = ("is_active",)
+    search_fields = ("user__username", "name")
+    autocomplete_fields = ("user",)
+    readonly_fields = ("key", "created_at")
+
+
+@admin.register(ChangeLogEntry)
+class ChangeLogEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "model", "object_id", "action", "changed_at")
+    list_filter = ("model", "action")
+    readonly_fields = ("model", "object_id", "action", "changed_at")
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(CalendarToken)
+class CalendarTokenAdmin(admin.ModelAdmin):
+    list_display = ("user", "created_at")
+    search_fields = ("user__username",)
+    readonly_fields = ("key", "created_at")
+
+
+class ReconciliationItemInline(admin.TabularInline):
+    model = ReconciliationItem
+    extra = 0
+    fields = ("line_number", "reference", "amount", "reason", "is_resolved")
+    readonly_fields = ("line_number", "reference", "amount", "reason")
+    can_delete = False
+
+
+@admin.register(ReconciliationRun)
+class ReconciliationRunAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "source", "filename", "total_lines", "matched", "ambiguous", "unmatched", "duration_ms")
+    list_filter = ("source",)
+    readonly_fields = (
+        "source",
+        "filename",
+        "created_by",
+        "created_at",
+        "total_lines",
+        "matched",
+        "ambiguous",
+        "unmatched",
+        "duration_ms",
+    )
+    inlines = [ReconciliationItemInline]
+
+
+@admin.register(ReconciliationItem)
+class ReconciliationItemAdmin(admin.ModelAdmin):
+    list_display = ("run", "line_number", "reference", "amount", "reason", "is_resolved")
+    list_editable = ("is_resolved",)
+    list_filter = ("reason", "is_resolved")
+    search_fields = ("reference",)
+    filter_horizontal = ("candidates",)
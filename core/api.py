@@ -0,0 +1,373 @@
+"""Versioned JSON API used by the mobile app and the WhatsApp bot.
+
+Read endpoints answer conditional requests from change markers (see
+``core.markers``) before touching the database, so polling clients get
+``304 Not Modified`` without any query.
+
+Catalog and availability belong to one branch, picked with ``?sucursal=<slug>``
+(the default branch when omitted); their validators use that branch's markers,
+so activity in another branch never invalidates a client's cached copy.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+from django.http import HttpRequest, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition, require_http_methods
+
+from . import branches, changes, markers
+from .availability import Availability, SlotUnavailable, reserve
+from .forms import AppointmentForm
+from .models import ApiToken, Appointment, ChangeLogEntry
+from .pricing import Quote, get_catalog
+
+API_VERSION = "v1"
+MAX_AVAILABILITY_DAYS = 31
+
+
+def error(message: str, status: int, **extra) -> JsonResponse:
+    return JsonResponse({"error": message, **extra}, status=status)
+
+
+def token_user(request: HttpRequest):
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    scheme, _, key = header.partition(" ")
+    if scheme.lower() != "token" or not key:
+        return None
+    token = ApiToken.objects.select_related("user").filter(key=key.strip(), is_active=True).first()
+    if token is None or not token.user.is_active:
+        return None
+    return token.user
+
+
+def token_required(view_func):
+    """Authenticate with an ``ApiToken`` and expose the user as ``request.api_user``."""
+
+    @wraps(view_func)
+    def _wrapped(request: HttpRequest, *args, **kwargs):
+        user = token_user(request)
+        if user is None:
+            response = error("Se requiere un token válido.", 401)
+            response["WWW-Authenticate"] = "Token"
+            return response
+        request.api_user = user
+        return view_func(request, *args, **kwargs)
+
+    return _wrapped
+
+
+def _etag(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def _last_modified(*names: str) -> datetime:
+    return markers.as_datetime(max(markers.get_many(*names).values()))
+
+
+def _last_modified_today(*names: str) -> datetime:
+    """For responses that also depend on the date: never older than local midnight."""
+
+    midnight = timezone.make_aware(datetime.combine(date.today(), datetime.min.time()))
+    return max(_last_modified(*names), midnight)
+
+
+def _parse_date(value: str | None, default: date) -> date:
+    if not value:
+        return default
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _branch(request: HttpRequest):
+    return branches.get(request.GET.get("sucursal"))
+
+
+def _branch_markers(request: HttpRequest, *names: str) -> tuple[str, ...] | None:
+    branch = _branch(request)
+    return None if branch is None else tuple(markers.scoped(name, branch.pk) for name in names)
+
+
+def _availability_range(request: HttpRequest) -> tuple[date, date]:
+    today = date.today()
+    start = max(_parse_date(request.GET.get("start"), today), today)
+    end = _parse_date(request.GET.get("end"), start + timedelta(days=6))
+    return start, min(end, start + timedelta(days=MAX_AVAILABILITY_DAYS - 1))
+
+
+def serialize_quote(quote: Quote) -> dict:
+    return {
+        "id": quote.service_id,
+        "name": quote.name,
+        "description": quote.description,
+        "duration_minutes": quote.duration_minutes,
+        "list_price": format(quote.list_price, ".2f"),
+        "price": format(quote.price, ".2f"),
+        "deposit": format(quote.deposit, ".2f"),
+        "promotion": quote.promotion,
+    }
+
+
+def serialize_appointment(appointment: Appointment) -> dict:
+    return {
+        "id": appointment.pk,
+        "branch": branches.by_pk(appointment.branch_id).slug,
+        "service": {"id": appointment.service_id, "name": appointment.service.name},
+        "date": appointment.appointment_date.isoformat(),
+        "time": appointment.appointment_time,
+        "resource": appointment.resource.name if appointment.resource else None,
+        "status": appointment.status,
+        "price": format(appointment.service_price, ".2f"),
+        "deposit_amount": format(appointment.deposit_amount, ".2f"),
+        "deposit_status": appointment.deposit_status,
+        "payment_method": appointment.payment_method,
+    }
+
+
+def serialize_service(service) -> dict:
+    return {
+        "id": service.pk,
+        "branch": branches.by_pk(service.branch_id).slug,
+        "name": service.name,
+        "description": service.description,
+        "price": format(service.price, ".2f"),
+        "duration_minutes": service.duration_minutes,
+        "is_active": service.is_active,
+    }
+
+
+def serialize_review(review) -> dict:
+    return {
+        "id": review.pk,
+        "user": review.user_id,
+        "rating": review.rating,
+        "comment": review.comment,
+        "is_visible": review.is_visible,
+        "created_at": review.created_at.isoformat(),
+    }
+
+
+def serialize_contact_message(message) -> dict:
+    return {
+        "id": message.pk,
+        "name": message.name,
+        "email": message.email,
+        "phone": message.phone,
+        "message": message.message,
+        "is_resolved": message.is_resolved,
+        "repeat_count": message.repeat_count,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+def serialize_user(user) -> dict:
+    return {
+        "id": user.pk,
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+        "is_active": user.is_active,
+        "is_staff": user.is_staff,
+        "date_joined": user.date_joined.isoformat(),
+    }
+
+
+CHANGE_SERIALIZERS = {
+    "appointment": (lambda queryset: queryset.select_related("service", "resource"), serialize_appointment),
+    "review": (lambda queryset: queryset, serialize_review),
+    "contact_message": (lambda queryset: queryset, serialize_contact_message),
+    "service": (lambda queryset: queryset, serialize_service),
+    "user": (lambda queryset: queryset, serialize_user),
+}
+
+
+def _services_etag(request: HttpRequest) -> str | None:
+    names = _branch_markers(request, "catalog")
+    # Promotion windows open and close at midnight, so the date is part of the validator.
+    return None if names is None else _etag(API_VERSION, "services", names, markers.get(names[0]), date.today())
+
+
+def _services_last_modified(request: HttpRequest) -> datetime | None:
+    names = _branch_markers(request, "catalog")
+    return None if names is None else _last_modified_today(*names)
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_services_etag, last_modified_func=_services_last_modified)
+def services(request: HttpRequest) -> JsonResponse:
+    branch = _branch(request)
+    if branch is None:
+        return error("Sucursal inexistente.", 404)
+    quotes = get_catalog(branch.pk).quotes(date.today())
+    return JsonResponse({"services": [serialize_quote(quote) for quote in quotes.values()]})
+
+
+_AVAILABILITY_MARKERS = ("bookings", "schedule", "resources", "catalog")
+
+
+def _availability_etag(request: HttpRequest) -> str | None:
+    names = _branch_markers(request, *_AVAILABILITY_MARKERS)
+    try:
+        start, end = _availability_range(request)
+    except ValueError:
+        return None
+    if names is None:
+        return None  # the view answers 404
+    stamps = markers.get_many(*names)
+    return _etag(API_VERSION, "availability", start, end, request.GET.get("service"), sorted(stamps.items()))
+
+
+def _availability_last_modified(request: HttpRequest) -> datetime | None:
+    names = _branch_markers(request, *_AVAILABILITY_MARKERS)
+    return None if names is None else _last_modified(*names)
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_availability_etag, last_modified_func=_availability_last_modified)
+def availability(request: HttpRequest) -> JsonResponse:
+    branch = _branch(request)
+    if branch is None:
+        return error("Sucursal inexistente.", 404)
+    try:
+        start, end = _availability_range(request)
+        service_id = int(request.GET["service"]) if request.GET.get("service") else None
+    except ValueError:
+        return error("Parámetros inválidos: usá fechas AAAA-MM-DD y un id de servicio numérico.", 400)
+    table = Availability(start, end, branch_id=branch.pk)
+    return JsonResponse(
+        {
+            "branch": branch.slug,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "service": service_id,
+            "days": {day.isoformat(): table.available_slots(day, service_id) for day in table.days()},
+        }
+    )
+
+
+def _user_appointments_etag(request: HttpRequest) -> str | None:
+    if request.method not in ("GET", "HEAD") or getattr(request, "api_user", None) is None:
+        return None
+    # Past bookings drop off the list at midnight.
+    return _etag(
+        API_VERSION, "appointments", request.api_user.pk, markers.get(f"bookings:user:{request.api_user.pk}"), date.today()
+    )
+
+
+def _user_appointments_last_modified(request: HttpRequest) -> datetime | None:
+    if request.method not in ("GET", "HEAD") or getattr(request, "api_user", None) is None:
+        return None
+    return _last_modified_today(f"bookings:user:{request.api_user.pk}")
+
+
+@csrf_exempt
+@require_http_methods(["GET", "HEAD", "POST"])
+@token_required
+@condition(etag_func=_user_appointments_etag, last_modified_func=_user_appointments_last_modified)
+def appointments(request: HttpRequest) -> JsonResponse:
+    if request.method == "POST":
+        return _create_appointment(request)
+    queryset = (
+        request.api_user.appointments.filter(appointment_date__gte=date.today())
+        .select_related("service", "resource")
+        .order_by("appointment_date", "appointment_time")
+    )
+    return JsonResponse({"appointments": [serialize_appointment(appointment) for appointment in queryset]})
+
+
+def _create_appointment(request: HttpRequest) -> JsonResponse:
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return error("El cuerpo de la solicitud debe ser JSON.", 400)
+    if not isinstance(payload, dict):
+        return error("El cuerpo de la solicitud debe ser un objeto JSON.", 400)
+    branch = branches.get(payload.get("sucursal"))
+    if branch is None:
+        return error("Sucursal inexistente.", 404)
+    try:
+        day = _parse_date(payload.get("appointment_date"), date.today())
+    except (TypeError, ValueError):
+        day = date.today()
+    table = Availability(day, branch_id=branch.pk)
+    # Validate against the whole day so taken slots surface as 409 rather than 400.
+    form = AppointmentForm(payload, time_choices=table.schedule.slots_for(day), branch=branch)
+    if not form.is_valid():
+        return error("Datos inválidos.", 400, fields=form.errors.get_json_data())
+    appointment = form.save(commit=False)
+    appointment.user = request.api_user
+    try:
+        reserve(appointment, table)
+    except SlotUnavailable as exc:
+        return error(str(exc), 409)
+    return JsonResponse({"appointment": serialize_appointment(appointment)}, status=201)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@token_required
+def cancel_appointment(request: HttpRequest, appointment_id: int) -> JsonResponse:
+    appointment = get_object_or_404(
+        Appointment.objects.select_related("service", "resource"),
+        pk=appointment_id,
+        user=request.api_user,
+    )
+    if appointment.appointment_date < date.today():
+        return error("No se pueden cancelar turnos pasados.", 409)
+    if appointment.status != Appointment.STATUS_CANCELLED:
+        appointment.status = Appointment.STATUS_CANCELLED
+        if appointment.deposit_status == Appointment.DepositStatus.PENDING:
+            # Nothing left to verify: keep it out of the pending queues and reconciliation.
+            appointment.deposit_status = Appointment.DepositStatus.CANCELLED
+        appointment.save(update_fields=["status", "deposit_status"])
+    return JsonResponse({"appointment": serialize_appointment(appointment)})
+
+
+@require_http_methods(["GET", "HEAD"])
+@token_required
+def change_feed(request: HttpRequest) -> JsonResponse:
+    """Changes after ``cursor``, oldest first, with the current state of each object."""
+    if not request.api_user.is_staff:
+        return error("Solo el staff puede leer el registro de cambios.", 403)
+    try:
+        after = changes.decode_cursor(request.GET.get("cursor"))
+        limit = int(request.GET.get("limit", 100))
+    except ValueError:
+        return error("Cursor o límite inválido.", 400)
+    if not 1 <= limit <= changes.MAX_PAGE_SIZE:
+        return error(f"El límite tiene que estar entre 1 y {changes.MAX_PAGE_SIZE}.", 400)
+    models = [name for name in request.GET.get("models", "").split(",") if name]
+    unknown = set(models) - set(CHANGE_SERIALIZERS)
+    if unknown:
+        return error("Modelos desconocidos.", 400, models=sorted(unknown))
+
+    entries, last_id, has_more = changes.read_page(after, limit, models)
+    wanted = defaultdict(list)
+    for entry in entries:
+        if entry.action == ChangeLogEntry.Action.UPSERT:
+            wanted[entry.model].append(entry.object_id)
+    current = {}
+    tracked = changes.tracked_models()
+    for name, ids in wanted.items():
+        prepare, serialize = CHANGE_SERIALIZERS[name]
+        for obj in prepare(tracked[name]._default_manager.filter(pk__in=ids)):
+            current[(name, obj.pk)] = serialize(obj)
+
+    results = []
+    for entry in entries:
+        data = current.get((entry.model, entry.object_id))
+        results.append({
+            "model": entry.model,
+            "id": entry.object_id,
+            # Rows deleted after this entry was written are reported as deletions right away.
+            "action": ChangeLogEntry.Action.UPSERT if data is not None else ChangeLogEntry.Action.DELETE,
+            "changed_at": entry.changed_at.isoformat(),
+            "data": data,
+        })
+    return JsonResponse({"changes": results, "cursor": changes.encode_cursor(last_id), "has_more": has_more})
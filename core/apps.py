@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
     verbose_name = "Mariana Nails"
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+
+from django.db import IntegrityError, transaction
+
+from . import branches, metrics
+from .models import Appointment, Resource, Service, TimeSlot
+from .pricing import branch_of, get_catalog
+from .schedule import get_schedule
+
+
+@dataclass(frozen=True)
+class ResourcePlan:
+    """Read-only snapshot of a resource used while computing availability."""
+
+    pk: int
+    order: int
+    service_ids: frozenset[int] | None
+    hours: dict[int, tuple[tuple[time, time], ...]] | None
+
+    def qualified(self, service_id: int | None) -> bool:
+        return service_id is None or self.service_ids is None or service_id in self.service_ids
+
+    def works(self, day: date, slot_time: time) -> bool:
+        if self.hours is None:
+            return True
+        return any(start <= slot_time < end for start, end in self.hours.get(day.weekday(), ()))
+
+
+def _minutes(slot: str) -> int:
+    hours, minutes = slot.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def load_resources(branch_id: int | None = None) -> list[ResourcePlan]:
+    """Fetch every active resource of a branch with its services and schedule in three queries."""
+
+    branch_id = branch_id or branches.default().pk
+    plans = []
+    for resource in Resource.objects.filter(branch_id=branch_id, is_active=True).prefetch_related("services", "schedules"):
+        service_ids = frozenset(service.pk for service in resource.services.all()) or None
+        hours = defaultdict(list)
+        for block in resource.schedules.all():
+            hours[block.weekday].append((block.start_time, block.end_time))
+        plans.append(
+            ResourcePlan(
+                pk=resource.pk,
+                order=resource.display_order,
+                service_ids=service_ids,
+                hours={weekday: tuple(blocks) for weekday, blocks in hours.items()} if hours else None,
+            )
+        )
+    # Specialists first so generalists stay free for the services only they can do.
+    plans.sort(key=lambda plan: (len(plan.service_ids) if plan.service_ids else float("inf"), plan.order, plan.pk))
+    return plans
+
+
+class Availability:
+    """Slot availability of one branch for a date range, built from one appointment query.
+
+    With no active resources the branch behaves as a single chair: a slot is free
+    while nobody booked it. Otherwise a slot is free for a service while at least
+    one qualified resource working at that time has no booking in it. A booking
+    takes every slot its service's duration overlaps, and a service only fits
+    where a resource stays free for all the slots it would take.
+    """
+
+    def __init__(
+        self,
+        start: date,
+        end: date | None = None,
+        resources: list[ResourcePlan] | None = None,
+        branch_id: int | None = None,
+    ):
+        self.start = start
+        self.end = end or start
+        self.branch_id = branch_id or branches.default().pk
+        self.resources = load_resources(self.branch_id) if resources is None else resources
+        self.schedule = get_schedule(self.branch_id)
+        self._busy: dict[date, dict[str, set[int]]] = defaultdict(lambda: defaultdict(set))
+        self._unassigned: dict[date, Counter] = defaultdict(Counter)
+        self._load: dict[date, Counter] = defaultdict(Counter)
+        self._days: dict[date, dict[str, list[ResourcePlan]]] = {}
+        self._durations: dict[int, int] = {}
+        bookings = Appointment.objects.filter(
+            branch_id=self.branch_id,
+            appointment_date__gte=self.start,
+            appointment_date__lte=self.end,
+        ).exclude(status=Appointment.STATUS_CANCELLED).values_list(
+            "appointment_date", "appointment_time", "resource_id", "service__duration_minutes"
+        )
+        for day, slot, resource_id, minutes in bookings:
+            for covered in self.run(day, slot, minutes):
+                if resource_id is None:
+                    self._unassigned[day][covered] += 1
+                else:
+                    self._busy[day][covered].add(resource_id)
+            if resource_id is not None:
+                self._load[day][resource_id] += 1
+
+    @property
+    def uses_resources(self) -> bool:
+        return bool(self.resources)
+
+    def days(self):
+        current = self.start
+        while current <= self.end:
+            yield current
+            current += timedelta(days=1)
+
+    def run(self, day: date, slot: str, minutes: int) -> list[str]:
+        """``slot`` and every later slot of ``day`` that starts before ``minutes`` have passed."""
+
+        start = _minutes(slot)
+        later = [other for other in self.schedule.slots_for(day) if start < _minutes(other) < start + minutes]
+        return [slot, *later]
+
+    def duration(self, service_id: int) -> int:
+        """Minutes of a service, from the cached catalog (or one query for inactive services)."""
+
+        if service_id not in self._durations:
+            quote = get_catalog(self.branch_id).quote(service_id, self.start)
+            if quote is not None:
+                self._durations[service_id] = quote.duration_minutes
+            else:
+                self._durations[service_id] = (
+                    Service.objects.filter(pk=service_id).values_list("duration_minutes", flat=True).first() or 0
+                )
+        return self._durations[service_id]
+
+    def _free_by_slot(self, day: date) -> dict[str, list[ResourcePlan]]:
+        """Free resources per slot for ``day``, computed once per day."""
+
+        if day not in self._days:
+            busy = self._busy[day]
+            unassigned = self._unassigned[day]
+            table = {}
+            for slot in self.schedule.slots_for(day):
+                slot_time = TimeSlot.to_time(slot)
+                free = [
+                    plan for plan in self.resources
+                    if plan.pk not in busy[slot] and plan.works(day, slot_time)
+                ]
+                # Legacy bookings without a resource still take one unit of capacity.
+                table[slot] = free[: max(len(free) - unassigned[slot], 0)]
+            self._days[day] = table
+        return self._days[day]
+
+    def free_resources(self, day: date, slot: str, service_id: int | None = None) -> list[ResourcePlan]:
+        """Qualified resources free at ``slot`` and, for a service, through the rest of its run."""
+
+        table = self._free_by_slot(day)
+        free = [plan for plan in table.get(slot, []) if plan.qualified(service_id)]
+        if service_id is not None:
+            for later in self.run(day, slot, self.duration(service_id))[1:]:
+                free = [plan for plan in free if plan in table[later]]
+        return free
+
+    def is_free(self, day: date, slot: str, service_id: int | None = None) -> bool:
+        if not self.uses_resources:
+            if slot not in self.schedule.slots_for(day):
+                return False
+            slots = [slot] if service_id is None else self.run(day, slot, self.duration(service_id))
+            return not any(self._unassigned[day][covered] for covered in slots)
+        return bool(self.free_resources(day, slot, service_id))
+
+    def available_slots(self, day: date, service_id: int | None = None) -> list[str]:
+        return [slot for slot in self.schedule.slots_for(day) if self.is_free(day, slot, service_id)]
+
+    def taken_slots(self, day: date, service_id: int | None = None) -> list[str]:
+        return [slot for slot in self.schedule.slots_for(day) if not self.is_free(day, slot, service_id)]
+
+    def occupancy(self, day: date) -> tuple[int, int]:
+        """Return ``(booked, capacity)`` in resource-slots for ``day``."""
+
+        booked = capacity = 0
+        for slot in self.schedule.slots_for(day):
+            slot_time = TimeSlot.to_time(slot)
+            if self.uses_resources:
+                capacity += sum(1 for plan in self.resources if plan.works(day, slot_time))
+            else:
+                capacity += 1
+            booked += len(self._busy[day][slot]) + self._unassigned[day][slot]
+        return min(booked, capacity), capacity
+
+    def assign(self, day: date, slot: str, service_id: int) -> int | None:
+        """Pick the resource for a booking; ``None`` when the salon has no resources.
+
+        Callers must check :meth:`is_free` first. Among free qualified resources the
+        least loaded one that day wins, keeping specialists ahead of generalists.
+        """
+
+        candidates = self.free_resources(day, slot, service_id)
+        if not candidates:
+            return None
+        load = self._load[day]
+        return min(candidates, key=lambda plan: load[plan.pk]).pk
+
+
+class SlotUnavailable(Exception):
+    """The requested slot cannot take the booking; ``str(exc)`` is user facing."""
+
+
+def reserve(appointment: Appointment, availability: Availability | None = None) -> Appointment:
+    """Assign a resource to ``appointment`` and save it, or raise ``SlotUnavailable``.
+
+    The unique constraints on ``Appointment`` settle races between concurrent
+    bookings; the loser gets a ``SlotUnavailable`` instead of an ``IntegrityError``.
+    """
+
+    day, slot = appointment.appointment_date, appointment.appointment_time
+    if appointment.branch_id is None:
+        appointment.branch_id = branch_of(appointment.service_id)
+    if availability is None:
+        availability = Availability(day, branch_id=appointment.branch_id)
+    metrics.inc("booking_attempts_total")
+    if not availability.is_free(day, slot):
+        metrics.inc("booking_rejections_total", reason="taken")
+        raise SlotUnavailable("Ese horario ya fue reservado. Elegí otro horario disponible.")
+    if not availability.is_free(day, slot, appointment.service_id):
+        metrics.inc("booking_rejections_total", reason="no_resource")
+        raise SlotUnavailable("No hay profesionales disponibles para ese servicio en el horario elegido.")
+    appointment.resource_id = availability.assign(day, slot, appointment.service_id)
+    appointment.deposit_status = Appointment.DepositStatus.PENDING
+    try:
+        with transaction.atomic():
+            appointment.save()
+    except IntegrityError:
+        metrics.inc("booking_slot_collisions_total")
+        raise SlotUnavailable("Otro turno se confirmó en ese horario. Elegí una nueva opción disponible.") from None
+    metrics.inc("booking_success_total")
+    return appointment
@@ -0,0 +1,105 @@
+"""Salon branches: lookup, per-branch URLs and the ``branch_view`` decorator.
+
+Branches are read on every request (URLs, templates, caches), so the whole table
+is kept in memory per process and reloaded only when the ``branches`` change
+marker moves. The default branch answers the historic URLs (``/``,
+``/reservas/``, ``/gestion/``); every other one lives under
+``/sucursales/<slug>/``.
+"""
+from __future__ import annotations
+
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404
+from django.urls import reverse
+
+from . import markers, metrics
+from .models import Branch
+
+MARKER = "branches"
+
+_branches: dict[int, Branch] = {}
+_version = None
+
+
+def _load() -> dict[int, Branch]:
+    global _branches, _version
+    version = markers.get(MARKER)
+    if version != _version or not _branches:
+        metrics.inc("app_cache_requests_total", cache="branches", result="miss")
+        _branches = {branch.pk: branch for branch in Branch.objects.all()}
+        _version = version
+    else:
+        metrics.inc("app_cache_requests_total", cache="branches", result="hit")
+    return _branches
+
+
+def invalidate(**kwargs):
+    return markers.touch(MARKER)
+
+
+def active() -> list[Branch]:
+    return [branch for branch in _load().values() if branch.is_active]
+
+
+def default() -> Branch:
+    """The branch behind the unprefixed URLs, created from the settings on a fresh install."""
+
+    branches = _load()
+    for branch in branches.values():
+        if branch.is_default:
+            return branch
+    branch, _ = Branch.objects.get_or_create(
+        is_default=True,
+        defaults={
+            "name": "Casa central",
+            "slug": "central",
+            "address": getattr(settings, "COMPANY_ADDRESS", ""),
+            "phone": getattr(settings, "COMPANY_PHONE", ""),
+            "email": getattr(settings, "COMPANY_EMAIL", ""),
+            "whatsapp_url": getattr(settings, "WHATSAPP_URL", ""),
+        },
+    )
+    invalidate()
+    return branch
+
+
+def get(slug: str | None) -> Branch | None:
+    """Active branch for ``slug``; the default branch when no slug is given."""
+
+    if not slug:
+        return default()
+    for branch in _load().values():
+        if branch.slug == slug and branch.is_active:
+            return branch
+    return None
+
+
+def by_pk(pk: int | None) -> Branch:
+    return _load().get(pk) or default()
+
+
+def for_request(request) -> Branch:
+    return getattr(request, "branch", None) or default()
+
+
+def url(name: str, branch: Branch | None = None, **kwargs) -> str:
+    """Reverse a branch-scoped view (``home``, ``appointments``, ``dashboard``...)."""
+
+    if branch is None or branch.is_default:
+        return reverse(f"core:{name}", kwargs=kwargs or None)
+    return reverse(f"core:branch:{name}", kwargs={"branch": branch.slug, **kwargs})
+
+
+def branch_view(view_func):
+    """Resolve the ``branch`` URL slug into ``request.branch`` and pass the branch on."""
+
+    @wraps(view_func)
+    def _wrapped(request, *args, branch: str | None = None, **kwargs):
+        request.branch = get(branch)
+        if request.branch is None:
+            raise Http404("Sucursal inexistente.")
+        return view_func(request, *args, branch=request.branch, **kwargs)
+
+    return _wrapped
@@ -0,0 +1,50 @@
+"""System checks for the settings the app relies on in production."""
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def default_cache_is_shared() -> bool:
+    return settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Change markers, live events and rate limits only reach every worker through a shared cache."""
+
+    if default_cache_is_shared():
+        return []
+    return [
+        Warning(
+            "La caché por defecto es local a cada proceso.",
+            hint=(
+                "Con más de un worker, las ediciones de horarios, catálogo y profesionales sólo se ven en el "
+                "worker que las hizo. Configurá CACHES['default'] con Redis o Memcached."
+            ),
+            id="core.W001",
+        )
+    ]
+
+
+@register()
+def check_session_cache(app_configs, **kwargs):
+    """Cached sessions in a per-process cache survive a logout made on another worker."""
+
+    if settings.SESSION_ENGINE != "django.contrib.sessions.backends.cached_db" or default_cache_is_shared():
+        return []
+    return [
+        Warning(
+            "Las sesiones se leen de una caché local a cada proceso.",
+            hint=(
+                "Con más de un worker, cerrar sesión o cambiar la contraseña sólo borra la sesión en caché del worker "
+                "que atendió el pedido. Configurá CACHES['default'] con Redis o Memcached o usá el motor 'db'."
+            ),
+            id="core.W002",
+        )
+    ]
@@ -2,14 +2,23 @@ from __future__ import annotations
 
 from django.conf import settings
 
+from . import branches
+
 
 def company_profile(request):
-    """Expose company related settings to every template."""
+    """Expose company related settings, and the branch being browsed, to every template.
+
+    Branch contact details win over the settings, which remain the fallback for
+    anything a branch leaves blank.
+    """
 
+    branch = branches.for_request(request)
     return {
         "COMPANY_NAME": getattr(settings, "COMPANY_NAME", "Mariana Nails"),
-        "COMPANY_EMAIL": getattr(settings, "COMPANY_EMAIL", "contacto@example.com"),
-        "COMPANY_PHONE": getattr(settings, "COMPANY_PHONE", ""),
-        "COMPANY_ADDRESS": getattr(settings, "COMPANY_ADDRESS", ""),
-        "WHATSAPP_URL": getattr(settings, "WHATSAPP_URL", ""),
+        "COMPANY_EMAIL": branch.email or getattr(settings, "COMPANY_EMAIL", "contacto@example.com"),
+        "COMPANY_PHONE": branch.phone or getattr(settings, "COMPANY_PHONE", ""),
+        "COMPANY_ADDRESS": branch.address or getattr(settings, "COMPANY_ADDRESS", ""),
+        "WHATSAPP_URL": branch.whatsapp_url or getattr(settings, "WHATSAPP_URL", ""),
+        "BRANCH": branch,
+        "BRANCHES": branches.active(),
     }
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(value) -> str:
+    """Fold case, accents and whitespace so trivially different resubmissions match."""
+
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def content_hash(*parts) -> str:
+    payload = "\x1f".join(normalize(part) for part in parts)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def dedup_window() -> timedelta:
+    return timedelta(minutes=getattr(settings, "SUBMISSION_DEDUP_WINDOW_MINUTES", 60))
+
+
+def save_or_merge(instance, **scope):
+    """Persist ``instance`` unless an identical submission arrived within the window.
+
+    Repeats are resolved with an indexed lookup on ``content_hash`` (narrowed by
+    ``scope``, e.g. ``user=...``, and to the instance's branch and to unresolved
+    rows for models that have those fields) and merged into the existing row by
+    bumping its ``repeat_count``. Returns ``(obj, created)`` like ``get_or_create``.
+    """
+
+    model = type(instance)
+    instance.content_hash = instance.compute_content_hash()
+    now = timezone.now()
+    fields = {field.name for field in model._meta.concrete_fields}
+    if "is_resolved" in fields:
+        # A repeat of something staff already answered needs attention again.
+        scope.setdefault("is_resolved", False)
+    if "branch" in fields:
+        # Each branch's dashboard only lists its own rows, so never merge across branches.
+        scope.setdefault("branch_id", instance.branch_id)
+    existing = (
+        model.objects.filter(content_hash=instance.content_hash, last_submitted_at__gte=now - dedup_window(), **scope)
+        .order_by("-last_submitted_at")
+        .first()
+    )
+    if existing is None:
+        instance.last_submitted_at = now
+        instance.save()
+        return instance, True
+    model.objects.filter(pk=existing.pk).update(repeat_count=F("repeat_count") + 1, last_submitted_at=now)
+    from .changes import record  # models import this module
+    from .signals import publish_saved
+
+    record(existing)
+    existing.refresh_from_db(fields=["repeat_count", "last_submitted_at"])
+    # The update() above skips post_save, so tell open dashboards about the new count here.
+    publish_saved(model, existing, created=False)
+    return existing, False
@@ -0,0 +1,195 @@
+"""Change event bus for the live dashboard.
+
+Events live in the configured cache under an increasing sequence number, so
+every worker (and every open dashboard) reads the same stream. Streams wait on
+an in-process condition that ``publish`` notifies, and fall back to a cheap
+cache read of the sequence number to notice events published by other workers.
+Nothing here touches the database except ``stats_for`` and ``item_for``, which
+compute the dashboard counters and the changed row once per event no matter how
+many dashboards are open. Saves only publish the primary key, so writes that no
+dashboard is watching (the expiry sweep, bulk imports) never pay for the row.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import Truncator
+
+SEQUENCE_KEY = "events:seq"
+_condition = threading.Condition()
+
+
+def _ttl() -> int:
+    return getattr(settings, "LIVE_EVENTS_TTL", 600)
+
+
+def current_sequence() -> int:
+    return cache.get(SEQUENCE_KEY) or 0
+
+
+def publish(kind: str, action: str, **payload) -> int:
+    cache.add(SEQUENCE_KEY, 0, timeout=None)
+    sequence = cache.incr(SEQUENCE_KEY)
+    cache.set(f"events:{sequence}", {"id": sequence, "type": kind, "action": action, **payload}, timeout=_ttl())
+    with _condition:
+        _condition.notify_all()
+    return sequence
+
+
+def publish_on_commit(kind: str, action: str, **payload) -> None:
+    """Publish once the surrounding transaction commits, so streams never see rolled back rows."""
+
+    transaction.on_commit(lambda: publish(kind, action, **payload))
+
+
+def read_since(last: int, limit: int = 100) -> list[dict]:
+    latest = current_sequence()
+    if latest <= last:
+        return []
+    first = max(last + 1, latest - limit + 1)
+    found = cache.get_many([f"events:{sequence}" for sequence in range(first, latest + 1)])
+    return [found[f"events:{sequence}"] for sequence in range(first, latest + 1) if f"events:{sequence}" in found]
+
+
+def wait_since(last: int, timeout: float) -> list[dict]:
+    """Return events after ``last``, waiting up to ``timeout`` seconds for one."""
+
+    events = read_since(last)
+    if events:
+        return events
+    poll = getattr(settings, "LIVE_EVENTS_POLL_SECONDS", 1.0)
+    waited = 0.0
+    while waited < timeout:
+        with _condition:
+            _condition.wait(min(poll, timeout - waited))
+        waited += poll
+        events = read_since(last)
+        if events:
+            return events
+    return []
+
+
+def compute_stats(branch_id: int | None = None) -> dict:
+    """Counters of one branch's dashboard; reviews and clients are shared by every branch."""
+
+    from .branches import default
+    from .models import Appointment, ContactMessage, Review, Service
+
+    branch_id = branch_id or default().pk
+    today = date.today()
+    week_end = today + timedelta(days=7)
+    appointments = Appointment.objects.filter(branch_id=branch_id)
+    average = Review.objects.filter(is_visible=True).aggregate(promedio=Avg("rating"))["promedio"]
+    return {
+        "appointments_today": appointments.filter(appointment_date=today).count(),
+        "appointments_week": appointments.filter(appointment_date__gt=today, appointment_date__lte=week_end).count(),
+        "services_active": Service.objects.filter(branch_id=branch_id, is_active=True).count(),
+        "pending_messages": ContactMessage.objects.filter(branch_id=branch_id, is_resolved=False).count(),
+        "average_rating": average,
+        "total_clients": get_user_model().objects.filter(is_staff=False).count(),
+        "pending_deposits": appointments.filter(deposit_status=Appointment.DepositStatus.PENDING)
+        .exclude(status=Appointment.STATUS_CANCELLED)
+        .count(),
+    }
+
+
+def stats_for(sequence: int, branch_id: int | None = None) -> dict:
+    """A branch's dashboard counters as of ``sequence``, computed by the first stream that asks."""
+
+    from .branches import default
+
+    branch_id = branch_id or default().pk
+    key = f"events:stats:{branch_id}:{sequence}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats(branch_id)
+        cache.add(key, stats, timeout=_ttl())
+    return stats
+
+
+def _live_querysets() -> dict:
+    from .models import Appointment, ContactMessage, Review
+
+    return {
+        "appointment": (Appointment.objects.select_related("service", "resource", "user"), appointment_payload),
+        "contact": (ContactMessage.objects.all(), contact_payload),
+        "review": (Review.objects.select_related("user"), review_payload),
+    }
+
+
+def item_for(event: dict) -> dict | None:
+    """The dashboard row of a saved object, built by the first stream that asks for the event."""
+
+    if "item" in event or "pk" not in event:
+        return event.get("item")
+    key = f"events:item:{event['id']}"
+    item = cache.get(key)
+    if item is None:
+        queryset, payload = _live_querysets()[event["type"]]
+        found = queryset.filter(pk=event["pk"]).first()
+        # Deleted since the event was published: the delete event follows and removes the row.
+        item = payload(found) if found is not None else {"pk": event["pk"]}
+        cache.add(key, item, timeout=_ttl())
+    return item
+
+
+def visible_to(event: dict, branch_id: int) -> bool:
+    """Events tagged with another branch stay off this branch's dashboard."""
+
+    return event.get("branch") in (None, branch_id)
+
+
+def _stamp(moment) -> str:
+    return timezone.localtime(moment).strftime("%d/%m %H:%M") if moment else ""
+
+
+def appointment_payload(appointment) -> dict:
+    return {
+        "pk": appointment.pk,
+        "date": appointment.appointment_date.isoformat(),
+        "time": appointment.appointment_time,
+        "status": appointment.status,
+        "status_display": appointment.get_status_display(),
+        "deposit_status": appointment.deposit_status,
+        "deposit_amount": f"{appointment.deposit_amount:.2f}",
+        "payment_method": appointment.get_payment_method_display(),
+        "payment_reference": appointment.payment_reference,
+        "service": appointment.service.name,
+        "resource": appointment.resource.name if appointment.resource_id else "",
+        "client": appointment.user.get_full_name() or appointment.user.username,
+        "created": _stamp(appointment.created_at),
+        "deadline": _stamp(appointment.payment_deadline),
+        "verify_url": reverse("core:verify_deposit", kwargs={"appointment_id": appointment.pk}),
+    }
+
+
+def contact_payload(message) -> dict:
+    return {
+        "pk": message.pk,
+        "name": message.name,
+        "email": message.email,
+        "phone": message.phone,
+        "message": Truncator(message.message).words(25),
+        "repeat_count": message.repeat_count,
+        "is_resolved": message.is_resolved,
+        "created": _stamp(message.created_at),
+    }
+
+
+def review_payload(review) -> dict:
+    return {
+        "pk": review.pk,
+        "user": review.user.get_full_name() or review.user.username,
+        "rating": review.rating,
+        "comment": Truncator(review.comment).words(18),
+        "is_visible": review.is_visible,
+        "created": timezone.localtime(review.created_at).strftime("%d/%m/%Y %H:%M") if review.created_at else "",
+    }
@@ -0,0 +1,89 @@
+"""Cancel bookings whose deposit was not paid before their payment deadline.
+
+The sweep reads due rows through ``appointment_unpaid_due_idx`` (a partial
+index over pending deposits only) and cancels them with conditional bulk
+updates: a row is only touched while its deposit is still pending, so a deposit
+verified concurrently always wins and is never cancelled. Cancelled bookings no
+longer count for the slot constraints, which frees the slot right away.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from . import changes, events, markers, metrics
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+
+def due(now: datetime | None = None):
+    return Appointment.objects.filter(
+        deposit_status=Appointment.DepositStatus.PENDING,
+        payment_deadline__lte=now or timezone.now(),
+    ).exclude(status=Appointment.STATUS_CANCELLED)
+
+
+def expire_unpaid(now: datetime | None = None, batch_size: int = 500, notify: bool | None = None) -> int:
+    """Cancel every overdue unpaid booking; returns how many were cancelled."""
+
+    now = now or timezone.now()
+    if notify is None:
+        notify = getattr(settings, "PAYMENT_EXPIRY_NOTIFY", True)
+    expired = 0
+    while batch := list(due(now).order_by("payment_deadline").values_list("pk", flat=True)[:batch_size]):
+        # Re-check the deposit in the UPDATE itself: verify_deposit may have run since the read.
+        count = (
+            Appointment.objects.filter(pk__in=batch, deposit_status=Appointment.DepositStatus.PENDING)
+            .exclude(status=Appointment.STATUS_CANCELLED)
+            .update(status=Appointment.STATUS_CANCELLED, deposit_status=Appointment.DepositStatus.EXPIRED)
+        )
+        expired += count
+        if not count:
+            continue
+        rows = list(
+            Appointment.objects.filter(pk__in=batch, deposit_status=Appointment.DepositStatus.EXPIRED)
+            .select_related("user", "service")
+        )
+        # Bulk updates skip signals, so move the change markers and publish by hand.
+        markers.touch(
+            "bookings",
+            *{markers.scoped("bookings", row.branch_id) for row in rows},
+            *{f"bookings:user:{row.user_id}" for row in rows},
+        )
+        changes.record_many(Appointment, [row.pk for row in rows])
+        events.publish("appointment", "expired", pks=[row.pk for row in rows])
+        if notify:
+            send_notices(rows)
+    if expired:
+        metrics.inc("bookings_expired_total", expired)
+    return expired
+
+
+def notice_for(appointment: Appointment) -> EmailMessage | None:
+    if not appointment.user.email:
+        return None
+    body = "\n".join([
+        f"Hola {appointment.user.first_name or appointment.user.username},",
+        "",
+        f"Como no recibimos la seña de $ {appointment.deposit_amount:.2f}, liberamos tu turno de "
+        f"{appointment.service.name} del {appointment.appointment_date:%d/%m} a las {appointment.appointment_time}.",
+        "Si ya pagaste o querés reservar otro horario, escribinos y lo resolvemos.",
+        "",
+        settings.COMPANY_NAME,
+    ])
+    return EmailMessage(f"Tu turno del {appointment.appointment_date:%d/%m} fue liberado", body, to=[appointment.user.email])
+
+
+def send_notices(appointments: list[Appointment]) -> None:
+    messages = [message for message in map(notice_for, appointments) if message is not None]
+    if not messages:
+        return
+    try:
+        get_connection().send_messages(messages)
+    except Exception:  # the bookings are already released; a lost notice must not undo that
+        logger.exception("Could not send expiry notices")
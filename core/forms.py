@@ -6,7 +6,9 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
-from .models import Appointment, ContactMessage, Review, Service, TimeSlot
+from . import branches
+from .models import Appointment, ContactMessage, ReconciliationRun, Review, Service
+from .schedule import get_schedule
 
 
 class ContactForm(forms.ModelForm):
@@ -76,8 +78,12 @@ class AppointmentForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         time_choices = kwargs.pop("time_choices", None)
+        branch = kwargs.pop("branch", None)
         super().__init__(*args, **kwargs)
-        self.fields["service"].queryset = Service.objects.filter(is_active=True)
+        self.branch_id = branch.pk if branch is not None else branches.default().pk
+        if self.instance.branch_id is None:
+            self.instance.branch_id = self.branch_id
+        self.fields["service"].queryset = Service.objects.filter(branch_id=self.branch_id, is_active=True)
         self.fields["service"].empty_label = "Seleccioná un servicio"
         self.fields["service"].widget.attrs.update(
             {
@@ -104,7 +110,7 @@ class AppointmentForm(forms.ModelForm):
         self.fields["payment_reference"].widget.attrs.setdefault("class", "form-control")
         self.fields["notes"].widget.attrs["class"] = "form-control"
         if time_choices is None:
-            time_choices = [choice for choice, _ in TimeSlot.choices]
+            time_choices = get_schedule(self.branch_id).every_slot()
         formatted_choices = [(choice, choice) for choice in time_choices]
         self.fields["appointment_time"].choices = [("", "Elegí un horario")] + formatted_choices
         payment_choices = [("", "Elegí medio de pago")] + list(Appointment.PaymentMethod.choices)
@@ -147,3 +153,13 @@ class RegistrationForm(UserCreationForm):
         if commit:
             user.save()
         return user
+
+
+class ReconciliationUploadForm(forms.Form):
+    source = forms.ChoiceField(label="Origen", choices=ReconciliationRun.Source.choices)
+    statement = forms.FileField(label="Extracto (CSV)")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["source"].widget.attrs["class"] = "form-select form-select-sm"
+        self.fields["statement"].widget.attrs.update({"class": "form-control form-control-sm", "accept": ".csv,text/csv"})
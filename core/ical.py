@@ -0,0 +1,95 @@
+"""Streaming iCalendar (RFC 5545) feeds for staff and clients."""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import branches
+from .models import Appointment, TimeSlot
+
+PRODID = "-//Mariana Nails//Turnos//ES"
+STATUS = {
+    Appointment.STATUS_PENDING: "TENTATIVE",
+    Appointment.STATUS_CONFIRMED: "CONFIRMED",
+    Appointment.STATUS_CANCELLED: "CANCELLED",
+}
+
+
+def escape(value: str) -> str:
+    return (
+        str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """Fold content lines at 75 octets as required by RFC 5545."""
+
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current = [], b""
+    for char in line:
+        chunk = char.encode("utf-8")
+        if len(current) + len(chunk) > (75 if not parts else 74):
+            parts.append(current.decode("utf-8"))
+            current = b""
+        current += chunk
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def utc_stamp(moment: datetime) -> str:
+    return moment.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def appointment_start(appointment: Appointment) -> datetime:
+    naive = datetime.combine(appointment.appointment_date, TimeSlot.to_time(appointment.appointment_time))
+    return timezone.make_aware(naive, timezone.get_default_timezone())
+
+
+def event_lines(appointment: Appointment, staff: bool):
+    start = appointment_start(appointment)
+    end = start + timedelta(minutes=appointment.service.duration_minutes)
+    summary = appointment.service.name
+    if staff:
+        summary = f"{summary} · {appointment.user.get_full_name() or appointment.user.username}"
+    description = [f"Seña: $ {appointment.deposit_amount:.2f} ({appointment.get_deposit_status_display()})"]
+    if appointment.resource_id:
+        description.append(f"Profesional: {appointment.resource.name}")
+    if staff and appointment.notes:
+        description.append(f"Notas: {appointment.notes}")
+    yield "BEGIN:VEVENT"
+    yield f"UID:appointment-{appointment.pk}@{settings.COMPANY_NAME.replace(' ', '').lower()}"
+    yield f"DTSTAMP:{utc_stamp(appointment.created_at)}"
+    yield f"DTSTART:{utc_stamp(start)}"
+    yield f"DTEND:{utc_stamp(end)}"
+    yield f"SUMMARY:{escape(summary)}"
+    yield f"DESCRIPTION:{escape(chr(10).join(description))}"
+    yield f"LOCATION:{escape(branches.by_pk(appointment.branch_id).address or settings.COMPANY_ADDRESS)}"
+    yield f"STATUS:{STATUS.get(appointment.status, 'TENTATIVE')}"
+    yield "END:VEVENT"
+
+
+def feed_queryset(user):
+    """Upcoming appointments for the feed; staff see the whole salon."""
+
+    queryset = Appointment.objects.filter(appointment_date__gte=date.today())
+    if not user.is_staff:
+        queryset = queryset.filter(user=user)
+    return queryset.select_related("service", "resource", "user").order_by("appointment_date", "appointment_time")
+
+
+def stream_feed(user, chunk_size: int = 200):
+    """Yield the calendar line by line, reading appointments in chunks."""
+
+    staff = user.is_staff
+    name = f"{settings.COMPANY_NAME} · {'Agenda del salón' if staff else 'Mis turnos'}"
+    for line in ("BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+                 f"X-WR-CALNAME:{escape(name)}", f"X-WR-TIMEZONE:{settings.TIME_ZONE}"):
+        yield fold(line)
+    for appointment in feed_queryset(user).iterator(chunk_size=chunk_size):
+        for line in event_lines(appointment, staff):
+            yield fold(line)
+    yield fold("END:VCALENDAR")
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from core.ratelimit import check_request
+
+
+class Command(BaseCommand):
+    help = "Mide el costo por solicitud del limitador cuando rechaza tráfico abusivo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        request = RequestFactory().post("/", {"form_type": "contact"}, REMOTE_ADDR="203.0.113.7")
+        request.user = AnonymousUser()
+
+        with override_settings(
+            RATELIMIT_ENABLED=True,
+            RATELIMIT_CACHE="default",
+            RATELIMITS={"benchmark": "1/h"},
+        ):
+            cache = caches["default"]
+            cache.delete("rl:benchmark:ip:203.0.113.7")
+            check_request(request, "benchmark")  # drain the single token
+            for label, contended in (("sin contención", False), ("con el bucket bloqueado", True)):
+                if contended:
+                    # Another request holding the bucket lock must not slow the rejections down.
+                    cache.add("rl:benchmark:ip:203.0.113.7:lock", 1, timeout=60)
+                rejected = 0
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    if check_request(request, "benchmark") is not None:
+                        rejected += 1
+                elapsed = time.perf_counter() - start
+                per_request_us = elapsed / iterations * 1_000_000
+                self.stdout.write(
+                    f"{label}: {rejected}/{iterations} rechazos · {per_request_us:.1f} µs por rechazo "
+                    f"(cache: {cache.__class__.__name__})"
+                )
+            cache.delete("rl:benchmark:ip:203.0.113.7:lock")
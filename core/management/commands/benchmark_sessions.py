@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import statistics
+import time
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+MODES = {
+    "db": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "MESSAGE_STORAGE": "django.contrib.messages.storage.fallback.FallbackStorage",
+    },
+    "cached_db": {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.cached_db",
+        "MESSAGE_STORAGE": "core.sessions.MessageStorage",
+    },
+}
+
+
+class Command(BaseCommand):
+    help = "Compara solicitudes por segundo en la portada y en reservas con sesiones en base y en caché."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--rounds", type=int, default=3, help="Rondas alternando los modos; se informa la mediana.")
+
+    def handle(self, *args, **options):
+        results: dict[tuple[str, str], list[float]] = defaultdict(list)
+        session_queries: dict[tuple[str, str], int] = {}
+        # The throwaway user and its sessions are rolled back at the end.
+        with transaction.atomic():
+            user = get_user_model().objects.create_user("benchmark-sesiones", password=None)
+            for _ in range(options["rounds"]):
+                for mode, overrides in MODES.items():
+                    with override_settings(**overrides):
+                        anonymous = Client(HTTP_HOST="localhost")
+                        logged_in = Client(HTTP_HOST="localhost")
+                        logged_in.force_login(user)
+                        for label, client, url in (
+                            ("home (anónima)", anonymous, reverse("core:home")),
+                            ("appointment_view (logueada)", logged_in, reverse("core:appointments")),
+                        ):
+                            rps, queries = self.measure(client, url, options["requests"])
+                            results[mode, label].append(rps)
+                            session_queries[mode, label] = queries
+                        # Their rows are rolled back below; logging out also drops the cached copies.
+                        anonymous.logout()
+                        logged_in.logout()
+            transaction.set_rollback(True)
+        for (mode, label), samples in results.items():
+            self.stdout.write(
+                f"{'[' + mode + ']':<12} {label:<28} {statistics.median(samples):8.1f} sol/s · "
+                f"{session_queries[mode, label]} consultas a django_session por solicitud"
+            )
+
+    def measure(self, client: Client, url: str, count: int) -> tuple[float, int]:
+        client.get(url)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.get(url)
+        rps = count / (time.perf_counter() - started)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        return rps, sum("django_session" in query["sql"] for query in queries.captured_queries)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo de la primera solicitud en un proceso frío y en uno precalentado."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", dest="urls", help="Rutas a medir (por defecto / y la API de servicios).")
+        parser.add_argument("--requests", type=int, default=20)
+        parser.add_argument("--child", choices=["cold", "warm"], help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or ["/", "/api/v1/servicios/"]
+        if options["child"]:
+            self.stdout.write(json.dumps(self.measure(options["child"], urls, options["requests"])))
+            return
+        for mode in ("cold", "warm"):
+            # Each mode runs in a fresh interpreter so nothing is warm by accident.
+            command = [sys.executable, str(Path(settings.BASE_DIR) / "manage.py"), "benchmark_startup",
+                       "--child", mode, "--requests", str(options["requests"])]
+            for url in urls:
+                command += ["--url", url]
+            result = json.loads(subprocess.run(command, capture_output=True, text=True, check=True).stdout)
+            self.stdout.write(f"[{mode}] precalentamiento: {result['warmup_ms']:.1f} ms")
+            for url, timing in result["urls"].items():
+                self.stdout.write(
+                    f"[{mode}] {url:<24} primera: {timing['first_ms']:7.1f} ms · "
+                    f"mediana siguientes: {timing['median_ms']:6.1f} ms"
+                )
+
+    def measure(self, mode: str, urls: list[str], count: int) -> dict:
+        warmup_ms = 0.0
+        if mode == "warm":
+            started = time.perf_counter()
+            warm_up()
+            warmup_ms = (time.perf_counter() - started) * 1000
+        client = Client(HTTP_HOST="localhost")
+        results = {}
+        for url in urls:
+            timings = []
+            for _ in range(count):
+                started = time.perf_counter()
+                client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            results[url] = {"first_ms": timings[0], "median_ms": statistics.median(timings[1:] or timings)}
+        return {"warmup_ms": warmup_ms, "urls": results}
+
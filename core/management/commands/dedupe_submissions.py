@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.dedup import dedup_window
+from core.models import ContactMessage, Review
+
+
+class Command(BaseCommand):
+    help = "Calcula huellas de contenido faltantes y fusiona mensajes y valoraciones duplicados."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Informa los cambios sin aplicarlos.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model, scope in ((ContactMessage, ("branch_id", "is_resolved")), (Review, ("user_id",))):
+            merged, removed = self.collapse(model, scope, options["dry_run"], options["batch_size"])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {merged} filas conservadas, {removed} duplicados eliminados")
+
+    def collapse(self, model, scope, dry_run, batch_size):
+        window = dedup_window()
+        keepers = {}
+        to_update = []
+        to_delete = []
+        rows = model.objects.order_by("created_at", "pk").iterator(chunk_size=batch_size)
+        for row in rows:
+            row.content_hash = row.compute_content_hash()
+            submitted = row.last_submitted_at or row.created_at
+            key = tuple(getattr(row, field) for field in scope) + (row.content_hash,)
+            keeper = keepers.get(key)
+            if keeper is not None and submitted - keeper.last_submitted_at <= window:
+                keeper.repeat_count += row.repeat_count
+                keeper.last_submitted_at = max(keeper.last_submitted_at, submitted)
+                to_delete.append(row.pk)
+                continue
+            row.last_submitted_at = submitted
+            keepers[key] = row
+            to_update.append(row)
+
+        if not dry_run:
+            with transaction.atomic():
+                model.objects.bulk_update(
+                    to_update,
+                    ["content_hash", "repeat_count", "last_submitted_at"],
+                    batch_size=batch_size,
+                )
+                for start in range(0, len(to_delete), batch_size):
+                    model.objects.filter(pk__in=to_delete[start:start + batch_size]).delete()
+        return len(to_update), len(to_delete)
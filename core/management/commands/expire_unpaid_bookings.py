@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.expiry import expire_unpaid
+
+
+class Command(BaseCommand):
+    help = "Cancela los turnos cuya seña no se pagó antes del vencimiento y libera sus horarios."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--no-notify", action="store_true", help="No avisa por email a las clientas.")
+
+    def handle(self, *args, **options):
+        notify = False if options["no_notify"] else None
+        expired = expire_unpaid(batch_size=options["batch_size"], notify=notify)
+        self.stdout.write(f"{expired} turnos vencidos sin seña cancelados")
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from core.models import GalleryImage, MediaBlob
+from core.storage import digest_from_name, gallery_storage
+
+
+class Command(BaseCommand):
+    help = "Elimina de disco las imágenes de la galería que ya no usa ninguna fila."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes", type=int, default=60,
+            help="Solo borra archivos sin uso desde hace al menos estos minutos (subidas en curso).",
+        )
+        parser.add_argument("--recount", action="store_true", help="Recalcula las referencias desde la galería.")
+        parser.add_argument("--dry-run", action="store_true", help="Informa los cambios sin aplicarlos.")
+
+    def handle(self, *args, **options):
+        cutoff = time.time() - options["grace_minutes"] * 60
+        dry_run = options["dry_run"]
+        if options["recount"] and not dry_run:
+            self.recount()
+
+        known = set(MediaBlob.objects.values_list("name", flat=True))
+        removed = freed = 0
+        orphans = MediaBlob.objects.filter(references=0).values_list("pk", "name", "size")
+        for pk, name, size in orphans.iterator():
+            if not self.idle(name, cutoff):
+                continue
+            # The conditional delete loses against a concurrent retain() of the same blob.
+            if dry_run or MediaBlob.objects.filter(pk=pk, references=0).delete()[0]:
+                if not dry_run:
+                    gallery_storage.delete(name)
+                removed += 1
+                freed += size
+
+        for name in gallery_storage.blob_names():
+            if name not in known and self.idle(name, cutoff):
+                # Uploaded but never attached to a row (e.g. a form that failed validation).
+                freed += gallery_storage.size(name)
+                removed += 1
+                if not dry_run:
+                    gallery_storage.delete(name)
+
+        if not dry_run:
+            gallery_storage.clear_incoming(cutoff)
+        self.stdout.write(f"{removed} archivos sin uso eliminados ({freed / 1024 / 1024:.1f} MB liberados)")
+
+    def idle(self, name, cutoff):
+        try:
+            return os.path.getmtime(gallery_storage.path(name)) < cutoff
+        except FileNotFoundError:
+            return True
+
+    def recount(self):
+        counts = dict(
+            GalleryImage.objects.exclude(image="").values_list("image").annotate(total=Count("pk")).order_by()
+        )
+        existing = set(MediaBlob.objects.values_list("name", flat=True))
+        MediaBlob.objects.exclude(name__in=list(counts)).update(references=0)
+        for name, total in counts.items():
+            if name in existing:
+                MediaBlob.objects.filter(name=name).update(references=total)
+            elif digest_from_name(name) and gallery_storage.exists(name):
+                MediaBlob.objects.create(
+                    name=name, digest=digest_from_name(name), size=gallery_storage.size(name), references=total
+                )
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ReconciliationRun
+from core.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = "Concilia un extracto bancario o de Mercado Pago con las señas pendientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Archivo CSV del extracto.")
+        parser.add_argument("--source", choices=ReconciliationRun.Source.values, default=ReconciliationRun.Source.BANK)
+        parser.add_argument("--user", help="Usuario del staff que figura como verificador.")
+        parser.add_argument("--encoding", default="utf-8-sig")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(username=options["user"], is_staff=True)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No existe un usuario del staff llamado {options['user']}.") from None
+        try:
+            with open(options["path"], encoding=options["encoding"], newline="") as stream:
+                run = reconcile(stream, options["source"], user=user, filename=options["path"])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(
+            f"{run.total_lines} líneas · {run.matched} conciliadas · {run.ambiguous} para revisar · "
+            f"{run.unmatched} sin coincidencia · {run.duration_ms} ms"
+        )
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.reminders import get_channel, run_tick
+
+
+class Command(BaseCommand):
+    help = "Envía los recordatorios de turnos 24 h y 2 h antes (una vez o en bucle como worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Queda corriendo y revisa cada --interval segundos.")
+        parser.add_argument("--interval", type=int, default=60)
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        channel = get_channel()
+        while True:
+            totals = run_tick(channel=channel, batch_size=options["batch_size"])
+            sent = ", ".join(f"{kind}: {count}" for kind, count in totals.items())
+            self.stdout.write(f"Recordatorios enviados · {sent}")
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
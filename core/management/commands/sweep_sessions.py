@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.sessions import clear_expired
+
+
+class Command(BaseCommand):
+    help = "Elimina las sesiones vencidas en lotes chicos para no bloquear las reservas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--pause", type=float, default=0.05, help="Segundos de espera entre lotes.")
+
+    def handle(self, *args, **options):
+        removed = clear_expired(batch_size=options["batch_size"], pause=options["pause"])
+        self.stdout.write(f"{removed} sesiones vencidas eliminadas")
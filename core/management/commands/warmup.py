@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Precompila plantillas, resuelve rutas y carga las cachés de la aplicación."
+
+    def handle(self, *args, **options):
+        state = warm_up()
+        for name, step in state["steps"].items():
+            self.stdout.write(f"{name:<10} {step['items']:>4} elementos · {step['seconds'] * 1000:.1f} ms")
+        if state["error"]:
+            raise CommandError(f"El precalentamiento falló: {state['error']}")
+        self.stdout.write(self.style.SUCCESS(f"Listo en {state['duration'] * 1000:.1f} ms"))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+
+from . import metrics
+
+PREFIX = "marker:"
+
+
+def scoped(name: str, branch_id: int) -> str:
+    """Marker for one branch's share of ``name``, e.g. ``catalog:branch:2``."""
+
+    return f"{name}:branch:{branch_id}"
+
+
+def touch(*names: str) -> float:
+    """Record that the data behind ``names`` changed now and return the new stamp."""
+
+    stamp = datetime.now(dt_timezone.utc).timestamp()
+    cache.set_many({f"{PREFIX}{name}": stamp for name in names}, timeout=None)
+    return stamp
+
+
+def get(name: str) -> float:
+    """Return the last change stamp for ``name``, starting a fresh one if unknown.
+
+    A missing marker (cold or flushed cache) is treated as "changed now", which can
+    only cause a spurious cache miss for clients, never a stale response.
+    """
+
+    stamp = cache.get(f"{PREFIX}{name}")
+    if stamp is None:
+        metrics.inc("app_cache_requests_total", cache="markers", result="miss")
+        stamp = touch(name)
+    else:
+        metrics.inc("app_cache_requests_total", cache="markers", result="hit")
+    return stamp
+
+
+def get_many(*names: str) -> dict[str, float]:
+    keys = [f"{PREFIX}{name}" for name in names]
+    found = cache.get_many(keys)
+    missing = [name for name, key in zip(names, keys) if key not in found]
+    metrics.inc("app_cache_requests_total", len(names) - len(missing), cache="markers", result="hit")
+    if missing:
+        metrics.inc("app_cache_requests_total", len(missing), cache="markers", result="miss")
+        stamp = touch(*missing)
+        found.update({f"{PREFIX}{name}": stamp for name in missing})
+    return {name: found[f"{PREFIX}{name}"] for name in names}
+
+
+def as_datetime(stamp: float) -> datetime:
+    return datetime.fromtimestamp(stamp, tz=dt_timezone.utc)
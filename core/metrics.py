@@ -0,0 +1,321 @@
+"""Prometheus text-format metrics without external dependencies.
+
+Every process accumulates counters in memory (a dict update per sample) and,
+when ``METRICS_DIR`` is set, periodically dumps them to
+``<METRICS_DIR>/<pid>-<start time>.json``. The scrape endpoint sums the files of
+every worker, so counters stay correct under multi-process deployments without
+any locking on the recording path. The start time keeps a reused pid from
+overwriting a dead worker's totals, and scrapes fold the files of workers that
+exited into ``retired.json`` so counters never go backwards and the directory
+does not grow with every restart.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development, nothing to fold
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+RETIRED = "retired.json"
+WORKER_FILE = re.compile(r"^(\d+)-\d+$")
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+DEFINITIONS = {
+    "http_request_duration_seconds": ("histogram", "Request latency by URL name."),
+    "http_db_queries_total": ("counter", "Database queries executed while serving requests."),
+    "app_cache_requests_total": ("counter", "Application cache lookups by cache and result."),
+    "booking_attempts_total": ("counter", "Booking attempts that reached slot reservation."),
+    "booking_success_total": ("counter", "Bookings saved."),
+    "booking_rejections_total": ("counter", "Bookings refused because the slot was not free."),
+    "booking_slot_collisions_total": ("counter", "Bookings lost to a concurrent booking (IntegrityError)."),
+    "deposits_verified_total": ("counter", "Deposits marked as verified."),
+    "bookings_expired_total": ("counter", "Unpaid bookings cancelled after their payment deadline."),
+    "deposits_pending": ("gauge", "Appointments whose deposit is waiting for verification."),
+    "slot_occupancy_ratio": ("gauge", "Booked share of bookable capacity over the next 7 days."),
+    "reminders_total": ("counter", "Appointment reminders by window and outcome."),
+}
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+class Registry:
+    def __init__(self, name: str | None = None):
+        self.name = name
+        self._values: dict[tuple, float] = defaultdict(float)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed_at = 0.0
+        self.identity = name or f"{os.getpid()}-{time.time_ns()}"
+
+    def forked(self) -> None:
+        """Start a forked child from zero under its own file; the parent's samples are in the parent's."""
+
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed_at = 0.0
+        self.identity = self.name or f"{os.getpid()}-{time.time_ns()}"
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        with self._lock:
+            self._values[_key(name, labels)] += amount
+        self._maybe_flush()
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        bucket = BUCKETS[bisect_left(BUCKETS, value)]
+        with self._lock:
+            self._values[_key(f"{name}_bucket", {**labels, "le": bucket})] += 1
+            self._values[_key(f"{name}_sum", labels)] += value
+            self._values[_key(f"{name}_count", labels)] += 1
+        self._maybe_flush()
+
+    def snapshot(self) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def _maybe_flush(self) -> None:
+        directory = metrics_dir()
+        if directory is None:
+            return
+        if time.monotonic() - self._flushed_at < getattr(settings, "METRICS_FLUSH_SECONDS", 1.0):
+            return
+        # Another thread flushing right now writes the same totals; never wait for it.
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flushed_at = time.monotonic()
+            self._write(directory)
+        except OSError:
+            # Recording a metric must never fail the booking or payment that triggered it.
+            logger.exception("Could not flush metrics to %s", directory)
+        finally:
+            self._flush_lock.release()
+
+    def flush(self, directory: Path) -> None:
+        with self._flush_lock:
+            self._write(directory)
+
+    def _write(self, directory: Path) -> None:
+        rows = [[name, list(labels), value] for (name, labels), value in self.snapshot().items()]
+        _write_json(directory / f"{self.identity}.json", rows)
+
+
+def _write_json(target: Path, payload) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=target.parent, prefix=f".{target.stem}-", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as stream:
+            json.dump(payload, stream)
+        os.replace(temporary, target)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+registry = Registry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=registry.forked)
+
+
+def metrics_dir() -> Path | None:
+    directory = getattr(settings, "METRICS_DIR", None)
+    if not directory:
+        return None
+    return Path(directory)
+
+
+def inc(name: str, amount: float = 1, **labels) -> None:
+    registry.inc(name, amount, **labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    registry.observe(name, value, **labels)
+
+
+def _exited(stem: str) -> bool:
+    """Whether the worker that wrote ``<stem>.json`` is gone (named registries never are)."""
+
+    match = WORKER_FILE.match(stem)
+    if match is None:
+        return False
+    pid = int(match.group(1))
+    if pid == os.getpid():
+        return stem != registry.identity  # an earlier process that had our pid
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+def _add(totals: dict[tuple, float], rows) -> None:
+    for name, labels, value in rows:
+        totals[(name, tuple(tuple(pair) for pair in labels))] += value
+
+
+def _retire(directory: Path, totals: dict[tuple, float], folded: set[str]) -> None:
+    """Fold the files of exited workers into ``totals`` and ``retired.json``, then delete them.
+
+    ``folded`` starts with the names already counted in ``retired.json`` and
+    collects the new ones. They are written along with the totals, so a crash
+    between the write and the deletes never counts a file twice.
+    """
+
+    for path in directory.glob("*.json"):
+        if path.name == RETIRED or path.stem in folded or not _exited(path.stem):
+            continue
+        try:
+            rows = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        _add(totals, rows)
+        folded.add(path.stem)
+    if folded:
+        rows = [[name, list(labels), value] for (name, labels), value in totals.items()]
+        _write_json(directory / RETIRED, {"folded": sorted(folded), "rows": rows})
+        for stem in folded:
+            (directory / f"{stem}.json").unlink(missing_ok=True)
+        _write_json(directory / RETIRED, {"folded": [], "rows": rows})
+
+
+def collect() -> dict[tuple, float]:
+    """Sum the samples of every worker (or just this process without ``METRICS_DIR``)."""
+
+    directory = metrics_dir()
+    if directory is None:
+        return registry.snapshot()
+    registry.flush(directory)
+    with open(directory / "retired.lock", "a") as lock:
+        # Scrapes from different workers take turns, so none reads a half-folded directory.
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            retired = json.loads((directory / RETIRED).read_text())
+        except FileNotFoundError:
+            retired = {"folded": [], "rows": []}
+        totals: dict[tuple, float] = defaultdict(float)
+        _add(totals, retired["rows"])
+        folded = set(retired["folded"])
+        if fcntl is not None:
+            try:
+                _retire(directory, totals, folded)
+            except OSError:
+                logger.exception("Could not fold retired metrics in %s", directory)
+        live: dict[tuple, float] = defaultdict(float)
+        for path in directory.glob("*.json"):
+            if path.name == RETIRED or path.stem in folded:
+                continue
+            try:
+                rows = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue  # a worker replaced its file mid-read; the next scrape catches up
+            _add(live, rows)
+    for key, value in live.items():
+        totals[key] += value
+    return totals
+
+
+def _format_labels(labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for label, value in labels:
+        if value == float("inf"):
+            value = "+Inf"
+        text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        parts.append(f'{label}="{text}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in DEFINITIONS:
+            return name[: -len(suffix)]
+    return name
+
+
+def _cumulative_buckets(samples: dict[tuple, float]) -> dict[tuple, float]:
+    """Prometheus buckets count every observation ``<= le``; we store them per bucket."""
+
+    per_series: dict[tuple, dict[float, float]] = defaultdict(dict)
+    result = {}
+    for (name, labels), value in samples.items():
+        if name.endswith("_bucket"):
+            rest = tuple(pair for pair in labels if pair[0] != "le")
+            bound = float(dict(labels)["le"])
+            per_series[(name, rest)][bound] = per_series[(name, rest)].get(bound, 0) + value
+        else:
+            result[(name, labels)] = value
+    for (name, rest), counts in per_series.items():
+        running = 0.0
+        for bound in BUCKETS:
+            running += counts.get(bound, 0)
+            result[(name, tuple(sorted(rest + (("le", bound),))))] = running
+    return result
+
+
+def render(samples: dict[tuple, float]) -> str:
+    families: dict[str, list] = defaultdict(list)
+    for (name, labels), value in _cumulative_buckets(samples).items():
+        families[_family(name)].append((name, labels, value))
+    lines = []
+    for family in sorted(families):
+        kind, description = DEFINITIONS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {description}")
+        lines.append(f"# TYPE {family} {kind}")
+        rows = sorted(families[family], key=lambda row: (row[0], [(k, str(v)) for k, v in row[1] if k != "le"],
+                                                            dict(row[1]).get("le", 0)))
+        for name, labels, value in rows:
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Time every request and count its queries, labelled by URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match is not None else "unresolved"
+        observe("http_request_duration_seconds", elapsed, view=view, method=request.method)
+        if queries[0]:
+            inc("http_db_queries_total", queries[0], view=view)
+        return response
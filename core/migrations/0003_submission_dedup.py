@@ -0,0 +1,53 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_appointment_deposit_amount_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contactmessage',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='last_submitted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Último envío'),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Repeticiones'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='last_submitted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Último envío'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Repeticiones'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['content_hash', 'last_submitted_at'], name='contact_dedup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', 'content_hash', 'last_submitted_at'], name='review_dedup_idx'),
+        ),
+    ]
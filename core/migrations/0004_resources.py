@@ -0,0 +1,68 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_submission_dedup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día')),
+                ('start_time', models.TimeField(verbose_name='Desde')),
+                ('end_time', models.TimeField(verbose_name='Hasta')),
+            ],
+            options={
+                'verbose_name': 'Horario del profesional',
+                'verbose_name_plural': 'Horarios del profesional',
+                'ordering': ['resource', 'weekday', 'start_time'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='appointment',
+            unique_together=set(),
+        ),
+        migrations.CreateModel(
+            name='Resource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120, verbose_name='Nombre')),
+                ('kind', models.CharField(choices=[('staff', 'Profesional'), ('chair', 'Puesto')], default='staff', max_length=10, verbose_name='Tipo')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+                ('display_order', models.PositiveIntegerField(default=0, verbose_name='Orden')),
+                ('services', models.ManyToManyField(blank=True, help_text='Dejalo vacío si puede realizar todos los servicios.', related_name='resources', to='core.service', verbose_name='Servicios habilitados')),
+            ],
+            options={
+                'verbose_name': 'Profesional / puesto',
+                'verbose_name_plural': 'Profesionales y puestos',
+                'ordering': ['display_order', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='resource',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='appointments', to='core.resource', verbose_name='Profesional / puesto'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(fields=('resource', 'appointment_date', 'appointment_time'), name='unique_resource_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('resource__isnull', True)), fields=('appointment_date', 'appointment_time'), name='unique_unassigned_slot'),
+        ),
+        migrations.AddField(
+            model_name='resourceschedule',
+            name='resource',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='core.resource'),
+        ),
+    ]
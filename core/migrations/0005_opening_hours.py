@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:51
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_resources'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día')),
+                ('opens_at', models.TimeField(verbose_name='Abre')),
+                ('closes_at', models.TimeField(verbose_name='Cierra')),
+                ('slot_minutes', models.PositiveSmallIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)], verbose_name='Duración del turno (min)')),
+            ],
+            options={
+                'verbose_name': 'Horario de atención',
+                'verbose_name_plural': 'Horarios de atención',
+                'ordering': ['weekday', 'opens_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Fecha')),
+                ('is_closed', models.BooleanField(default=True, verbose_name='Cerrado')),
+                ('opens_at', models.TimeField(blank=True, null=True, verbose_name='Abre')),
+                ('closes_at', models.TimeField(blank=True, null=True, verbose_name='Cierra')),
+                ('slot_minutes', models.PositiveSmallIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(240)], verbose_name='Duración del turno (min)')),
+                ('note', models.CharField(blank=True, max_length=120, verbose_name='Motivo')),
+            ],
+            options={
+                'verbose_name': 'Excepción de horario',
+                'verbose_name_plural': 'Feriados y excepciones',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='appointment_time',
+            field=models.CharField(max_length=5, verbose_name='Horario'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_opening_hours'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(editable=False, max_length=64, unique=True, verbose_name='Clave')),
+                ('name', models.CharField(blank=True, max_length=120, verbose_name='Descripción')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activo')),
+            ],
+            options={
+                'verbose_name': 'Token de API',
+                'verbose_name_plural': 'Tokens de API',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='unique_resource_slot',
+        ),
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='unique_unassigned_slot',
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('resource', 'appointment_date', 'appointment_time'), name='unique_resource_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('resource__isnull', True), models.Q(('status', 'cancelled'), _negated=True)), fields=('appointment_date', 'appointment_time'), name='unique_unassigned_slot'),
+        ),
+        migrations.AddField(
+            model_name='apitoken',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='api_tokens', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
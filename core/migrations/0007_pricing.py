@@ -0,0 +1,54 @@
+# Generated by Django 5.1.15 on 2026-10-19 17:55
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def snapshot_service_prices(apps, schema_editor):
+    Appointment = apps.get_model("core", "Appointment")
+    Service = apps.get_model("core", "Service")
+    for service in Service.objects.all():
+        Appointment.objects.filter(service=service).update(service_price=service.price)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_api_tokens'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='service_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=8, verbose_name='Precio del servicio'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='deposit_fixed_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Si se completa, reemplaza al porcentaje.', max_digits=8, null=True, verbose_name='Seña fija'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='deposit_percentage',
+            field=models.PositiveSmallIntegerField(default=50, validators=[django.core.validators.MaxValueValidator(100)], verbose_name='Seña (%)'),
+        ),
+        migrations.CreateModel(
+            name='ServicePromotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=120, verbose_name='Promoción')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Precio promocional')),
+                ('starts_on', models.DateField(verbose_name='Desde')),
+                ('ends_on', models.DateField(verbose_name='Hasta')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='core.service')),
+            ],
+            options={
+                'verbose_name': 'Promoción',
+                'verbose_name_plural': 'Promociones',
+                'ordering': ['starts_on'],
+            },
+        ),
+        migrations.RunPython(snapshot_service_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_calendar_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('bank', 'Extracto bancario (CSV)'), ('mercadopago', 'Liquidación de Mercado Pago')], max_length=20, verbose_name='Origen')),
+                ('filename', models.CharField(blank=True, max_length=255, verbose_name='Archivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('total_lines', models.PositiveIntegerField(default=0, verbose_name='Líneas')),
+                ('matched', models.PositiveIntegerField(default=0, verbose_name='Conciliadas')),
+                ('ambiguous', models.PositiveIntegerField(default=0, verbose_name='Para revisar')),
+                ('unmatched', models.PositiveIntegerField(default=0, verbose_name='Sin coincidencia')),
+                ('duration_ms', models.PositiveIntegerField(default=0, verbose_name='Duración (ms)')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_runs', to=settings.AUTH_USER_MODEL, verbose_name='Importado por')),
+            ],
+            options={
+                'verbose_name': 'Conciliación de pagos',
+                'verbose_name_plural': 'Conciliaciones de pagos',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReconciliationItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_number', models.PositiveIntegerField(verbose_name='Línea')),
+                ('reference', models.CharField(max_length=255, verbose_name='Referencia')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto')),
+                ('reason', models.CharField(choices=[('multiple', 'Varias señas coinciden'), ('amount', 'El monto no coincide'), ('duplicate', 'Seña ya conciliada en este extracto')], max_length=12, verbose_name='Motivo')),
+                ('is_resolved', models.BooleanField(default=False, verbose_name='Resuelto')),
+                ('candidates', models.ManyToManyField(blank=True, to='core.appointment', verbose_name='Turnos candidatos')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='core.reconciliationrun')),
+            ],
+            options={
+                'verbose_name': 'Línea a revisar',
+                'verbose_name_plural': 'Líneas a revisar',
+                'ordering': ['run', 'line_number'],
+            },
+        ),
+    ]
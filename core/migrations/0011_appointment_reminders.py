@@ -0,0 +1,51 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_content_addressed_media'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppointmentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('24h', '24 horas antes'), ('2h', '2 horas antes')], max_length=8, verbose_name='Aviso')),
+                ('channel', models.CharField(blank=True, max_length=30, verbose_name='Canal')),
+                ('status', models.CharField(choices=[('sending', 'Enviando'), ('sent', 'Enviado'), ('skipped', 'Omitido'), ('failed', 'Falló')], default='sending', max_length=10, verbose_name='Estado')),
+                ('claim', models.CharField(editable=False, max_length=32)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado el')),
+                ('detail', models.CharField(blank=True, max_length=255, verbose_name='Detalle')),
+            ],
+            options={
+                'verbose_name': 'Recordatorio',
+                'verbose_name_plural': 'Recordatorios',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'appointment_time'], name='appointment_start_idx'),
+        ),
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='appointment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='core.appointment'),
+        ),
+        migrations.AddIndex(
+            model_name='appointmentreminder',
+            index=models.Index(fields=['claim'], name='reminder_claim_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointmentreminder',
+            constraint=models.UniqueConstraint(fields=('appointment', 'kind'), name='unique_appointment_reminder'),
+        ),
+    ]
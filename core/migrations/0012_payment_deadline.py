@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:10
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def give_pending_bookings_a_deadline(apps, schema_editor):
+    # Bookings made before deadlines existed get the usual grace period counted from today.
+    hours = getattr(settings, "PAYMENT_DEADLINE_HOURS", 24)
+    if not hours:
+        return
+    Appointment = apps.get_model("core", "Appointment")
+    Appointment.objects.filter(deposit_status="pending", deposit_amount__gt=0).exclude(
+        status="cancelled"
+    ).exclude(payment_method="cash").update(payment_deadline=timezone.now() + timedelta(hours=hours))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_appointment_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='payment_deadline',
+            field=models.DateTimeField(blank=True, help_text='Si la seña sigue pendiente a esta hora, el turno se cancela y se libera el horario.', null=True, verbose_name='Vencimiento de la seña'),
+        ),
+        migrations.AlterField(
+            model_name='appointment',
+            name='deposit_status',
+            field=models.CharField(choices=[('pending', 'Pendiente de verificación'), ('verified', 'Verificada'), ('expired', 'Vencida sin pago')], default='pending', max_length=12, verbose_name='Estado de seña'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('deposit_status', 'pending')), fields=['payment_deadline'], name='appointment_unpaid_due_idx'),
+        ),
+        migrations.RunPython(give_pending_bookings_a_deadline, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:13
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # Start the log with every existing row so a consumer without a cursor gets a full first sync.
+    ChangeLogEntry = apps.get_model("core", "ChangeLogEntry")
+    tracked = {
+        "appointment": apps.get_model("core", "Appointment"),
+        "review": apps.get_model("core", "Review"),
+        "contact_message": apps.get_model("core", "ContactMessage"),
+        "service": apps.get_model("core", "Service"),
+        "user": apps.get_model(settings.AUTH_USER_MODEL),
+    }
+    for name, model in tracked.items():
+        ids = model.objects.order_by("pk").values_list("pk", flat=True).iterator(chunk_size=2000)
+        ChangeLogEntry.objects.bulk_create(
+            (ChangeLogEntry(model=name, object_id=pk, action="upsert") for pk in ids), batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_payment_deadline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=30, verbose_name='Modelo')),
+                ('object_id', models.BigIntegerField(verbose_name='Id del objeto')),
+                ('action', models.CharField(choices=[('upsert', 'Alta o modificación'), ('delete', 'Baja')], max_length=6, verbose_name='Acción')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Fecha')),
+            ],
+            options={
+                'verbose_name': 'Cambio registrado',
+                'verbose_name_plural': 'Registro de cambios',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['model', 'id'], name='changelog_model_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
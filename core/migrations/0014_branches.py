@@ -0,0 +1,145 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:21
+
+import core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_branch(apps, schema_editor):
+    # The salon so far becomes the default branch, keeping its contact details and URLs.
+    Branch = apps.get_model("core", "Branch")
+    if not Branch.objects.filter(is_default=True).exists():
+        Branch.objects.create(
+            name="Casa central",
+            slug="central",
+            address=getattr(settings, "COMPANY_ADDRESS", ""),
+            phone=getattr(settings, "COMPANY_PHONE", ""),
+            email=getattr(settings, "COMPANY_EMAIL", ""),
+            whatsapp_url=getattr(settings, "WHATSAPP_URL", ""),
+            is_default=True,
+        )
+
+
+def assign_contact_messages(apps, schema_editor):
+    Branch = apps.get_model("core", "Branch")
+    ContactMessage = apps.get_model("core", "ContactMessage")
+    ContactMessage.objects.filter(branch__isnull=True).update(branch=Branch.objects.get(is_default=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_change_log'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Branch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=120, verbose_name='Nombre')),
+                ('slug', models.SlugField(max_length=60, unique=True, verbose_name='Identificador en la URL')),
+                ('address', models.CharField(blank=True, max_length=255, verbose_name='Dirección')),
+                ('phone', models.CharField(blank=True, max_length=25, verbose_name='Teléfono')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='Email')),
+                ('whatsapp_url', models.URLField(blank=True, verbose_name='Enlace de WhatsApp')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Activa')),
+                ('is_default', models.BooleanField(default=False, help_text='Se muestra en las direcciones sin sucursal (/, /reservas/, /gestion/).', verbose_name='Sucursal principal')),
+                ('display_order', models.PositiveIntegerField(default=0, verbose_name='Orden')),
+            ],
+            options={
+                'verbose_name': 'Sucursal',
+                'verbose_name_plural': 'Sucursales',
+                'ordering': ['display_order', 'name'],
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='openinghours',
+            options={'ordering': ['branch', 'weekday', 'opens_at'], 'verbose_name': 'Horario de atención', 'verbose_name_plural': 'Horarios de atención'},
+        ),
+        migrations.RemoveConstraint(
+            model_name='appointment',
+            name='unique_unassigned_slot',
+        ),
+        migrations.AlterField(
+            model_name='scheduleexception',
+            name='date',
+            field=models.DateField(verbose_name='Fecha'),
+        ),
+        migrations.AddConstraint(
+            model_name='branch',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_default', True)), fields=('is_default',), name='unique_default_branch'),
+        ),
+        migrations.RunPython(create_default_branch, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='appointment',
+            name='branch',
+            field=models.ForeignKey(default=core.models.default_branch_id, on_delete=django.db.models.deletion.PROTECT, related_name='appointments', to='core.branch', verbose_name='Sucursal'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='branch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contact_messages', to='core.branch', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='galleryimage',
+            name='branch',
+            field=models.ForeignKey(blank=True, help_text='Dejalo vacío para mostrarla en todas las sucursales.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='gallery', to='core.branch', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='openinghours',
+            name='branch',
+            field=models.ForeignKey(default=core.models.default_branch_id, on_delete=django.db.models.deletion.PROTECT, related_name='opening_hours', to='core.branch', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='resource',
+            name='branch',
+            field=models.ForeignKey(default=core.models.default_branch_id, on_delete=django.db.models.deletion.PROTECT, related_name='resources', to='core.branch', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='scheduleexception',
+            name='branch',
+            field=models.ForeignKey(default=core.models.default_branch_id, on_delete=django.db.models.deletion.PROTECT, related_name='schedule_exceptions', to='core.branch', verbose_name='Sucursal'),
+        ),
+        migrations.AddField(
+            model_name='service',
+            name='branch',
+            field=models.ForeignKey(default=core.models.default_branch_id, on_delete=django.db.models.deletion.PROTECT, related_name='services', to='core.branch', verbose_name='Sucursal'),
+        ),
+        migrations.RunPython(assign_contact_messages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['branch', 'appointment_date', 'appointment_time'], name='appointment_branch_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['branch', 'deposit_status', 'appointment_date'], name='appointment_branch_deposit_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['branch', 'is_resolved', 'created_at'], name='contact_branch_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='openinghours',
+            index=models.Index(fields=['branch', 'weekday'], name='openinghours_branch_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resource',
+            index=models.Index(fields=['branch', 'is_active'], name='resource_branch_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['branch', 'is_active', 'display_order'], name='service_branch_active_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('resource__isnull', True), models.Q(('status', 'cancelled'), _negated=True)), fields=('branch', 'appointment_date', 'appointment_time'), name='unique_unassigned_slot'),
+        ),
+        migrations.AddConstraint(
+            model_name='scheduleexception',
+            constraint=models.UniqueConstraint(fields=('branch', 'date'), name='unique_branch_exception_date'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:48
+
+from django.db import migrations, models
+
+
+def close_cancelled_deposits(apps, schema_editor):
+    # Bookings cancelled before this status existed still wait for a deposit nobody will pay.
+    Appointment = apps.get_model("core", "Appointment")
+    Appointment.objects.filter(status="cancelled", deposit_status="pending").update(deposit_status="cancelled")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_branches'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='deposit_status',
+            field=models.CharField(choices=[('pending', 'Pendiente de verificación'), ('verified', 'Verificada'), ('expired', 'Vencida sin pago'), ('cancelled', 'Anulada (turno cancelado)')], default='pending', max_length=12, verbose_name='Estado de seña'),
+        ),
+        migrations.RunPython(close_cancelled_deposits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_cancelled_deposits'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reconciliationitem',
+            name='reason',
+            field=models.CharField(choices=[('multiple', 'Varias señas coinciden'), ('amount', 'El monto no coincide'), ('duplicate', 'Seña ya conciliada en este extracto'), ('weak', 'Sólo coinciden palabras sueltas de la referencia')], max_length=12, verbose_name='Motivo'),
+        ),
+    ]
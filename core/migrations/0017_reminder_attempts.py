@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 18:55
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_weak_reconciliation_matches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Intentos'),
+        ),
+        migrations.AddField(
+            model_name='appointmentreminder',
+            name='claimed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Tomado el'),
+        ),
+    ]
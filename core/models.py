@@ -1,17 +1,23 @@
 from __future__ import annotations
 
-from datetime import time
-from decimal import Decimal, ROUND_HALF_UP
+import secrets
+from datetime import datetime, time, timedelta
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .dedup import content_hash
+from .storage import digest_from_name, gallery_storage
 
 User = settings.AUTH_USER_MODEL
 
 
 class TimeSlot(models.TextChoices):
-    """Reusable timetable for appointments."""
+    """Default timetable, used until opening hours are configured in the admin."""
 
     H09 = "09:00", "09:00"
     H10 = "10:00", "10:00"
@@ -30,16 +36,143 @@ class TimeSlot(models.TextChoices):
         return time(hour=int(hour), minute=int(minute))
 
 
+class Weekday(models.IntegerChoices):
+    MONDAY = 0, "Lunes"
+    TUESDAY = 1, "Martes"
+    WEDNESDAY = 2, "Miércoles"
+    THURSDAY = 3, "Jueves"
+    FRIDAY = 4, "Viernes"
+    SATURDAY = 5, "Sábado"
+    SUNDAY = 6, "Domingo"
+
+
+class Branch(models.Model):
+    """A salon location with its own catalog, timetable, staff and bookings."""
+
+    name = models.CharField("Nombre", max_length=120)
+    slug = models.SlugField("Identificador en la URL", max_length=60, unique=True)
+    address = models.CharField("Dirección", max_length=255, blank=True)
+    phone = models.CharField("Teléfono", max_length=25, blank=True)
+    email = models.EmailField("Email", blank=True)
+    whatsapp_url = models.URLField("Enlace de WhatsApp", blank=True)
+    is_active = models.BooleanField("Activa", default=True)
+    is_default = models.BooleanField(
+        "Sucursal principal",
+        default=False,
+        help_text="Se muestra en las direcciones sin sucursal (/, /reservas/, /gestion/).",
+    )
+    display_order = models.PositiveIntegerField("Orden", default=0)
+
+    class Meta:
+        ordering = ["display_order", "name"]
+        constraints = [
+            models.UniqueConstraint(fields=["is_default"], condition=models.Q(is_default=True), name="unique_default_branch"),
+        ]
+        verbose_name = "Sucursal"
+        verbose_name_plural = "Sucursales"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+def default_branch_id() -> int:
+    """Field default for branch-owned rows, so single-salon setups never pick a branch.
+
+    Only the id and flag columns are read, which keeps the historic migrations that
+    call it working whatever fields ``Branch`` gains later.
+    """
+
+    pk = Branch.objects.filter(is_default=True).values_list("pk", flat=True).first()
+    if pk is None:
+        from .branches import default
+
+        pk = default().pk
+    return pk
+
+
+class OpeningHours(models.Model):
+    """Weekly opening block. A weekday without blocks is closed."""
+
+    branch = models.ForeignKey(
+        Branch, verbose_name="Sucursal", on_delete=models.PROTECT, default=default_branch_id, related_name="opening_hours"
+    )
+    weekday = models.PositiveSmallIntegerField("Día", choices=Weekday.choices)
+    opens_at = models.TimeField("Abre")
+    closes_at = models.TimeField("Cierra")
+    slot_minutes = models.PositiveSmallIntegerField(
+        "Duración del turno (min)",
+        default=60,
+        validators=[MinValueValidator(5), MaxValueValidator(240)],
+    )
+
+    class Meta:
+        ordering = ["branch", "weekday", "opens_at"]
+        indexes = [models.Index(fields=["branch", "weekday"], name="openinghours_branch_idx")]
+        verbose_name = "Horario de atención"
+        verbose_name_plural = "Horarios de atención"
+
+    def __str__(self) -> str:
+        return f"{self.get_weekday_display()} {self.opens_at:%H:%M}-{self.closes_at:%H:%M}"
+
+
+class ScheduleException(models.Model):
+    """Date specific override: holidays, closures or extended hours."""
+
+    branch = models.ForeignKey(
+        Branch, verbose_name="Sucursal", on_delete=models.PROTECT, default=default_branch_id, related_name="schedule_exceptions"
+    )
+    date = models.DateField("Fecha")
+    is_closed = models.BooleanField("Cerrado", default=True)
+    opens_at = models.TimeField("Abre", null=True, blank=True)
+    closes_at = models.TimeField("Cierra", null=True, blank=True)
+    slot_minutes = models.PositiveSmallIntegerField(
+        "Duración del turno (min)",
+        default=60,
+        validators=[MinValueValidator(5), MaxValueValidator(240)],
+    )
+    note = models.CharField("Motivo", max_length=120, blank=True)
+
+    class Meta:
+        ordering = ["date"]
+        constraints = [models.UniqueConstraint(fields=["branch", "date"], name="unique_branch_exception_date")]
+        verbose_name = "Excepción de horario"
+        verbose_name_plural = "Feriados y excepciones"
+
+    def __str__(self) -> str:
+        return f"{self.date:%d/%m/%Y} · {self.note or ('Cerrado' if self.is_closed else 'Horario especial')}"
+
+    def clean(self):
+        if not self.is_closed and (self.opens_at is None or self.closes_at is None):
+            raise ValidationError("Indicá el horario de apertura y cierre o marcá el día como cerrado.")
+
+
 class Service(models.Model):
+    branch = models.ForeignKey(
+        Branch, verbose_name="Sucursal", on_delete=models.PROTECT, default=default_branch_id, related_name="services"
+    )
     name = models.CharField("Servicio", max_length=120)
     description = models.TextField("Descripción")
     duration_minutes = models.PositiveIntegerField("Duración (min)", default=60)
     price = models.DecimalField("Precio", max_digits=8, decimal_places=2)
+    deposit_percentage = models.PositiveSmallIntegerField(
+        "Seña (%)",
+        default=50,
+        validators=[MaxValueValidator(100)],
+    )
+    deposit_fixed_amount = models.DecimalField(
+        "Seña fija",
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Si se completa, reemplaza al porcentaje.",
+    )
     is_active = models.BooleanField("Disponible", default=True)
     display_order = models.PositiveIntegerField("Orden", default=0)
 
     class Meta:
         ordering = ["display_order", "name"]
+        indexes = [models.Index(fields=["branch", "is_active", "display_order"], name="service_branch_active_idx")]
         verbose_name = "Servicio"
         verbose_name_plural = "Servicios"
 
@@ -47,9 +180,87 @@ class Service(models.Model):
         return self.name
 
 
+class ServicePromotion(models.Model):
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="promotions")
+    label = models.CharField("Promoción", max_length=120)
+    price = models.DecimalField("Precio promocional", max_digits=8, decimal_places=2)
+    starts_on = models.DateField("Desde")
+    ends_on = models.DateField("Hasta")
+
+    class Meta:
+        ordering = ["starts_on"]
+        verbose_name = "Promoción"
+        verbose_name_plural = "Promociones"
+
+    def __str__(self) -> str:
+        return f"{self.service} · {self.label}"
+
+    def clean(self):
+        if self.starts_on and self.ends_on and self.ends_on < self.starts_on:
+            raise ValidationError("La fecha de fin no puede ser anterior a la de inicio.")
+
+
+class Resource(models.Model):
+    """A manicurist or chair that can serve one client per slot."""
+
+    class Kind(models.TextChoices):
+        STAFF = "staff", "Profesional"
+        CHAIR = "chair", "Puesto"
+
+    branch = models.ForeignKey(
+        Branch, verbose_name="Sucursal", on_delete=models.PROTECT, default=default_branch_id, related_name="resources"
+    )
+    name = models.CharField("Nombre", max_length=120)
+    kind = models.CharField("Tipo", max_length=10, choices=Kind.choices, default=Kind.STAFF)
+    services = models.ManyToManyField(
+        Service,
+        verbose_name="Servicios habilitados",
+        related_name="resources",
+        blank=True,
+        help_text="Dejalo vacío si puede realizar todos los servicios.",
+    )
+    is_active = models.BooleanField("Activo", default=True)
+    display_order = models.PositiveIntegerField("Orden", default=0)
+
+    class Meta:
+        ordering = ["display_order", "name"]
+        indexes = [models.Index(fields=["branch", "is_active"], name="resource_branch_active_idx")]
+        verbose_name = "Profesional / puesto"
+        verbose_name_plural = "Profesionales y puestos"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class ResourceSchedule(models.Model):
+    """Weekly working hours of a resource. Resources without rows work every open slot."""
+
+    resource = models.ForeignKey(Resource, on_delete=models.CASCADE, related_name="schedules")
+    weekday = models.PositiveSmallIntegerField("Día", choices=Weekday.choices)
+    start_time = models.TimeField("Desde")
+    end_time = models.TimeField("Hasta")
+
+    class Meta:
+        ordering = ["resource", "weekday", "start_time"]
+        verbose_name = "Horario del profesional"
+        verbose_name_plural = "Horarios del profesional"
+
+    def __str__(self) -> str:
+        return f"{self.resource} · {self.get_weekday_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
 class GalleryImage(models.Model):
+    branch = models.ForeignKey(
+        Branch,
+        verbose_name="Sucursal",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="gallery",
+        help_text="Dejalo vacío para mostrarla en todas las sucursales.",
+    )
     title = models.CharField("Título", max_length=120)
-    image = models.ImageField("Imagen", upload_to="gallery/")
+    image = models.ImageField("Imagen", upload_to="gallery/", storage=gallery_storage)
     description = models.CharField("Descripción", max_length=255, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_featured = models.BooleanField("Destacado", default=False)
@@ -63,6 +274,47 @@ class GalleryImage(models.Model):
         return self.title
 
 
+class MediaBlob(models.Model):
+    """One stored file shared by every gallery row that uploaded the same bytes."""
+
+    name = models.CharField("Archivo", max_length=255, unique=True)
+    digest = models.CharField("SHA-256", max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField("Tamaño (bytes)", default=0)
+    references = models.PositiveIntegerField("Referencias", default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Archivo almacenado"
+        verbose_name_plural = "Archivos almacenados"
+        indexes = [models.Index(fields=["references", "updated_at"], name="mediablob_orphan_idx")]
+
+    def __str__(self) -> str:
+        return self.name
+
+    @classmethod
+    def retain(cls, name: str, storage=gallery_storage) -> None:
+        digest = digest_from_name(name)
+        if not digest:
+            return  # files stored before content addressing are not counted
+        now = timezone.now()
+        if cls.objects.filter(name=name).update(references=F("references") + 1, updated_at=now):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, digest=digest, size=storage.size(name), references=1, updated_at=now)
+        except IntegrityError:
+            cls.objects.filter(name=name).update(references=F("references") + 1, updated_at=now)
+
+    @classmethod
+    def release(cls, name: str) -> None:
+        if name:
+            cls.objects.filter(name=name, references__gt=0).update(
+                references=F("references") - 1, updated_at=timezone.now()
+            )
+
+
 class Review(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reviews")
     rating = models.PositiveSmallIntegerField(
@@ -72,37 +324,60 @@ class Review(models.Model):
     comment = models.TextField("Comentario", max_length=800)
     created_at = models.DateTimeField(auto_now_add=True)
     is_visible = models.BooleanField("Visible", default=True)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    repeat_count = models.PositiveIntegerField("Repeticiones", default=1, editable=False)
+    last_submitted_at = models.DateTimeField("Último envío", null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["user", "content_hash", "last_submitted_at"], name="review_dedup_idx")]
         verbose_name = "Valoración"
         verbose_name_plural = "Valoraciones"
 
     def __str__(self) -> str:
         return f"{self.user} - {self.rating}"
 
+    def compute_content_hash(self) -> str:
+        return content_hash(self.rating, self.comment)
+
 
 class ContactMessage(models.Model):
+    branch = models.ForeignKey(
+        Branch, verbose_name="Sucursal", on_delete=models.SET_NULL, null=True, blank=True, related_name="contact_messages"
+    )
     name = models.CharField("Nombre", max_length=120)
     email = models.EmailField("Email")
     phone = models.CharField("Teléfono", max_length=25, blank=True)
     message = models.TextField("Mensaje", max_length=1000)
     created_at = models.DateTimeField(auto_now_add=True)
     is_resolved = models.BooleanField("Respondido", default=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    repeat_count = models.PositiveIntegerField("Repeticiones", default=1, editable=False)
+    last_submitted_at = models.DateTimeField("Último envío", null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["content_hash", "last_submitted_at"], name="contact_dedup_idx"),
+            models.Index(fields=["branch", "is_resolved", "created_at"], name="contact_branch_open_idx"),
+        ]
         verbose_name = "Mensaje de contacto"
         verbose_name_plural = "Mensajes de contacto"
 
     def __str__(self) -> str:
         return f"{self.name} ({self.email})"
 
+    def compute_content_hash(self) -> str:
+        # Name and phone are left out: bots rotate them while resending the same body.
+        return content_hash(self.email, self.message)
+
 
 class Appointment(models.Model):
     class DepositStatus(models.TextChoices):
         PENDING = "pending", "Pendiente de verificación"
         VERIFIED = "verified", "Verificada"
+        EXPIRED = "expired", "Vencida sin pago"
+        CANCELLED = "cancelled", "Anulada (turno cancelado)"
 
     class PaymentMethod(models.TextChoices):
         TRANSFER = "transfer", "Transferencia bancaria"
@@ -119,13 +394,23 @@ class Appointment(models.Model):
         (STATUS_CANCELLED, "Cancelado"),
     ]
 
+    branch = models.ForeignKey(Branch, verbose_name="Sucursal", on_delete=models.PROTECT, related_name="appointments")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="appointments")
     service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="appointments")
+    resource = models.ForeignKey(
+        Resource,
+        verbose_name="Profesional / puesto",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="appointments",
+    )
     appointment_date = models.DateField("Fecha")
-    appointment_time = models.CharField("Horario", choices=TimeSlot.choices, max_length=5)
+    appointment_time = models.CharField("Horario", max_length=5)
     notes = models.CharField("Notas", max_length=255, blank=True)
     status = models.CharField("Estado", max_length=12, choices=STATUS_CHOICES, default=STATUS_PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
+    service_price = models.DecimalField("Precio del servicio", max_digits=8, decimal_places=2, default=0)
     deposit_amount = models.DecimalField("Monto de seña", max_digits=8, decimal_places=2, default=0)
     deposit_status = models.CharField(
         "Estado de seña",
@@ -149,10 +434,42 @@ class Appointment(models.Model):
         related_name="verified_deposits",
     )
     deposit_verified_at = models.DateTimeField("Fecha de verificación", null=True, blank=True)
+    payment_deadline = models.DateTimeField(
+        "Vencimiento de la seña",
+        null=True,
+        blank=True,
+        help_text="Si la seña sigue pendiente a esta hora, el turno se cancela y se libera el horario.",
+    )
 
     class Meta:
         ordering = ["appointment_date", "appointment_time"]
-        unique_together = ("appointment_date", "appointment_time")
+        constraints = [
+            # Cancelled bookings release their slot.
+            models.UniqueConstraint(
+                fields=["resource", "appointment_date", "appointment_time"],
+                condition=~models.Q(status="cancelled"),
+                name="unique_resource_slot",
+            ),
+            # Branches without resources keep the original one-booking-per-slot rule.
+            models.UniqueConstraint(
+                fields=["branch", "appointment_date", "appointment_time"],
+                condition=models.Q(resource__isnull=True) & ~models.Q(status="cancelled"),
+                name="unique_unassigned_slot",
+            ),
+        ]
+        indexes = [
+            # Booking pages and the dashboard always read one branch.
+            models.Index(fields=["branch", "appointment_date", "appointment_time"], name="appointment_branch_start_idx"),
+            models.Index(fields=["branch", "deposit_status", "appointment_date"], name="appointment_branch_deposit_idx"),
+            # Reminders sweep every branch at once.
+            models.Index(fields=["appointment_date", "appointment_time"], name="appointment_start_idx"),
+            # Only unpaid bookings are ever swept, so only they are indexed.
+            models.Index(
+                fields=["payment_deadline"],
+                condition=models.Q(deposit_status="pending"),
+                name="appointment_unpaid_due_idx",
+            ),
+        ]
         verbose_name = "Turno"
         verbose_name_plural = "Turnos"
 
@@ -163,8 +480,206 @@ class Appointment(models.Model):
     def appointment_datetime(self):
         return self.appointment_date, TimeSlot.to_time(self.appointment_time)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell a service swap from any other edit.
+        instance._loaded_service_id = instance.__dict__.get("service_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        swapped = not self._state.adding and self.service_id != getattr(self, "_loaded_service_id", self.service_id)
+        if (self._state.adding or swapped) and self.service_id:
+            # Prices are snapshotted at booking time (or when staff switch the service);
+            # later catalog edits never touch them.
+            from .pricing import branch_of, quote_for
+
+            if self.branch_id is None:
+                self.branch_id = branch_of(self.service_id)
+            quote = quote_for(self.service_id, self.appointment_date, self.branch_id)
+            self.service_price = quote.price
+            # A verified deposit is money already received; only an open one follows the new service.
+            if self._state.adding or self.deposit_status == self.DepositStatus.PENDING:
+                self.deposit_amount = quote.deposit
+            if self._state.adding and self.payment_deadline is None:
+                self.payment_deadline = self.default_payment_deadline()
+            if swapped and kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "service_price", "deposit_amount"}
+        super().save(*args, **kwargs)
+        self._loaded_service_id = self.service_id
+
+    def default_payment_deadline(self):
+        """``PAYMENT_DEADLINE_HOURS`` from now, but never after the appointment itself.
+
+        Deposits paid in cash at the salon and bookings without a deposit never expire.
+        """
+        hours = getattr(settings, "PAYMENT_DEADLINE_HOURS", 24)
+        if not hours or not self.deposit_amount or self.payment_method == self.PaymentMethod.CASH:
+            return None
+        starts_at = timezone.make_aware(datetime.combine(*self.appointment_datetime))
+        return min(timezone.now() + timedelta(hours=hours), starts_at)
+
+
+class AppointmentReminder(models.Model):
+    """Ledger of reminders: one row per appointment and window, claimed before sending."""
+
+    class Kind(models.TextChoices):
+        DAY_BEFORE = "24h", "24 horas antes"
+        SAME_DAY = "2h", "2 horas antes"
+
+    class Status(models.TextChoices):
+        SENDING = "sending", "Enviando"
+        SENT = "sent", "Enviado"
+        SKIPPED = "skipped", "Omitido"
+        FAILED = "failed", "Falló"
+
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name="reminders")
+    kind = models.CharField("Aviso", max_length=8, choices=Kind.choices)
+    channel = models.CharField("Canal", max_length=30, blank=True)
+    status = models.CharField("Estado", max_length=10, choices=Status.choices, default=Status.SENDING)
+    claim = models.CharField(max_length=32, editable=False)
+    claimed_at = models.DateTimeField("Tomado el", default=timezone.now, editable=False)
+    attempts = models.PositiveSmallIntegerField("Intentos", default=1, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField("Enviado el", null=True, blank=True)
+    detail = models.CharField("Detalle", max_length=255, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [models.UniqueConstraint(fields=["appointment", "kind"], name="unique_appointment_reminder")]
+        indexes = [models.Index(fields=["claim"], name="reminder_claim_idx")]
+        verbose_name = "Recordatorio"
+        verbose_name_plural = "Recordatorios"
+
+    def __str__(self) -> str:
+        return f"{self.appointment} · {self.get_kind_display()}"
+
+
+class ChangeLogEntry(models.Model):
+    """Append-only record of saves and deletes; its id is the change feed cursor."""
+
+    class Action(models.TextChoices):
+        UPSERT = "upsert", "Alta o modificación"
+        DELETE = "delete", "Baja"
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField("Modelo", max_length=30)
+    object_id = models.BigIntegerField("Id del objeto")
+    action = models.CharField("Acción", max_length=6, choices=Action.choices)
+    changed_at = models.DateTimeField("Fecha", default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["model", "id"], name="changelog_model_idx")]
+        verbose_name = "Cambio registrado"
+        verbose_name_plural = "Registro de cambios"
+
+    def __str__(self) -> str:
+        return f"#{self.pk} {self.model}:{self.object_id} {self.action}"
+
+
+class ApiToken(models.Model):
+    """Secret key used by the JSON API (``Authorization: Token <key>``)."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="api_tokens")
+    key = models.CharField("Clave", max_length=64, unique=True, editable=False)
+    name = models.CharField("Descripción", max_length=120, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    is_active = models.BooleanField("Activo", default=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Token de API"
+        verbose_name_plural = "Tokens de API"
+
+    def __str__(self) -> str:
+        return f"{self.user} · {self.name or self.key[:8]}"
+
     def save(self, *args, **kwargs):
-        if self.service_id:
-            base_amount = self.service.price or Decimal("0")
-            self.deposit_amount = (base_amount * Decimal("0.50")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        if not self.key:
+            self.key = secrets.token_hex(20)
         super().save(*args, **kwargs)
+
+
+class CalendarToken(models.Model):
+    """Secret that identifies a user's iCalendar feed URL."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="calendar_token")
+    key = models.CharField("Clave", max_length=64, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Calendario suscripto"
+        verbose_name_plural = "Calendarios suscriptos"
+
+    def __str__(self) -> str:
+        return f"{self.user} · {self.key[:8]}"
+
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = secrets.token_urlsafe(24)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def for_user(cls, user) -> CalendarToken:
+        token, _ = cls.objects.get_or_create(user=user)
+        return token
+
+
+class ReconciliationRun(models.Model):
+    """One imported bank or Mercado Pago statement."""
+
+    class Source(models.TextChoices):
+        BANK = "bank", "Extracto bancario (CSV)"
+        MERCADOPAGO = "mercadopago", "Liquidación de Mercado Pago"
+
+    source = models.CharField("Origen", max_length=20, choices=Source.choices)
+    filename = models.CharField("Archivo", max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        User,
+        verbose_name="Importado por",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="reconciliation_runs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    total_lines = models.PositiveIntegerField("Líneas", default=0)
+    matched = models.PositiveIntegerField("Conciliadas", default=0)
+    ambiguous = models.PositiveIntegerField("Para revisar", default=0)
+    unmatched = models.PositiveIntegerField("Sin coincidencia", default=0)
+    duration_ms = models.PositiveIntegerField("Duración (ms)", default=0)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Conciliación de pagos"
+        verbose_name_plural = "Conciliaciones de pagos"
+
+    def __str__(self) -> str:
+        return f"{self.get_source_display()} · {self.created_at:%d/%m/%Y %H:%M}"
+
+
+class ReconciliationItem(models.Model):
+    """Statement line that needs a human decision."""
+
+    class Reason(models.TextChoices):
+        MULTIPLE = "multiple", "Varias señas coinciden"
+        AMOUNT = "amount", "El monto no coincide"
+        DUPLICATE = "duplicate", "Seña ya conciliada en este extracto"
+        WEAK = "weak", "Sólo coinciden palabras sueltas de la referencia"
+
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name="items")
+    line_number = models.PositiveIntegerField("Línea")
+    reference = models.CharField("Referencia", max_length=255)
+    amount = models.DecimalField("Monto", max_digits=10, decimal_places=2)
+    reason = models.CharField("Motivo", max_length=12, choices=Reason.choices)
+    candidates = models.ManyToManyField("Appointment", verbose_name="Turnos candidatos", blank=True)
+    is_resolved = models.BooleanField("Resuelto", default=False)
+
+    class Meta:
+        ordering = ["run", "line_number"]
+        verbose_name = "Línea a revisar"
+        verbose_name_plural = "Líneas a revisar"
+
+    def __str__(self) -> str:
+        return f"Línea {self.line_number} · {self.reference}"
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from . import branches, markers, metrics
+from .models import Service, ServicePromotion
+
+MARKER = "catalog"
+CENTS = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class Quote:
+    """Price and deposit for one service on one day."""
+
+    service_id: int
+    name: str
+    description: str
+    duration_minutes: int
+    list_price: Decimal
+    price: Decimal
+    deposit: Decimal
+    promotion: str = ""
+
+    def as_json(self) -> dict:
+        return {
+            "name": self.name,
+            "price": format(self.price, ".2f"),
+            "list_price": format(self.list_price, ".2f"),
+            "deposit": format(self.deposit, ".2f"),
+            "promotion": self.promotion,
+        }
+
+
+def deposit_for(service: Service, price: Decimal) -> Decimal:
+    if service.deposit_fixed_amount is not None:
+        return min(service.deposit_fixed_amount, price).quantize(CENTS, rounding=ROUND_HALF_UP)
+    percentage = Decimal(service.deposit_percentage) / Decimal(100)
+    return (price * percentage).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def quote_service(service: Service, day: date, promotion: ServicePromotion | None = None) -> Quote:
+    list_price = service.price or Decimal("0")
+    price = promotion.price if promotion is not None else list_price
+    return Quote(
+        service_id=service.pk,
+        name=service.name,
+        description=service.description,
+        duration_minutes=service.duration_minutes,
+        list_price=list_price,
+        price=price,
+        deposit=deposit_for(service, price),
+        promotion=promotion.label if promotion is not None else "",
+    )
+
+
+class Catalog:
+    """Active services and promotions of one branch, priced once per day and kept in memory."""
+
+    def __init__(self, services: list[Service], promotions: list[ServicePromotion]):
+        self.services = services
+        self.service_ids = {service.pk for service in services}
+        self.promotions: dict[int, list[ServicePromotion]] = {}
+        for promotion in promotions:
+            self.promotions.setdefault(promotion.service_id, []).append(promotion)
+        self._by_date: dict[date, dict[int, Quote]] = {}
+
+    @classmethod
+    def build(cls, branch_id: int) -> Catalog:
+        services = list(Service.objects.filter(branch_id=branch_id, is_active=True))
+        promotions = list(
+            ServicePromotion.objects.filter(service__branch_id=branch_id, ends_on__gte=date.today()).order_by("price")
+        )
+        return cls(services, promotions)
+
+    def promotion_for(self, service_id: int, day: date) -> ServicePromotion | None:
+        # Promotions are sorted by price, so overlapping windows pick the cheapest.
+        for promotion in self.promotions.get(service_id, ()):
+            if promotion.starts_on <= day <= promotion.ends_on:
+                return promotion
+        return None
+
+    def quotes(self, day: date) -> dict[int, Quote]:
+        if day not in self._by_date:
+            self._by_date[day] = {
+                service.pk: quote_service(service, day, self.promotion_for(service.pk, day))
+                for service in self.services
+            }
+        return self._by_date[day]
+
+    def quote(self, service_id: int, day: date) -> Quote | None:
+        return self.quotes(day).get(service_id)
+
+    def as_json(self, day: date) -> dict[int, dict]:
+        return {service_id: quote.as_json() for service_id, quote in self.quotes(day).items()}
+
+    def uniform_percentage(self) -> int | None:
+        """The deposit percentage shared by every active service, if there is one."""
+
+        percentages = {
+            None if service.deposit_fixed_amount is not None else service.deposit_percentage
+            for service in self.services
+        }
+        return percentages.pop() if len(percentages) == 1 else None
+
+
+# Branch id -> (catalog, marker version, build date).
+_catalogs: dict[int, tuple[Catalog, float, date]] = {}
+
+
+def get_catalog(branch_id: int | None = None) -> Catalog:
+    """Return the process-wide catalog of a branch, rebuilt when its ``catalog`` marker moves."""
+
+    branch_id = branch_id or branches.default().pk
+    version = markers.get(markers.scoped(MARKER, branch_id))
+    today = date.today()
+    cached = _catalogs.get(branch_id)
+    if cached is None or cached[1] != version or cached[2] != today:
+        metrics.inc("app_cache_requests_total", cache="catalog", result="miss")
+        cached = _catalogs[branch_id] = (Catalog.build(branch_id), version, today)
+    else:
+        metrics.inc("app_cache_requests_total", cache="catalog", result="hit")
+    return cached[0]
+
+
+def branch_of(service_id: int) -> int:
+    """Branch of a service, answered from the default branch's catalog when it is there."""
+
+    default = branches.default().pk
+    if service_id in get_catalog(default).service_ids:
+        return default
+    return Service.objects.values_list("branch_id", flat=True).get(pk=service_id)
+
+
+def quote_for(service_id: int, day: date, branch_id: int | None = None) -> Quote:
+    """Quote from the branch's cached catalog, loading the service only when it is inactive."""
+
+    quote = get_catalog(branch_id).quote(service_id, day)
+    if quote is None:
+        service = Service.objects.get(pk=service_id)
+        promotion = (
+            ServicePromotion.objects.filter(service=service, starts_on__lte=day, ends_on__gte=day)
+            .order_by("price")
+            .first()
+        )
+        quote = quote_service(service, day, promotion)
+    return quote
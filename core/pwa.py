@@ -0,0 +1,133 @@
+"""Progressive Web App: web manifest and service worker configuration.
+
+The worker logic is a plain static file (``static/pwa/sw.js``) that ships with
+collectstatic like any other asset. A worker only controls pages below its own
+URL, so ``/sw.js`` is a small view that hands it the configuration (cache
+version, app shell, URL patterns) and then imports the static script.
+
+Cache names carry a version: ``PWA_CACHE_VERSION`` when the deploy pins one,
+otherwise a digest of every static file and of the CDN bundles, so any deploy
+that changes an asset retires the caches of the previous one.
+
+The catalog and availability rules cover the JSON API only: the home and
+booking pages render both server-side and never call it.
+
+Pages rendered for a logged-in user are marked ``no-store`` (see
+``PrivatePagesMiddleware``), so neither the browser nor the worker keeps a copy
+that the next person using the device could be shown.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+
+# Third-party bundles referenced by the templates, precached with the app shell.
+CDN_ASSETS = (
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css",
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js",
+    "https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.css",
+    "https://cdn.jsdelivr.net/npm/jquery@3.7.1/dist/jquery.min.js",
+    "https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/css/select2.min.css",
+    "https://cdn.jsdelivr.net/npm/select2@4.1.0-rc.0/dist/js/select2.min.js",
+    "https://cdn.jsdelivr.net/npm/select2-bootstrap-5-theme@1.3.0/dist/select2-bootstrap-5-theme.min.css",
+)
+STATIC_ASSETS = (
+    "css/styles.css",
+    "img/hero-placeholder.svg",
+    "img/story-placeholder.svg",
+    "img/icon-192.png",
+    "img/icon-512.png",
+)
+ICON_SIZES = (192, 512)
+THEME_COLOR = "#ee789d"
+BACKGROUND_COLOR = "#fdfdfd"
+
+
+@lru_cache(maxsize=1)
+def static_digest() -> tuple[str, int]:
+    """Digest of every file the static finders collect, and how many there are."""
+
+    digest = hashlib.sha256("\n".join(CDN_ASSETS).encode())
+    count = 0
+    for finder in finders.get_finders():
+        for path, storage in sorted(finder.list(["CVS", ".*", "*~"]), key=lambda item: item[0]):
+            digest.update(path.encode())
+            with storage.open(path) as handle:
+                digest.update(handle.read())
+            count += 1
+    return digest.hexdigest()[:12], count
+
+
+def cache_version() -> str:
+    return getattr(settings, "PWA_CACHE_VERSION", "") or static_digest()[0]
+
+
+def _route(name: str) -> str:
+    """Regex for ``core:<name>`` on the default branch and under every ``/sucursales/<slug>/``."""
+
+    plain = re.escape(reverse(f"core:{name}"))
+    scoped = re.escape(reverse(f"core:branch:{name}", kwargs={"branch": "slug"})).replace("slug", "[^/]+", 1)
+    return f"^(?:{plain}|{scoped})$"
+
+
+def worker_config() -> dict:
+    return {
+        "version": cache_version(),
+        "shell": [*CDN_ASSETS, *(static(path) for path in STATIC_ASSETS)],
+        "static": settings.STATIC_URL,
+        "gallery": f"{settings.MEDIA_URL}gallery/",
+        "pages": [_route("home")],
+        "catalog": [f"^{re.escape(reverse('core:api_services'))}$"],
+        "availability": [f"^{re.escape(reverse('core:api_availability'))}$"],
+        "availabilityTtl": getattr(settings, "PWA_AVAILABILITY_TTL", 300),
+        "logout": reverse("logout"),
+    }
+
+
+def worker_script() -> str:
+    config = worker_config()
+    script = f"{static('pwa/sw.js')}?v={config['version']}"
+    return f"self.PWA = {json.dumps(config)};\nimportScripts({json.dumps(script)});\n"
+
+
+def manifest() -> dict:
+    return {
+        "name": settings.COMPANY_NAME,
+        "short_name": settings.COMPANY_NAME,
+        "lang": "es-AR",
+        "start_url": reverse("core:home"),
+        "scope": reverse("core:home"),
+        "display": "standalone",
+        "theme_color": THEME_COLOR,
+        "background_color": BACKGROUND_COLOR,
+        "icons": [
+            {"src": static(f"img/icon-{size}.png"), "sizes": f"{size}x{size}", "type": "image/png", "purpose": "any"}
+            for size in ICON_SIZES
+        ],
+        "shortcuts": [{"name": "Reservar turno", "url": reverse("core:appointments")}],
+    }
+
+
+class PrivatePagesMiddleware:
+    """Keep HTML rendered for a logged-in user out of every cache, the service worker's included."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.user.is_authenticated
+            and not response.has_header("Cache-Control")
+            and response.get("Content-Type", "").startswith("text/html")
+        ):
+            patch_cache_control(response, private=True, no_store=True)
+        return response
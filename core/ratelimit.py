@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import math
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpRequest, HttpResponse
+
+RATE_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@dataclass(frozen=True)
+class Rate:
+    """Token bucket definition: ``capacity`` tokens refilled over ``period`` seconds."""
+
+    capacity: int
+    period: int
+
+    @classmethod
+    def parse(cls, value: str) -> Rate:
+        count, _, unit = value.partition("/")
+        return cls(capacity=int(count), period=RATE_PERIODS[unit[:1] or "m"])
+
+    @property
+    def refill_per_second(self) -> float:
+        return self.capacity / self.period
+
+
+def _endpoint_rate(endpoint: str) -> Rate | None:
+    if not getattr(settings, "RATELIMIT_ENABLED", True):
+        return None
+    value = getattr(settings, "RATELIMITS", {}).get(endpoint)
+    return Rate.parse(value) if value else None
+
+
+def client_ip(request: HttpRequest) -> str:
+    header = getattr(settings, "RATELIMIT_IP_HEADER", "REMOTE_ADDR")
+    value = request.META.get(header) or request.META.get("REMOTE_ADDR") or "unknown"
+    # X-Forwarded-For style headers grow to the right: each proxy appends the
+    # address it saw. Entries left of our own proxies come from the client and
+    # can be anything, so take the one added by the outermost trusted proxy.
+    hops = max(getattr(settings, "RATELIMIT_TRUSTED_PROXIES", 1), 1)
+    addresses = [part.strip() for part in value.split(",") if part.strip()] or ["unknown"]
+    return addresses[-min(hops, len(addresses))]
+
+
+def bucket_keys(request: HttpRequest, endpoint: str) -> list[str]:
+    keys = [f"rl:{endpoint}:ip:{client_ip(request)}"]
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        keys.append(f"rl:{endpoint}:user:{user.pk}")
+    return keys
+
+
+# Seconds a bucket lock survives a worker that died while holding it. Only
+# requests that still see a token wait for it; rejections never do.
+LOCK_TIMEOUT = 1
+
+
+@contextmanager
+def _locked(cache, keys: list[str]):
+    """Hold ``cache.add`` locks on ``keys`` (in a fixed order, so two requests never deadlock)."""
+
+    held = []
+    try:
+        for key in sorted(keys):
+            lock = f"{key}:lock"
+            deadline = time.monotonic() + LOCK_TIMEOUT
+            while not cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.001)
+            else:
+                held.append(lock)
+        yield
+    finally:
+        cache.delete_many(held)
+
+
+def _tokens(state, rate: Rate, now: float) -> float:
+    if state is None:
+        return float(rate.capacity)
+    tokens, stamp = state
+    return min(float(rate.capacity), tokens + (now - stamp) * rate.refill_per_second)
+
+
+def _wait(states: dict, keys: list[str], rate: Rate, now: float) -> float:
+    """Seconds until every bucket in ``keys`` has a token (``0`` when they all do)."""
+
+    missing = [1 - _tokens(states.get(key), rate, now) for key in keys]
+    return max((value / rate.refill_per_second for value in missing if value > 0), default=0.0)
+
+
+def consume(keys: list[str], rate: Rate) -> float:
+    """Take one token from every bucket in ``keys``, or from none of them.
+
+    Returns ``0`` when the request is allowed, otherwise the number of seconds
+    until every bucket has a token again. An empty bucket is rejected from a
+    lock-free read, so a flood costs one cache read per request; the buckets
+    are only written under a lock, so parallel requests cannot spend the same
+    token twice.
+    """
+
+    cache = caches[getattr(settings, "RATELIMIT_CACHE", "default")]
+    retry_after = _wait(cache.get_many(keys), keys, rate, time.time())
+    if retry_after:
+        return retry_after
+    with _locked(cache, keys):
+        now = time.time()
+        states = cache.get_many(keys)
+        retry_after = _wait(states, keys, rate, now)
+        if retry_after:
+            return retry_after
+        tokens = {key: _tokens(states.get(key), rate, now) for key in keys}
+        # An expired bucket is indistinguishable from a full one, so the entry only
+        # needs to live as long as a full refill takes.
+        cache.set_many({key: (value - 1, now) for key, value in tokens.items()}, timeout=rate.period)
+    return 0.0
+
+
+def check_request(request: HttpRequest, endpoint: str) -> HttpResponse | None:
+    """Return a 429 response when ``request`` exceeds the limit for ``endpoint``."""
+
+    methods = getattr(settings, "RATELIMIT_METHODS", ("POST",))
+    if request.method not in methods:
+        return None
+    rate = _endpoint_rate(endpoint)
+    if rate is None:
+        return None
+    retry_after = consume(bucket_keys(request, endpoint), rate)
+    if not retry_after:
+        return None
+    response = HttpResponse(
+        "Recibimos demasiadas solicitudes desde tu conexión. Probá nuevamente en unos minutos.",
+        status=429,
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def ratelimit(endpoint: str):
+    """Reject requests over the ``RATELIMITS[endpoint]`` budget before the view runs."""
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request: HttpRequest, *args, **kwargs):
+            rejection = check_request(request, endpoint)
+            if rejection is not None:
+                return rejection
+            return view_func(request, *args, **kwargs)
+
+        _wrapped.ratelimited = True
+        return _wrapped
+
+    return decorator
+
+
+class RateLimitMiddleware:
+    """Apply ``RATELIMITS`` to any URL name that is not already decorated.
+
+    Keys in ``RATELIMITS`` are URL names as returned by ``resolver_match.view_name``
+    (``"core:home"``, ``"login"``), so third party views such as Django's login can be
+    throttled without touching their code.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.get_response(request)
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs):
+        if getattr(view_func, "ratelimited", False) or request.resolver_match is None:
+            return None
+        return check_request(request, request.resolver_match.view_name)
@@ -0,0 +1,222 @@
+"""Match bank / Mercado Pago statements against pending deposits.
+
+The statement is parsed as a stream, every line is looked up in an in-memory
+index of pending appointments keyed by normalized payment reference, and all
+matches are verified with one bulk update. Nothing is queried per line.
+
+Only a line that shares the whole reference or a payment id with exactly one
+deposit of the right amount is verified automatically; lines that only share
+loose words go to the review queue.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import changes, events, markers, metrics
+from .models import Appointment, ReconciliationItem, ReconciliationRun
+
+# Column names seen in each export, in order of preference (compared case-insensitively).
+COLUMNS = {
+    ReconciliationRun.Source.BANK: {
+        "reference": ("referencia", "reference", "comprobante", "nro. comprobante", "concepto", "descripcion", "descripción"),
+        "amount": ("importe", "monto", "amount", "credito", "crédito"),
+    },
+    ReconciliationRun.Source.MERCADOPAGO: {
+        "reference": ("external_reference", "source_id", "operation_id", "id de operación", "referencia"),
+        "amount": ("transaction_amount", "gross_amount", "settlement_net_amount", "monto", "importe"),
+    },
+}
+
+_NON_ALNUM = re.compile(r"[^0-9A-Z]")
+_NON_DIGIT = re.compile(r"\D")
+_TOKENS = re.compile(r"[\s,;/|]+")
+MIN_TOKEN_LENGTH = 4
+# Shared tokens this long and containing a digit are payment ids; shorter or
+# all-letter ones ("TRANSFERENCIA", "BANCO", first names) only suggest a match.
+MIN_ID_LENGTH = 5
+
+
+def normalize_reference(value: str) -> str:
+    return _NON_ALNUM.sub("", (value or "").upper())
+
+
+def reference_keys(value: str) -> set[str]:
+    """The whole reference plus each token and its digits.
+
+    Both sides are expanded, so a client reference "TRF-0012345" and a bank
+    line "TRANSF 0012345 ANA" meet on "0012345".
+    """
+
+    keys = {normalize_reference(value)}
+    for token in _TOKENS.split(value or ""):
+        keys.add(normalize_reference(token))
+        keys.add(_NON_DIGIT.sub("", token))
+    return {key for key in keys if len(key) >= MIN_TOKEN_LENGTH}
+
+
+def is_id(key: str) -> bool:
+    return len(key) >= MIN_ID_LENGTH and any(char.isdigit() for char in key)
+
+
+def parse_amount(value: str) -> Decimal | None:
+    text = (value or "").strip().replace("$", "").replace(" ", "")
+    if not text:
+        return None
+    if "," in text and "." in text:
+        # Whichever separator comes last is the decimal one: 1.500,00 or 1,500.00
+        text = text.replace(".", "").replace(",", ".") if text.rfind(",") > text.rfind(".") else text.replace(",", "")
+    elif "," in text:
+        text = text.replace(",", ".")
+    try:
+        return abs(Decimal(text))
+    except InvalidOperation:
+        return None
+
+
+@dataclass
+class StatementLine:
+    number: int
+    reference: str
+    amount: Decimal
+
+
+def _pick(header: list[str], candidates: tuple[str, ...]) -> int | None:
+    lowered = [column.strip().lower() for column in header]
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered.index(candidate)
+    return None
+
+
+def read_statement(stream: io.TextIOBase, source: str):
+    """Yield ``StatementLine`` objects from a CSV export without loading it whole."""
+
+    first = stream.readline()
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    header = next(csv.reader([first], delimiter=delimiter))
+    reference_column = _pick(header, COLUMNS[source]["reference"])
+    amount_column = _pick(header, COLUMNS[source]["amount"])
+    if reference_column is None or amount_column is None:
+        raise ValueError("No se encontraron las columnas de referencia y monto en el extracto.")
+    for number, row in enumerate(csv.reader(stream, delimiter=delimiter), start=2):
+        if len(row) <= max(reference_column, amount_column):
+            continue
+        amount = parse_amount(row[amount_column])
+        if amount is None:
+            continue
+        yield StatementLine(number=number, reference=row[reference_column].strip(), amount=amount)
+
+
+@dataclass(frozen=True)
+class PendingDeposit:
+    pk: int
+    user_id: int
+    branch_id: int
+    amount: Decimal
+    reference: str  # normalized
+
+
+def build_index() -> dict[str, list[PendingDeposit]]:
+    index: dict[str, list[PendingDeposit]] = defaultdict(list)
+    pending = (
+        Appointment.objects.filter(deposit_status=Appointment.DepositStatus.PENDING)
+        .exclude(status=Appointment.STATUS_CANCELLED)
+        .exclude(payment_reference="")
+        .order_by()
+        .values_list("pk", "user_id", "branch_id", "deposit_amount", "payment_reference")
+    )
+    for pk, user_id, branch_id, amount, reference in pending.iterator(chunk_size=2000):
+        deposit = PendingDeposit(pk, user_id, branch_id, amount, normalize_reference(reference))
+        for key in reference_keys(reference):
+            index[key].append(deposit)
+    return index
+
+
+def reconcile(stream: io.TextIOBase, source: str, user=None, filename: str = "") -> ReconciliationRun:
+    started = time.perf_counter()
+    tolerance = Decimal(str(getattr(settings, "RECONCILIATION_AMOUNT_TOLERANCE", "1.00")))
+    index = build_index()
+    matched: dict[int, PendingDeposit] = {}
+    review: list[tuple[StatementLine, str, list[int]]] = []
+    total = unmatched = 0
+
+    for line in read_statement(stream, source):
+        total += 1
+        whole = normalize_reference(line.reference)
+        found: dict[int, PendingDeposit] = {}
+        strong: set[int] = set()
+        for key in reference_keys(line.reference):
+            for deposit in index.get(key, ()):
+                found[deposit.pk] = deposit
+                if is_id(key) or key == whole == deposit.reference:
+                    strong.add(deposit.pk)
+        fitting = [deposit for deposit in found.values() if abs(deposit.amount - line.amount) <= tolerance]
+        if not strong and not fitting:
+            # Only generic words in common and a different amount: not this deposit.
+            unmatched += 1
+        elif len(fitting) == 1 and fitting[0].pk not in strong:
+            review.append((line, ReconciliationItem.Reason.WEAK, [fitting[0].pk]))
+        elif len(fitting) == 1 and fitting[0].pk not in matched:
+            matched[fitting[0].pk] = fitting[0]
+        elif len(fitting) == 1:
+            review.append((line, ReconciliationItem.Reason.DUPLICATE, [fitting[0].pk]))
+        elif fitting:
+            review.append((line, ReconciliationItem.Reason.MULTIPLE, [deposit.pk for deposit in fitting]))
+        else:
+            review.append((line, ReconciliationItem.Reason.AMOUNT, sorted(strong)))
+
+    with transaction.atomic():
+        verified = 0
+        ids = list(matched)
+        for start in range(0, len(ids), 500):
+            verified += Appointment.objects.filter(
+                pk__in=ids[start:start + 500],
+                deposit_status=Appointment.DepositStatus.PENDING,
+            ).update(
+                deposit_status=Appointment.DepositStatus.VERIFIED,
+                status=Appointment.STATUS_CONFIRMED,
+                deposit_verified_by=user,
+                deposit_verified_at=timezone.now(),
+            )
+        run = ReconciliationRun.objects.create(
+            source=source,
+            filename=filename[:255],
+            created_by=user,
+            total_lines=total,
+            matched=verified,
+            ambiguous=len(review),
+            unmatched=unmatched,
+            duration_ms=int((time.perf_counter() - started) * 1000),
+        )
+        items = ReconciliationItem.objects.bulk_create(
+            ReconciliationItem(run=run, line_number=line.number, reference=line.reference[:255], amount=line.amount,
+                               reason=reason)
+            for line, reason, _ in review
+        )
+        ReconciliationItem.candidates.through.objects.bulk_create(
+            ReconciliationItem.candidates.through(reconciliationitem_id=item.pk, appointment_id=pk)
+            for item, (_, _, candidates) in zip(items, review)
+            for pk in candidates
+        )
+
+    if matched:
+        # Bulk updates skip signals, so move the change markers by hand.
+        markers.touch(
+            "bookings",
+            *{markers.scoped("bookings", deposit.branch_id) for deposit in matched.values()},
+            *{f"bookings:user:{deposit.user_id}" for deposit in matched.values()},
+        )
+        changes.record_many(Appointment, matched)
+        metrics.inc("deposits_verified_total", verified, source="reconciliation")
+        events.publish("appointment", "verified", pks=list(matched))
+    return run
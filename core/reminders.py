@@ -0,0 +1,223 @@
+"""Appointment reminders, 24 hours and 2 hours before the booking.
+
+Every tick looks only at the appointments whose start falls inside a reminder
+window (a range query served by ``appointment_start_idx``) and that have no
+ledger row for that window yet. Rows are claimed in the ledger before anything
+is sent: the unique (appointment, kind) constraint means overlapping workers and
+re-runs never send the same reminder twice. Failed sends are claimed again on
+later ticks up to ``REMINDER_MAX_ATTEMPTS``, and a claim still "sending" after
+``REMINDER_CLAIM_TIMEOUT_MINUTES`` (a worker died mid-send) counts as a failure.
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import branches, metrics
+from .models import Appointment, AppointmentReminder, TimeSlot
+
+logger = logging.getLogger(__name__)
+
+# Minutes before the appointment each reminder goes out, widest first.
+WINDOWS = (
+    (AppointmentReminder.Kind.DAY_BEFORE, 24 * 60),
+    (AppointmentReminder.Kind.SAME_DAY, 2 * 60),
+)
+
+
+@dataclass
+class Reminder:
+    appointment: Appointment
+    kind: str
+
+    @property
+    def starts_at(self) -> datetime:
+        return datetime.combine(self.appointment.appointment_date, TimeSlot.to_time(self.appointment.appointment_time))
+
+    @property
+    def subject(self) -> str:
+        when = "mañana" if self.kind == AppointmentReminder.Kind.DAY_BEFORE else "hoy"
+        return f"Recordatorio: tu turno de {self.appointment.service.name} es {when} a las {self.appointment.appointment_time}"
+
+    @property
+    def body(self) -> str:
+        appointment = self.appointment
+        lines = [
+            f"Hola {appointment.user.first_name or appointment.user.username},",
+            "",
+            f"Te esperamos el {appointment.appointment_date:%d/%m} a las {appointment.appointment_time} "
+            f"para {appointment.service.name}.",
+        ]
+        if appointment.resource_id:
+            lines.append(f"Te atiende: {appointment.resource.name}.")
+        branch = branches.by_pk(appointment.branch_id)
+        lines += [
+            f"Dirección: {branch.address or settings.COMPANY_ADDRESS}",
+            "",
+            f"Si no podés venir, avisanos al {branch.phone or settings.COMPANY_PHONE}.",
+            settings.COMPANY_NAME,
+        ]
+        return "\n".join(lines)
+
+
+class EmailChannel:
+    """Sends every reminder of a batch over a single mail connection."""
+
+    name = "email"
+
+    def send(self, reminders: list[Reminder]) -> dict[int, tuple[str, str]]:
+        results = {}
+        messages = []
+        for reminder in reminders:
+            email = reminder.appointment.user.email
+            if not email:
+                results[reminder.appointment.pk] = (AppointmentReminder.Status.SKIPPED, "Sin email")
+                continue
+            messages.append((reminder.appointment.pk, EmailMessage(reminder.subject, reminder.body, to=[email])))
+        if messages:
+            try:
+                get_connection().send_messages([message for _, message in messages])
+            except Exception as exc:  # the whole batch shares the connection
+                logger.exception("Reminder batch failed")
+                status = (AppointmentReminder.Status.FAILED, str(exc)[:255])
+            else:
+                status = (AppointmentReminder.Status.SENT, "")
+            results.update((pk, status) for pk, _ in messages)
+        return results
+
+
+def max_attempts() -> int:
+    return getattr(settings, "REMINDER_MAX_ATTEMPTS", 3)
+
+
+def get_channel():
+    return import_string(getattr(settings, "REMINDER_CHANNEL", "core.reminders.EmailChannel"))()
+
+
+def _start_range(start: datetime, end: datetime) -> Q:
+    """Appointments starting in ``(start, end]``; "HH:MM" strings sort like times."""
+
+    first_day, first_time = start.date(), start.strftime("%H:%M")
+    last_day, last_time = end.date(), end.strftime("%H:%M")
+    if first_day == last_day:
+        return Q(appointment_date=first_day, appointment_time__gt=first_time, appointment_time__lte=last_time)
+    return (
+        Q(appointment_date=first_day, appointment_time__gt=first_time)
+        | Q(appointment_date__gt=first_day, appointment_date__lt=last_day)
+        | Q(appointment_date=last_day, appointment_time__lte=last_time)
+    )
+
+
+def _retryable(before: datetime) -> Q:
+    """Failed rows with attempts left, claimed before ``before`` (never twice in one tick)."""
+
+    return Q(status=AppointmentReminder.Status.FAILED, attempts__lt=max_attempts(), claimed_at__lt=before)
+
+
+def due(kind: str, now: datetime | None = None, retry_before: datetime | None = None):
+    """Appointments that enter the ``kind`` window and were not handled yet (or failed).
+
+    The window stops where the next, narrower one begins, so a worker catching
+    up after downtime sends only the most relevant reminder.
+    """
+
+    now = now or timezone.localtime().replace(tzinfo=None)
+    minutes = dict(WINDOWS)
+    narrower = [value for _, value in WINDOWS if value < minutes[kind]]
+    lower = now + timedelta(minutes=max(narrower, default=0))
+    upper = now + timedelta(minutes=minutes[kind])
+    handled = AppointmentReminder.objects.filter(appointment=OuterRef("pk"), kind=kind).exclude(
+        _retryable(retry_before or timezone.now())
+    )
+    return (
+        Appointment.objects.filter(_start_range(lower, upper))
+        .exclude(status=Appointment.STATUS_CANCELLED)
+        .filter(~Exists(handled))
+        .select_related("user", "service", "resource")
+        .order_by("appointment_date", "appointment_time")
+    )
+
+
+def release_stale(now: datetime | None = None) -> int:
+    """Mark claims stuck in "sending" past the timeout as failed, so they can be retried."""
+
+    now = now or timezone.now()
+    cutoff = now - timedelta(minutes=getattr(settings, "REMINDER_CLAIM_TIMEOUT_MINUTES", 10))
+    return AppointmentReminder.objects.filter(status=AppointmentReminder.Status.SENDING, claimed_at__lt=cutoff).update(
+        status=AppointmentReminder.Status.FAILED, detail="El envío quedó sin confirmar"
+    )
+
+
+def claim(kind: str, appointments: list[Appointment], channel: str, retry_before: datetime | None = None) -> set[int]:
+    """Insert (or re-take failed) ledger rows for ``appointments``; return the ids this worker won."""
+
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    # Conditional on the row still being failed, so only one worker re-takes it.
+    AppointmentReminder.objects.filter(
+        _retryable(retry_before or now), appointment__in=appointments, kind=kind
+    ).update(status=AppointmentReminder.Status.SENDING, channel=channel, claim=token, claimed_at=now,
+             attempts=F("attempts") + 1, detail="")
+    AppointmentReminder.objects.bulk_create(
+        [AppointmentReminder(appointment=appointment, kind=kind, channel=channel, claim=token) for appointment in appointments],
+        ignore_conflicts=True,
+    )
+    return set(AppointmentReminder.objects.filter(claim=token).values_list("appointment_id", flat=True))
+
+
+def run_tick(now: datetime | None = None, channel=None, batch_size: int | None = None) -> dict[str, int]:
+    """Send every reminder that is due; returns how many were handed to the channel per window."""
+
+    now = now or timezone.localtime().replace(tzinfo=None)
+    channel = channel or get_channel()
+    batch_size = batch_size or getattr(settings, "REMINDER_BATCH_SIZE", 100)
+    started = timezone.now()
+    release_stale(started)
+    totals: dict[str, int] = {}
+    for kind, minutes in WINDOWS:
+        totals[kind] = 0
+        while batch := list(due(kind, now, retry_before=started)[:batch_size]):
+            won = claim(kind, batch, channel.name, retry_before=started)
+            reminders, results = [], {}
+            for appointment in batch:
+                if appointment.pk not in won:
+                    continue
+                reminder = Reminder(appointment, kind)
+                if timezone.make_aware(reminder.starts_at) - appointment.created_at < timedelta(minutes=minutes):
+                    # Booked inside the window: the booking confirmation already covered it.
+                    results[appointment.pk] = (AppointmentReminder.Status.SKIPPED, "Reservado dentro de la ventana")
+                else:
+                    reminders.append(reminder)
+            if reminders:
+                try:
+                    results.update(channel.send(reminders))
+                except Exception as exc:
+                    # Record the failure instead of leaving the batch "sending"; a later tick retries it.
+                    logger.exception("Reminder channel %s failed", channel.name)
+                    results.update(
+                        (reminder.appointment.pk, (AppointmentReminder.Status.FAILED, str(exc)[:255]))
+                        for reminder in reminders
+                    )
+            _record(kind, results)
+            totals[kind] += len(reminders)
+    return totals
+
+
+def _record(kind: str, results: dict[int, tuple[str, str]]) -> None:
+    now = timezone.now()
+    by_status: dict[tuple[str, str], list[int]] = {}
+    for pk, outcome in results.items():
+        by_status.setdefault(outcome, []).append(pk)
+    for (status, detail), pks in by_status.items():
+        AppointmentReminder.objects.filter(appointment_id__in=pks, kind=kind).update(
+            status=status, detail=detail, sent_at=now if status == AppointmentReminder.Status.SENT else None
+        )
+        metrics.inc("reminders_total", len(pks), kind=kind, status=status)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+
+from . import branches, markers, metrics
+from .models import OpeningHours, ScheduleException, TimeSlot
+
+MARKER = "schedule"
+
+# The default timetable: one hour slots from 09:00 to 18:00, every day.
+DEFAULT_BLOCKS = ((TimeSlot.to_time(TimeSlot.H09), time(19, 0), 60),)
+
+
+def expand(blocks) -> tuple[str, ...]:
+    """Turn ``(opens, closes, minutes)`` blocks into ``"HH:MM"`` slot start times."""
+
+    slots = []
+    for opens_at, closes_at, minutes in blocks:
+        cursor = datetime.combine(date.min, opens_at)
+        closing = datetime.combine(date.min, closes_at)
+        step = timedelta(minutes=minutes)
+        while cursor + step <= closing:
+            slots.append(cursor.strftime("%H:%M"))
+            cursor += step
+    return tuple(sorted(set(slots)))
+
+
+class CompiledSchedule:
+    """Opening hours and exceptions flattened into per-date slot tuples.
+
+    Built from two queries and then answered from memory; slot lists are memoised
+    per date so repeated lookups across a date range cost a dict access.
+    """
+
+    def __init__(self, weekly: dict[int, tuple[str, ...]] | None, exceptions: dict[date, tuple[tuple[str, ...], str]]):
+        self.weekly = weekly
+        self.exceptions = exceptions
+        self._by_date: dict[date, tuple[str, ...]] = {}
+
+    @classmethod
+    def build(cls, branch_id: int) -> CompiledSchedule:
+        blocks: dict[int, list] = {}
+        for hours in OpeningHours.objects.filter(branch_id=branch_id):
+            blocks.setdefault(hours.weekday, []).append((hours.opens_at, hours.closes_at, hours.slot_minutes))
+        weekly = {weekday: expand(blocks.get(weekday, ())) for weekday in range(7)} if blocks else None
+        exceptions = {}
+        for exception in ScheduleException.objects.filter(branch_id=branch_id, date__gte=date.today() - timedelta(days=1)):
+            if exception.is_closed:
+                slots = ()
+            else:
+                slots = expand([(exception.opens_at, exception.closes_at, exception.slot_minutes)])
+            exceptions[exception.date] = (slots, exception.note)
+        return cls(weekly, exceptions)
+
+    def slots_for(self, day: date) -> tuple[str, ...]:
+        if day not in self._by_date:
+            if day in self.exceptions:
+                slots = self.exceptions[day][0]
+            elif self.weekly is None:
+                slots = expand(DEFAULT_BLOCKS)
+            else:
+                slots = self.weekly[day.weekday()]
+            self._by_date[day] = slots
+        return self._by_date[day]
+
+    def slots_between(self, start: date, end: date) -> dict[date, tuple[str, ...]]:
+        return {start + timedelta(days=offset): self.slots_for(start + timedelta(days=offset))
+                for offset in range((end - start).days + 1)}
+
+    def note_for(self, day: date) -> str:
+        exception = self.exceptions.get(day)
+        return exception[1] if exception else ""
+
+    def every_slot(self) -> tuple[str, ...]:
+        """Union of all slots, for validating times when no date is known."""
+
+        slots = set(expand(DEFAULT_BLOCKS)) if self.weekly is None else set()
+        for day_slots in (self.weekly or {}).values():
+            slots.update(day_slots)
+        for day_slots, _ in self.exceptions.values():
+            slots.update(day_slots)
+        return tuple(sorted(slots))
+
+
+# Branch id -> (schedule, marker version, build date).
+_compiled: dict[int, tuple[CompiledSchedule, float, date]] = {}
+
+
+def get_schedule(branch_id: int | None = None) -> CompiledSchedule:
+    """Return the process-wide compiled schedule of a branch, rebuilding it after edits.
+
+    Edits bump the branch's ``schedule`` change marker in the default cache (see
+    ``invalidate``), and an edit in one branch leaves the others cached. Workers
+    only see each other's edits when that cache is shared (Redis/Memcached); with
+    the process-local default, ``check --deploy`` warns (``core.W001``).
+    """
+
+    branch_id = branch_id or branches.default().pk
+    version = markers.get(markers.scoped(MARKER, branch_id))
+    today = date.today()
+    cached = _compiled.get(branch_id)
+    if cached is None or cached[1] != version or cached[2] != today:
+        metrics.inc("app_cache_requests_total", cache="schedule", result="miss")
+        cached = _compiled[branch_id] = (CompiledSchedule.build(branch_id), version, today)
+    else:
+        metrics.inc("app_cache_requests_total", cache="schedule", result="hit")
+    return cached[0]
+
+
+def invalidate(instance, **kwargs):
+    return markers.touch(MARKER, markers.scoped(MARKER, instance.branch_id))
+
+
+def slots_for(day: date, branch_id: int | None = None) -> list[str]:
+    return list(get_schedule(branch_id).slots_for(day))
@@ -0,0 +1,59 @@
+"""Session and flash message storage that keeps anonymous traffic off the database.
+
+Sessions use the ``db`` engine unless the default cache is shared (see
+settings.py); only then is ``cached_db`` selected, serving logged-in page views
+from the cache and writing through to ``django_session``. A per-process cache
+would keep serving a session that was logged out on another worker.
+
+Flash messages travel in a signed cookie; only visitors who already have a
+session may overflow into it, so an anonymous contact form never creates a
+session row. Expired rows are removed by ``manage.py sweep_sessions`` in small
+batches, keeping each SQLite write lock short enough not to stall bookings.
+"""
+from __future__ import annotations
+
+import time
+from datetime import datetime
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.utils import timezone
+
+
+class MessageStorage(FallbackStorage):
+    """Cookie first, session fallback only for requests that already carry a session."""
+
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            # CookieStorage drops the oldest messages when they do not fit, which beats a session per visitor.
+            self.storages = [storage for storage in self.storages if isinstance(storage, CookieStorage)]
+
+
+def session_model():
+    """The model behind ``SESSION_ENGINE``, or ``None`` for engines without a table."""
+
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    return store.get_model_class() if hasattr(store, "get_model_class") else None
+
+
+def clear_expired(batch_size: int = 1000, pause: float = 0.0, now: datetime | None = None) -> int:
+    """Delete expired sessions ``batch_size`` at a time; returns how many were removed.
+
+    Cached copies are left alone: they expire from the cache on their own timeout.
+    """
+
+    model = session_model()
+    if model is None:
+        return 0
+    now = now or timezone.now()
+    removed = 0
+    while batch := list(model.objects.filter(expire_date__lt=now).values_list("pk", flat=True)[:batch_size]):
+        removed += model.objects.filter(pk__in=batch).delete()[0]
+        if len(batch) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return removed
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from . import branches, changes, events, markers, schedule
+from .models import (Appointment, Branch, ChangeLogEntry, ContactMessage, GalleryImage, MediaBlob, OpeningHours, Resource,
+                     ResourceSchedule, Review, ScheduleException, Service, ServicePromotion)
+
+for model in (OpeningHours, ScheduleException):
+    post_save.connect(schedule.invalidate, sender=model, dispatch_uid=f"schedule-save-{model.__name__}")
+    post_delete.connect(schedule.invalidate, sender=model, dispatch_uid=f"schedule-delete-{model.__name__}")
+
+
+post_save.connect(branches.invalidate, sender=Branch, dispatch_uid="branches-save")
+post_delete.connect(branches.invalidate, sender=Branch, dispatch_uid="branches-delete")
+
+
+# Every marker moves globally and for the branch, so one branch's edits leave the others' caches warm.
+def touch_catalog(sender, instance, **kwargs):
+    branch_id = instance.branch_id if sender is Service else instance.service.branch_id
+    markers.touch("catalog", markers.scoped("catalog", branch_id))
+
+
+def touch_resources(sender, instance, **kwargs):
+    # ResourceSchedule saves, or Resource/Service on either side of the m2m.
+    branch_id = instance.resource.branch_id if isinstance(instance, ResourceSchedule) else instance.branch_id
+    markers.touch("resources", markers.scoped("resources", branch_id))
+
+
+def touch_bookings(instance, **kwargs):
+    markers.touch("bookings", markers.scoped("bookings", instance.branch_id), f"bookings:user:{instance.user_id}")
+
+
+for model, receiver in ((Service, touch_catalog), (ServicePromotion, touch_catalog), (Resource, touch_resources), (ResourceSchedule, touch_resources),
+                        (Appointment, touch_bookings)):
+    post_save.connect(receiver, sender=model, dispatch_uid=f"marker-save-{model.__name__}")
+    post_delete.connect(receiver, sender=model, dispatch_uid=f"marker-delete-{model.__name__}")
+
+m2m_changed.connect(touch_resources, sender=Resource.services.through, dispatch_uid="marker-m2m-Resource.services")
+
+
+LIVE_KINDS = {Appointment: "appointment", ContactMessage: "contact", Review: "review"}
+
+
+def publish_saved(sender, instance, created, **kwargs):
+    # Only the key: streams build the row with events.item_for, once, if a dashboard is open.
+    events.publish_on_commit(
+        LIVE_KINDS[sender], "created" if created else "updated", branch=getattr(instance, "branch_id", None), pk=instance.pk
+    )
+
+
+def publish_deleted(sender, instance, **kwargs):
+    kind = LIVE_KINDS[sender]
+    events.publish_on_commit(kind, "deleted", branch=getattr(instance, "branch_id", None), item={"pk": instance.pk})
+
+
+for model in LIVE_KINDS:
+    post_save.connect(publish_saved, sender=model, dispatch_uid=f"live-save-{model.__name__}")
+    post_delete.connect(publish_deleted, sender=model, dispatch_uid=f"live-delete-{model.__name__}")
+
+
+def remember_gallery_blob(sender, instance, **kwargs):
+    instance._previous_image = ""
+    if instance.pk and not instance._state.adding:
+        instance._previous_image = (
+            GalleryImage.objects.filter(pk=instance.pk).values_list("image", flat=True).first() or ""
+        )
+
+
+def count_gallery_blob(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_image", "")
+    if instance.image.name != previous:
+        if instance.image.name:
+            MediaBlob.retain(instance.image.name, instance.image.storage)
+        MediaBlob.release(previous)
+
+
+def release_gallery_blob(sender, instance, **kwargs):
+    MediaBlob.release(instance.image.name)
+
+
+pre_save.connect(remember_gallery_blob, sender=GalleryImage, dispatch_uid="blob-remember-GalleryImage")
+post_save.connect(count_gallery_blob, sender=GalleryImage, dispatch_uid="blob-count-GalleryImage")
+post_delete.connect(release_gallery_blob, sender=GalleryImage, dispatch_uid="blob-release-GalleryImage")
+
+
+def log_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return  # logins are not a change downstream systems care about
+    changes.record(instance)
+
+
+def log_deleted(sender, instance, **kwargs):
+    changes.record(instance, ChangeLogEntry.Action.DELETE)
+
+
+for model in changes.tracked_models().values():
+    post_save.connect(log_saved, sender=model, dispatch_uid=f"changelog-save-{model.__name__}")
+    post_delete.connect(log_deleted, sender=model, dispatch_uid=f"changelog-delete-{model.__name__}")
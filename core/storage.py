@@ -0,0 +1,91 @@
+"""Content-addressed file storage for gallery uploads.
+
+Uploads are copied chunk by chunk into a temporary file while being hashed, then
+moved to ``<upload_to>/<aa>/<sha256><ext>``. Identical photos end up as one blob,
+names never collide, and a name can never point at different bytes later, so
+their URLs are safe to cache forever. ``MediaBlob`` rows count how many gallery
+rows use each blob; ``manage.py gc_media`` removes the ones nobody uses.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+INCOMING_DIR = ".incoming"
+BLOB_NAME = re.compile(r"(?:^|/)[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?:\.[0-9a-z]+)?$")
+
+
+def digest_from_name(name: str) -> str | None:
+    match = BLOB_NAME.search(name or "")
+    return match.group("digest") if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name is derived from the content in _save, so nothing can clash.
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        incoming = Path(self.location) / INCOMING_DIR
+        incoming.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temporary = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(handle, "wb") as target:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    target.write(chunk)
+            hexdigest = digest.hexdigest()
+            final = "/".join(part for part in (directory, hexdigest[:2], f"{hexdigest}{extension}") if part)
+            path = self.path(final)
+            if os.path.exists(path):
+                os.remove(temporary)
+                # A fresh mtime keeps gc_media from collecting a blob that was just re-uploaded.
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temporary, path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return final
+
+    def blob_names(self):
+        """Every content-addressed file under this storage, as storage names."""
+
+        root = Path(self.location)
+        if not root.exists():
+            return
+        for path in root.rglob("*"):
+            if path.is_file() and INCOMING_DIR not in path.parts:
+                name = path.relative_to(root).as_posix()
+                if digest_from_name(name):
+                    yield name
+
+    def clear_incoming(self, older_than: float) -> int:
+        """Drop temporary files left behind by interrupted uploads."""
+
+        removed = 0
+        incoming = Path(self.location) / INCOMING_DIR
+        if incoming.exists():
+            for path in incoming.iterdir():
+                if path.stat().st_mtime < older_than:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        return removed
+
+
+gallery_storage = ContentAddressedStorage()
+
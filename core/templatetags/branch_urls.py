@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from django import template
+
+from .. import branches
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def branch_url(context, name: str, branch=None) -> str:
+    """``{% branch_url "appointments" %}``: the page in the current (or given) branch."""
+
+    return branches.url(name, branch or context.get("BRANCH"))
@@ -1,13 +1,64 @@
 from __future__ import annotations
 
-from datetime import date, timedelta
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal, ROUND_HALF_UP
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 
+from . import branches, changes, events, metrics, views, warmup
+from .availability import Availability
+from .checks import check_session_cache, check_shared_cache
+from .dedup import save_or_merge
+from .expiry import expire_unpaid
 from .forms import AppointmentForm
-from .models import Appointment, Service, TimeSlot
+from .models import (
+    ApiToken,
+    Appointment,
+    AppointmentReminder,
+    Branch,
+    CalendarToken,
+    ContactMessage,
+    GalleryImage,
+    MediaBlob,
+    OpeningHours,
+    ReconciliationItem,
+    Resource,
+    ResourceSchedule,
+    Review,
+    ScheduleException,
+    Service,
+    ServicePromotion,
+    TimeSlot,
+)
+from .pricing import get_catalog
+from .ratelimit import Rate, consume
+from .reconciliation import parse_amount, reconcile
+from .reminders import run_tick
+from .warmup import state as warmup_state, warm_up
+from .schedule import get_schedule, slots_for
+from .sessions import clear_expired
 
 
 class AppointmentFormTests(TestCase):
@@ -71,3 +122,1052 @@ class AppointmentFormTests(TestCase):
         appointment.save()
         expected = (self.service.price * Decimal("0.50")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
         self.assertEqual(appointment.deposit_amount, expected)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "ratelimit-tests"}},
+    RATELIMITS={"core:home": "2/m", "login": "1/m"},
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.contact = {
+            "form_type": "contact",
+            "name": "Ana",
+            "email": "ana@example.com",
+            "phone": "",
+            "message": "Hola",
+        }
+
+    def test_rejects_contact_flood_before_saving(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse("core:home"), self.contact).status_code, 302)
+        response = self.client.post(reverse("core:home"), self.contact)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(ContactMessage.objects.get().repeat_count, 2)
+
+    def test_buckets_are_keyed_by_ip(self):
+        for _ in range(2):
+            self.client.post(reverse("core:home"), self.contact)
+        response = self.client.post(reverse("core:home"), self.contact, REMOTE_ADDR="198.51.100.4")
+        self.assertEqual(response.status_code, 302)
+
+    def test_get_requests_are_not_limited(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(reverse("core:home")).status_code, 200)
+
+    def test_parallel_requests_cannot_share_a_token(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            waits = list(pool.map(lambda _: consume(["rl:test:ip:1"], Rate(capacity=5, period=60)), range(20)))
+        self.assertEqual(waits.count(0.0), 5)
+
+    def test_rejections_never_wait_for_the_bucket_lock(self):
+        rate = Rate(capacity=1, period=60)
+        self.assertEqual(consume(["rl:test:ip:2"], rate), 0.0)
+        cache.add("rl:test:ip:2:lock", 1, timeout=60)
+        started = time.monotonic()
+        self.assertGreater(consume(["rl:test:ip:2"], rate), 0)
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    @override_settings(RATELIMIT_IP_HEADER="HTTP_X_FORWARDED_FOR", RATELIMIT_TRUSTED_PROXIES=1)
+    def test_forged_forwarded_for_entries_are_ignored(self):
+        for forged in ("198.51.100.1", "198.51.100.2", "198.51.100.3"):
+            response = self.client.post(
+                reverse("core:home"), self.contact, HTTP_X_FORWARDED_FOR=f"{forged}, 203.0.113.9"
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertIsNotNone(cache.get("rl:core:home:ip:203.0.113.9"))
+
+    def test_rejected_ip_does_not_charge_the_user_bucket(self):
+        for _ in range(2):
+            self.client.post(reverse("core:home"), self.contact)
+        user = User.objects.create_user(username="clienta", password="secret123")
+        self.client.force_login(user)
+        self.assertEqual(self.client.post(reverse("core:home"), self.contact).status_code, 429)
+        self.assertIsNone(cache.get(f"rl:core:home:user:{user.pk}"))
+
+    def test_middleware_limits_undecorated_views(self):
+        credentials = {"username": "nadie", "password": "incorrecta"}
+        self.assertEqual(self.client.post(reverse("login"), credentials).status_code, 200)
+        self.assertEqual(self.client.post(reverse("login"), credentials).status_code, 429)
+
+
+class SubmissionDedupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="clienta", password="secret123")
+
+    def test_repeated_contact_message_is_merged(self):
+        payload = {"form_type": "contact", "name": "Ana", "email": "ana@example.com", "message": "Quiero un turno"}
+        self.client.post(reverse("core:home"), payload)
+        self.client.post(reverse("core:home"), {**payload, "name": "Ana B", "message": "  quiero UN turno "})
+        message = ContactMessage.objects.get()
+        self.assertEqual(message.repeat_count, 2)
+
+    def test_repeat_of_a_resolved_message_opens_a_new_one(self):
+        payload = {"form_type": "contact", "name": "Ana", "email": "ana@example.com", "message": "Quiero un turno"}
+        self.client.post(reverse("core:home"), payload)
+        ContactMessage.objects.update(is_resolved=True)
+        self.client.post(reverse("core:home"), payload)
+        self.assertEqual(list(ContactMessage.objects.order_by("pk").values_list("is_resolved", "repeat_count")),
+                         [(True, 1), (False, 1)])
+
+    def test_same_message_to_another_branch_is_kept_apart(self):
+        norte = Branch.objects.create(name="Sucursal Norte", slug="norte")
+        for branch in (branches.default(), norte, norte):
+            save_or_merge(ContactMessage(branch=branch, name="Ana", email="ana@example.com", message="Hola"))
+        self.assertEqual(
+            list(ContactMessage.objects.order_by("pk").values_list("branch__slug", "repeat_count")),
+            [(branches.default().slug, 1), ("norte", 2)],
+        )
+        ContactMessage.objects.filter(branch=norte).update(repeat_count=1)
+        ContactMessage.objects.create(branch=norte, name="Ana", email="ana@example.com", message="Hola")
+        call_command("dedupe_submissions", stdout=StringIO())
+        self.assertEqual(ContactMessage.objects.count(), 2)
+
+    def test_reviews_are_deduplicated_per_user(self):
+        other = User.objects.create_user(username="otra", password="secret123")
+        payload = {"form_type": "review", "rating": 5, "comment": "Excelente"}
+        for user in (self.user, self.user, other):
+            self.client.force_login(user)
+            self.client.post(reverse("core:home"), payload)
+        self.assertEqual(Review.objects.count(), 2)
+        self.assertEqual(Review.objects.get(user=self.user).repeat_count, 2)
+
+    def test_backfill_collapses_existing_duplicates(self):
+        for _ in range(3):
+            ContactMessage.objects.create(name="Bot", email="bot@example.com", message="Spam")
+        ContactMessage.objects.create(name="Ana", email="ana@example.com", message="Consulta")
+        call_command("dedupe_submissions", stdout=StringIO())
+        self.assertEqual(ContactMessage.objects.count(), 2)
+        self.assertEqual(ContactMessage.objects.get(email="bot@example.com").repeat_count, 3)
+
+
+class ResourceAvailabilityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="clienta", password="secret123")
+        self.manicure = Service.objects.create(name="Manicuría", description="-", price=3000)
+        self.pedicure = Service.objects.create(name="Pedicuría", description="-", price=4000)
+        self.ana = Resource.objects.create(name="Ana")
+        self.bea = Resource.objects.create(name="Bea")
+        self.bea.services.add(self.manicure)
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def book(self, service, slot=TimeSlot.H10):
+        return self.client.post(
+            reverse("core:appointments"),
+            {
+                "service": service.pk,
+                "appointment_date": self.tomorrow.isoformat(),
+                "appointment_time": slot,
+                "payment_method": Appointment.PaymentMethod.TRANSFER,
+                "payment_reference": "REF",
+            },
+        )
+
+    def test_each_resource_takes_one_booking_per_slot(self):
+        self.client.force_login(self.user)
+        self.book(self.manicure)
+        self.book(self.manicure)
+        self.book(self.manicure)
+        assigned = set(Appointment.objects.values_list("resource__name", flat=True))
+        self.assertEqual(assigned, {"Ana", "Bea"})
+        self.assertNotIn(TimeSlot.H10, Availability(self.tomorrow).available_slots(self.tomorrow))
+
+    def test_specialist_is_assigned_first(self):
+        self.client.force_login(self.user)
+        self.book(self.manicure)
+        self.assertEqual(Appointment.objects.get().resource, self.bea)
+        # Ana is the only one qualified for pedicure, and she is still free.
+        self.book(self.pedicure)
+        self.assertEqual(Appointment.objects.get(service=self.pedicure).resource, self.ana)
+
+    def test_schedules_limit_working_hours(self):
+        weekday = self.tomorrow.weekday()
+        ResourceSchedule.objects.create(resource=self.ana, weekday=weekday, start_time="09:00", end_time="12:00")
+        self.bea.is_active = False
+        self.bea.save()
+        slots = Availability(self.tomorrow).available_slots(self.tomorrow, self.pedicure.pk)
+        self.assertEqual(slots, ["09:00", "10:00", "11:00"])
+
+    def test_long_services_hold_the_resource_for_every_slot_they_span(self):
+        OpeningHours.objects.create(
+            weekday=self.tomorrow.weekday(), opens_at="09:00", closes_at="13:00", slot_minutes=30
+        )
+        self.bea.is_active = False
+        self.bea.save()
+        self.manicure.duration_minutes = 90
+        self.manicure.save()
+        self.client.force_login(self.user)
+        self.book(self.manicure, "09:00")
+        availability = Availability(self.tomorrow)
+        self.assertEqual(availability.taken_slots(self.tomorrow), ["09:00", "09:30", "10:00"])
+        self.assertEqual(
+            availability.available_slots(self.tomorrow, self.manicure.pk), ["10:30", "11:00", "11:30", "12:00", "12:30"]
+        )
+        self.book(self.manicure, "09:30")
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_month_horizon_uses_constant_queries(self):
+        for index in range(30):
+            Resource.objects.create(name=f"Extra {index}")
+        end = self.tomorrow + timedelta(days=30)
+        get_schedule()
+        get_catalog()
+        with self.assertNumQueries(4):
+            availability = Availability(self.tomorrow, end)
+            for day in availability.days():
+                availability.available_slots(day, self.manicure.pk)
+
+
+class ScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.monday = date.today() + timedelta(days=7 - date.today().weekday())
+
+    def test_defaults_to_timeslot_hours(self):
+        self.assertEqual(slots_for(self.monday), [choice for choice, _ in TimeSlot.choices])
+
+    def test_weekly_hours_with_granularity(self):
+        OpeningHours.objects.create(weekday=0, opens_at="10:00", closes_at="12:00", slot_minutes=30)
+        self.assertEqual(slots_for(self.monday), ["10:00", "10:30", "11:00", "11:30"])
+        self.assertEqual(slots_for(self.monday + timedelta(days=6)), [])
+
+    def test_exceptions_override_weekly_hours(self):
+        OpeningHours.objects.create(weekday=0, opens_at="10:00", closes_at="12:00")
+        ScheduleException.objects.create(date=self.monday, note="Feriado")
+        extended = ScheduleException.objects.create(
+            date=self.monday + timedelta(days=7), is_closed=False, opens_at="08:00", closes_at="10:00"
+        )
+        self.assertEqual(slots_for(self.monday), [])
+        self.assertEqual(slots_for(extended.date), ["08:00", "09:00"])
+
+    def test_compiled_schedule_is_cached_until_edited(self):
+        hours = OpeningHours.objects.create(weekday=0, opens_at="10:00", closes_at="11:00")
+        get_schedule()
+        with self.assertNumQueries(0):
+            slots_for(self.monday)
+            slots_for(self.monday + timedelta(days=7))
+        hours.closes_at = "12:00"
+        hours.save()
+        self.assertEqual(slots_for(self.monday), ["10:00", "11:00"])
+
+
+    def test_deploy_check_warns_about_a_process_local_cache(self):
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ["core.W001"])
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://"}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="app", password="secret123")
+        self.token = ApiToken.objects.create(user=self.user, name="Mobile")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {self.token.key}"}
+        self.service = Service.objects.create(name="Manicuría", description="-", price=3000)
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def book(self, slot="10:00"):
+        return self.client.post(
+            reverse("core:api_appointments"),
+            json.dumps({
+                "service": self.service.pk,
+                "appointment_date": self.tomorrow.isoformat(),
+                "appointment_time": slot,
+                "payment_method": "transfer",
+                "payment_reference": "MP-1",
+            }),
+            content_type="application/json",
+            **self.auth,
+        )
+
+    def test_service_catalog_supports_conditional_get(self):
+        response = self.client.get(reverse("core:api_services"))
+        self.assertEqual(response.json()["services"][0]["deposit"], "1500.00")
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse("core:api_services"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.service.price = 3500
+        self.service.save()
+        fresh = self.client.get(reverse("core:api_services"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(fresh.status_code, 200)
+
+    def test_date_bound_responses_are_revalidated_after_midnight(self):
+        class Tomorrow(date):
+            @classmethod
+            def today(cls):
+                return date.today() + timedelta(days=1)
+
+        services = self.client.get(reverse("core:api_services"))
+        mine = self.client.get(reverse("core:api_appointments"), **self.auth)
+        with mock.patch("core.api.date", Tomorrow):
+            for url, before, extra in ((reverse("core:api_services"), services, {}),
+                                       (reverse("core:api_appointments"), mine, self.auth)):
+                after = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=before["ETag"], HTTP_IF_MODIFIED_SINCE=before["Last-Modified"], **extra
+                )
+                self.assertEqual(after.status_code, 200, url)
+
+    def test_booking_changes_availability_etag(self):
+        url = f"{reverse('core:api_availability')}?start={self.tomorrow}&end={self.tomorrow}"
+        before = self.client.get(url)
+        self.assertIn("10:00", before.json()["days"][self.tomorrow.isoformat()])
+        self.assertEqual(self.book().status_code, 201)
+        after = self.client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotIn("10:00", after.json()["days"][self.tomorrow.isoformat()])
+        self.assertEqual(self.book().status_code, 409)
+
+    def test_requires_token_for_bookings(self):
+        self.assertEqual(self.client.get(reverse("core:api_appointments")).status_code, 401)
+        response = self.client.get(reverse("core:api_appointments"), **self.auth)
+        self.assertEqual(response.json(), {"appointments": []})
+
+    def test_cancel_releases_the_slot(self):
+        appointment_id = self.book().json()["appointment"]["id"]
+        response = self.client.post(reverse("core:api_cancel_appointment", args=[appointment_id]), **self.auth)
+        self.assertEqual(response.json()["appointment"]["status"], Appointment.STATUS_CANCELLED)
+        self.assertEqual(response.json()["appointment"]["deposit_status"], Appointment.DepositStatus.CANCELLED)
+        self.assertEqual(events.compute_stats()["pending_deposits"], 0)
+        self.assertEqual(self.book().status_code, 201)
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="clienta", password="secret123")
+        self.service = Service.objects.create(name="Kapping", description="-", price=Decimal("5000"))
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def create_appointment(self, slot="10:00"):
+        return Appointment.objects.create(
+            user=self.user, service=self.service, appointment_date=self.tomorrow, appointment_time=slot
+        )
+
+    def test_fixed_deposit_overrides_percentage(self):
+        self.service.deposit_fixed_amount = Decimal("1200")
+        self.service.save()
+        self.assertEqual(self.create_appointment().deposit_amount, Decimal("1200.00"))
+
+    def test_promotion_applies_within_window(self):
+        ServicePromotion.objects.create(
+            service=self.service, label="Primavera", price=Decimal("4000"),
+            starts_on=self.tomorrow, ends_on=self.tomorrow,
+        )
+        appointment = self.create_appointment()
+        self.assertEqual(appointment.service_price, Decimal("4000"))
+        self.assertEqual(appointment.deposit_amount, Decimal("2000.00"))
+        quote = get_catalog().quote(self.service.pk, self.tomorrow + timedelta(days=1))
+        self.assertEqual(quote.price, Decimal("5000"))
+
+    def test_price_changes_do_not_touch_existing_bookings(self):
+        appointment = self.create_appointment()
+        self.service.price = Decimal("9000")
+        self.service.deposit_percentage = 100
+        self.service.save()
+        appointment.status = Appointment.STATUS_CONFIRMED
+        appointment.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.deposit_amount, Decimal("2500.00"))
+        self.assertEqual(self.create_appointment("11:00").deposit_amount, Decimal("9000.00"))
+
+    def test_switching_the_service_requotes_the_booking(self):
+        appointment = self.create_appointment()
+        nail_art = Service.objects.create(name="Nail art", description="-", price=Decimal("8000"))
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.service = nail_art
+        appointment.save()
+        appointment.refresh_from_db()
+        self.assertEqual((appointment.service_price, appointment.deposit_amount), (Decimal("8000"), Decimal("4000.00")))
+
+    def test_catalog_is_cached_until_a_service_changes(self):
+        get_catalog()
+        with self.assertNumQueries(0):
+            get_catalog().as_json(self.tomorrow)
+        with self.assertNumQueries(1):
+            self.create_appointment()
+
+
+@override_settings(WARMUP_ON_BOOT=False)
+class WarmupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(warmup_state.update, dict(warmup_state))
+        warmup_state.update(ready=False, error="", steps={})
+
+    def test_readiness_waits_for_warmup(self):
+        self.assertEqual(self.client.get(reverse("core:health_live")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("core:health_ready")).status_code, 503)
+        warm_up()
+        response = self.client.get(reverse("core:health_ready"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["steps"]), {"templates", "routes", "caches", "static"})
+
+    def test_failed_step_does_not_keep_the_worker_out_of_rotation(self):
+        def broken():
+            raise RuntimeError("base caída")
+
+        with mock.patch("core.warmup.STEPS", (("caches", broken), ("routes", lambda: 1))):
+            warm_up()
+        response = self.client.get(reverse("core:health_ready"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["error"], "caches: base caída")
+        self.assertEqual(response.json()["steps"]["routes"]["items"], 1)
+
+    @override_settings(WARMUP_ON_BOOT=True)
+    def test_worker_forked_mid_warmup_starts_its_own(self):
+        # The preloaded master was still warming up when it forked this worker.
+        warmup_state.update(running=True)
+        with mock.patch.object(warmup, "_started_in", os.getpid() + 1), mock.patch("threading.Thread") as thread:
+            warmup._after_fork()
+            self.assertEqual(self.client.get(reverse("core:health_ready")).status_code, 503)
+            self.client.get(reverse("core:health_ready"))
+        self.assertFalse(warmup_state["running"])
+        thread.assert_called_once_with(target=warm_up, name="warmup", daemon=True)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.registry.reset()
+        self.user = User.objects.create_user(username="clienta", password="secret123")
+        self.service = Service.objects.create(name="Manicuría", description="-", price=3000)
+
+    def test_scrape_reports_latency_bookings_and_occupancy(self):
+        self.client.force_login(self.user)
+        tomorrow = date.today() + timedelta(days=1)
+        self.client.post(
+            reverse("core:appointments"),
+            {
+                "service": self.service.pk,
+                "appointment_date": tomorrow.isoformat(),
+                "appointment_time": "10:00",
+                "payment_method": Appointment.PaymentMethod.TRANSFER,
+                "payment_reference": "REF",
+            },
+        )
+        self.assertEqual(self.client.get(reverse("core:metrics")).status_code, 401)
+        with self.settings(METRICS_TOKEN="secreto"):
+            body = self.client.get(reverse("core:metrics"), HTTP_AUTHORIZATION="Bearer secreto").content.decode()
+        self.assertIn('http_request_duration_seconds_count{method="POST",view="core:appointments"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{le="+Inf",method="POST",view="core:appointments"} 1', body)
+        self.assertIn("booking_success_total 1", body)
+        self.assertIn("deposits_pending 1", body)
+        self.assertIn("# TYPE slot_occupancy_ratio gauge", body)
+
+    def test_samples_from_every_worker_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            other_worker = metrics.Registry(name="other-worker")
+            other_worker.inc("booking_attempts_total", 2)
+            other_worker.flush(metrics.metrics_dir())
+            metrics.inc("booking_attempts_total")
+            samples = metrics.collect()
+        self.assertEqual(samples[("booking_attempts_total", ())], 3)
+
+    def test_exited_workers_are_folded_and_never_go_backwards(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            folder = Path(directory)
+            # One worker that exited, and one whose pid this process now reuses.
+            for stem in ("4194305-1", f"{os.getpid()}-1"):
+                (folder / f"{stem}.json").write_text(json.dumps([["booking_attempts_total", [], 2]]))
+            metrics.inc("booking_attempts_total")
+            first = metrics.collect()[("booking_attempts_total", ())]
+            metrics.inc("booking_attempts_total")
+            second = metrics.collect()[("booking_attempts_total", ())]
+            files = sorted(path.name for path in folder.glob("*.json"))
+        self.assertEqual((first, second), (5, 6))
+        self.assertEqual(files, [f"{metrics.registry.identity}.json", "retired.json"])
+
+    def test_failed_flush_never_reaches_the_caller(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_DIR=directory):
+            with mock.patch("core.metrics.os.replace", side_effect=FileNotFoundError), self.assertLogs("core.metrics"):
+                metrics.Registry(name="flaky").inc("booking_success_total")
+            self.assertEqual([path.name for path in Path(directory).iterdir()], [])
+
+    def test_occupancy_is_computed_once_per_change(self):
+        staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse("core:metrics"))
+        with mock.patch("core.views.Availability") as availability:
+            self.client.get(reverse("core:metrics"))
+        availability.assert_not_called()
+
+    def test_recording_costs_well_under_a_millisecond(self):
+        started = time.perf_counter()
+        for _ in range(1000):
+            metrics.observe("http_request_duration_seconds", 0.02, view="core:home", method="GET")
+        self.assertLess((time.perf_counter() - started) / 1000, 0.0001)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client_user = User.objects.create_user(username="clienta", password="secret123", first_name="Lola")
+        self.staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.service = Service.objects.create(name="Kapping, gel", description="-", price=3000, duration_minutes=90)
+        self.tomorrow = date.today() + timedelta(days=1)
+        Appointment.objects.create(
+            user=self.client_user, service=self.service, appointment_date=self.tomorrow, appointment_time="10:00"
+        )
+        other = User.objects.create_user(username="otra", password="secret123")
+        Appointment.objects.create(user=other, service=self.service, appointment_date=self.tomorrow, appointment_time="11:00")
+
+    def feed(self, user, **headers):
+        url = reverse("core:calendar_feed", kwargs={"key": CalendarToken.for_user(user).key})
+        return self.client.get(url, **headers)
+
+    def test_client_feed_only_lists_own_bookings(self):
+        response = self.feed(self.client_user)
+        body = b"".join(response.streaming_content).decode()
+        self.assertEqual(body.count("BEGIN:VEVENT"), 1)
+        self.assertIn("SUMMARY:Kapping\\, gel", body)
+        start = timezone.make_aware(datetime.combine(self.tomorrow, datetime.min.time().replace(hour=10)))
+        end = start + timedelta(minutes=90)
+        self.assertIn(f"DTEND:{end.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}", body)
+
+    def test_staff_feed_lists_the_whole_salon(self):
+        body = b"".join(self.feed(self.staff).streaming_content).decode()
+        self.assertEqual(body.count("BEGIN:VEVENT"), 2)
+        self.assertIn("Lola", body)
+
+    def test_polling_gets_not_modified_until_a_booking_changes(self):
+        etag = self.feed(self.client_user)["ETag"]
+        self.assertEqual(self.feed(self.client_user, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Appointment.objects.create(
+            user=self.client_user, service=self.service, appointment_date=self.tomorrow, appointment_time="12:00"
+        )
+        self.assertEqual(self.feed(self.client_user, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_key_is_not_found(self):
+        self.assertEqual(self.client.get(reverse("core:calendar_feed", kwargs={"key": "nope"})).status_code, 404)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.service = Service.objects.create(name="Manicuría", description="-", price=3000)
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def appointment(self, slot, reference):
+        user = User.objects.create_user(username=f"c{slot}", password="secret123")
+        return Appointment.objects.create(
+            user=user, service=self.service, appointment_date=self.tomorrow,
+            appointment_time=slot, payment_reference=reference,
+        )
+
+    def test_parses_local_and_international_amounts(self):
+        self.assertEqual(parse_amount("1.500,50"), Decimal("1500.50"))
+        self.assertEqual(parse_amount("-1,500.50"), Decimal("1500.50"))
+        self.assertEqual(parse_amount("$ 1500"), Decimal("1500"))
+
+    def test_matches_are_verified_and_ambiguous_lines_queued(self):
+        exact = self.appointment("09:00", "TRF-001234")
+        wrong_amount = self.appointment("10:00", "MP 77889")
+        statement = StringIO(
+            "Fecha;Concepto;Importe\n"
+            "01/10;TRANSF 001234 JUAN;1.500,00\n"
+            "01/10;MP77889;900,00\n"
+            "01/10;SUELDO;250.000,00\n"
+        )
+        with self.assertNumQueries(7):
+            run = reconcile(statement, "bank", user=self.staff)
+        exact.refresh_from_db()
+        self.assertEqual(exact.deposit_status, Appointment.DepositStatus.VERIFIED)
+        self.assertEqual(exact.deposit_verified_by, self.staff)
+        self.assertEqual((run.matched, run.ambiguous, run.unmatched), (1, 1, 1))
+        item = ReconciliationItem.objects.get()
+        self.assertEqual(item.reason, ReconciliationItem.Reason.AMOUNT)
+        self.assertEqual(list(item.candidates.all()), [wrong_amount])
+
+    def test_free_text_descriptions_are_never_auto_verified(self):
+        deposit = self.appointment("09:00", "Transferencia Banco Nacion")
+        statement = StringIO(
+            "Fecha;Concepto;Importe\n"
+            "01/10;TRANSFERENCIA RECIBIDA DE JUAN PEREZ;1.500,00\n"
+            "01/10;TRANSFERENCIA RECIBIDA DE ANA GOMEZ;800,00\n"
+        )
+        run = reconcile(statement, "bank", user=self.staff)
+        deposit.refresh_from_db()
+        self.assertEqual(deposit.deposit_status, Appointment.DepositStatus.PENDING)
+        self.assertEqual((run.matched, run.ambiguous, run.unmatched), (0, 1, 1))
+        item = ReconciliationItem.objects.get()
+        self.assertEqual((item.reason, item.line_number), (ReconciliationItem.Reason.WEAK, 2))
+
+    def test_dashboard_upload(self):
+        self.appointment("09:00", "op-5555")
+        self.client.force_login(self.staff)
+        upload = SimpleUploadedFile(
+            "settlement.csv",
+            b"SOURCE_ID,TRANSACTION_AMOUNT\nOP5555,1500.00\n",
+            content_type="text/csv",
+        )
+        response = self.client.post(reverse("core:reconcile_payments"), {"source": "mercadopago", "statement": upload})
+        self.assertRedirects(response, reverse("core:dashboard"))
+        self.assertFalse(Appointment.objects.filter(deposit_status=Appointment.DepositStatus.PENDING).exists())
+
+
+@override_settings(LIVE_EVENTS_STREAM_SECONDS=0.3, LIVE_EVENTS_KEEPALIVE_SECONDS=0.1, LIVE_EVENTS_POLL_SECONDS=0.05)
+class LiveDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.client_user = User.objects.create_user(username="clienta", password="secret123", first_name="Lola")
+        self.service = Service.objects.create(name="Manicuría", description="-", price=3000)
+
+    def book(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(
+                user=self.client_user, service=self.service, appointment_date=date.today(), appointment_time="10:00"
+            )
+
+    def test_each_change_is_published_once_and_stats_shared(self):
+        appointment = self.book()
+        [event] = events.read_since(0)
+        self.assertEqual((event["type"], event["action"]), ("appointment", "created"))
+        self.assertEqual(event["pk"], appointment.pk)
+        self.assertNotIn("item", event)
+        self.assertEqual(events.item_for(event)["client"], "Lola")
+        self.assertEqual(events.stats_for(event["id"])["appointments_today"], 1)
+        with self.assertNumQueries(0):
+            events.item_for(event)
+            events.stats_for(event["id"])
+
+    def test_saving_a_booking_does_not_load_its_relations_for_the_feed(self):
+        appointment = Appointment.objects.get(pk=self.book().pk)
+        appointment.status = Appointment.STATUS_CONFIRMED
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            appointment.save(update_fields=["status"])
+        self.assertFalse([query for query in queries if 'FROM "core_service"' in query["sql"] or 'FROM "auth_user"' in query["sql"]])
+
+    def test_merged_repeat_reaches_the_dashboard(self):
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                message, _ = save_or_merge(ContactMessage(name="Ana", email="ana@example.com", message="Hola"))
+        latest = events.read_since(0)[-1]
+        self.assertEqual((latest["type"], latest["action"], latest["pk"]), ("contact", "updated", message.pk))
+        self.assertEqual(events.item_for(latest)["repeat_count"], 2)
+
+    def test_stream_delivers_events_after_the_given_sequence(self):
+        self.client.force_login(self.staff)
+        sequence = events.current_sequence()
+        self.book()
+        response = self.client.get(reverse("core:dashboard_events"), {"desde": sequence})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        body = b"".join(response.streaming_content).decode()
+        self.assertIn("event: appointment", body)
+        payload = json.loads(body.split("data: ", 1)[1].split("\n", 1)[0])
+        self.assertEqual(payload["stats"]["pending_deposits"], 1)
+
+    def test_stream_is_staff_only(self):
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.get(reverse("core:dashboard_events")).status_code, 302)
+
+
+class ContentAddressedMediaTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.media_root = Path(media.name)
+
+    def upload(self, color="pink", name="foto.jpg"):
+        buffer = BytesIO()
+        Image.new("RGB", (4, 4), color).save(buffer, format="JPEG")
+        return GalleryImage.objects.create(
+            title=name, image=SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+        )
+
+    def stored_files(self):
+        return [path for path in (self.media_root / "gallery").rglob("*") if path.is_file()]
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.upload(name="a.jpg")
+        second = self.upload(name="otra.JPG")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^gallery/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(MediaBlob.objects.get().references, 2)
+        self.upload(color="black")
+        self.assertEqual(len(self.stored_files()), 2)
+
+    def test_garbage_collection_keeps_referenced_blobs(self):
+        kept = self.upload()
+        dropped = self.upload(color="black")
+        self.upload()
+        dropped.delete()
+        GalleryImage.objects.filter(pk=kept.pk).delete()
+        call_command("gc_media", "--grace-minutes=0", stdout=StringIO())
+        self.assertEqual([path.name for path in self.stored_files()], [Path(kept.image.name).name])
+        self.assertEqual(list(MediaBlob.objects.values_list("references", flat=True)), [1])
+
+
+class ReminderTests(TestCase):
+    def setUp(self):
+        self.service = Service.objects.create(name="Manicuría", description="-", price=3000)
+        self.day = date.today() + timedelta(days=3)
+        self.now = datetime.combine(self.day, datetime.min.time().replace(hour=8))
+
+    def book(self, day, slot, **extra):
+        user = User.objects.create_user(username=f"c{day:%d}{slot}", password="secret123", email=f"{slot[:2]}@example.com")
+        appointment = Appointment.objects.create(
+            user=user, service=self.service, appointment_date=day, appointment_time=slot, **extra
+        )
+        Appointment.objects.filter(pk=appointment.pk).update(created_at=timezone.now() - timedelta(days=7))
+        return appointment
+
+    def test_each_window_is_sent_once(self):
+        tomorrow = self.day + timedelta(days=1)
+        day_before = self.book(tomorrow, "07:00")
+        same_day = self.book(self.day, "09:30")
+        self.book(tomorrow, "14:00")
+        self.book(tomorrow, "06:00", status=Appointment.STATUS_CANCELLED)
+
+        self.assertEqual(run_tick(now=self.now), {"24h": 1, "2h": 1})
+        self.assertEqual(run_tick(now=self.now), {"24h": 0, "2h": 0})
+        self.assertEqual(len(mail.outbox), 2)
+        sent = dict(AppointmentReminder.objects.values_list("appointment_id", "kind"))
+        self.assertEqual(sent, {day_before.pk: "24h", same_day.pk: "2h"})
+        self.assertTrue(all(row.sent_at for row in AppointmentReminder.objects.all()))
+
+    def test_reminders_claimed_elsewhere_are_not_resent(self):
+        appointment = self.book(self.day, "09:00")
+        AppointmentReminder.objects.create(appointment=appointment, kind="2h", claim="other-worker")
+        self.assertEqual(run_tick(now=self.now), {"24h": 0, "2h": 0})
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(REMINDER_MAX_ATTEMPTS=2)
+    def test_failed_sends_are_retried_up_to_the_limit(self):
+        appointment = self.book(self.day, "09:00")
+
+        class Broken:
+            name = "broken"
+
+            def send(self, reminders):
+                raise ConnectionError("sin conexión")
+
+        for _ in range(3):
+            run_tick(now=self.now, channel=Broken())
+            AppointmentReminder.objects.update(claimed_at=timezone.now() - timedelta(minutes=1))
+        row = AppointmentReminder.objects.get(appointment=appointment)
+        self.assertEqual((row.status, row.attempts, row.detail), ("failed", 2, "sin conexión"))
+        run_tick(now=self.now)
+        self.assertEqual(mail.outbox, [])
+
+    def test_abandoned_claims_are_sent_again(self):
+        appointment = self.book(self.day, "09:00")
+        AppointmentReminder.objects.create(
+            appointment=appointment, kind="2h", claim="dead-worker", claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(run_tick(now=self.now), {"24h": 0, "2h": 1})
+        row = AppointmentReminder.objects.get()
+        self.assertEqual((row.status, row.attempts), ("sent", 2))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class PaymentDeadlineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.client_user = User.objects.create_user(username="clienta", password="secret123", email="lola@example.com")
+        self.service = Service.objects.create(name="Manicuría", description="-", price=3000)
+        self.day = date.today() + timedelta(days=5)
+
+    def book(self, slot, **extra):
+        return Appointment.objects.create(
+            user=self.client_user, service=self.service, appointment_date=self.day, appointment_time=slot, **extra
+        )
+
+    def test_deadline_is_set_at_booking_except_for_cash(self):
+        appointment = self.book("10:00")
+        self.assertAlmostEqual(
+            appointment.payment_deadline, timezone.now() + timedelta(hours=24), delta=timedelta(minutes=1)
+        )
+        self.assertIsNone(self.book("11:00", payment_method=Appointment.PaymentMethod.CASH).payment_deadline)
+
+    def test_sweep_cancels_overdue_bookings_and_frees_the_slot(self):
+        overdue = self.book("10:00", payment_deadline=timezone.now() - timedelta(minutes=1))
+        paid = self.book("11:00", payment_deadline=timezone.now() - timedelta(minutes=1))
+        Appointment.objects.filter(pk=paid.pk).update(deposit_status=Appointment.DepositStatus.VERIFIED)
+        waiting = self.book("12:00")
+
+        self.assertEqual(expire_unpaid(), 1)
+        overdue.refresh_from_db()
+        self.assertEqual(overdue.status, Appointment.STATUS_CANCELLED)
+        self.assertEqual(overdue.deposit_status, Appointment.DepositStatus.EXPIRED)
+        self.assertEqual(Appointment.objects.get(pk=paid.pk).status, Appointment.STATUS_PENDING)
+        self.assertEqual(Appointment.objects.get(pk=waiting.pk).deposit_status, Appointment.DepositStatus.PENDING)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("10:00", Availability(self.day).available_slots(self.day))
+        self.assertEqual(expire_unpaid(), 0)
+
+    def test_expired_deposit_cannot_be_verified(self):
+        appointment = self.book("10:00", payment_deadline=timezone.now() - timedelta(minutes=1))
+        expire_unpaid(notify=False)
+        self.client.force_login(self.staff)
+        self.client.post(reverse("core:verify_deposit", kwargs={"appointment_id": appointment.pk}))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, Appointment.STATUS_CANCELLED)
+
+    def test_sweep_between_read_and_write_wins(self):
+        appointment = self.book("10:00", payment_deadline=timezone.now() - timedelta(minutes=1))
+        fetch = views.get_object_or_404
+
+        def fetch_then_sweep(*args, **kwargs):
+            found = fetch(*args, **kwargs)
+            expire_unpaid(notify=False)
+            return found
+
+        self.client.force_login(self.staff)
+        with mock.patch("core.views.get_object_or_404", fetch_then_sweep):
+            response = self.client.post(
+                reverse("core:verify_deposit", kwargs={"appointment_id": appointment.pk}), follow=True
+            )
+        self.assertContains(response, "venció")
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.deposit_status, Appointment.DepositStatus.EXPIRED)
+
+    def test_pending_deposit_is_verified(self):
+        appointment = self.book("10:00")
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("core:verify_deposit", kwargs={"appointment_id": appointment.pk}))
+        appointment.refresh_from_db()
+        self.assertEqual(
+            (appointment.status, appointment.deposit_status, appointment.deposit_verified_by),
+            (Appointment.STATUS_CONFIRMED, Appointment.DepositStatus.VERIFIED, self.staff),
+        )
+        self.assertEqual(events.read_since(0)[-1]["pk"], appointment.pk)
+
+    def test_cancelled_booking_cannot_be_reconfirmed(self):
+        appointment = self.book("10:00")
+        Appointment.objects.filter(pk=appointment.pk).update(status=Appointment.STATUS_CANCELLED)
+        self.book("10:00")  # the released slot is taken again
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse("core:verify_deposit", kwargs={"appointment_id": appointment.pk}))
+        self.assertEqual(response.status_code, 302)
+        appointment.refresh_from_db()
+        self.assertEqual(
+            (appointment.status, appointment.deposit_status),
+            (Appointment.STATUS_CANCELLED, Appointment.DepositStatus.PENDING),
+        )
+
+
+@override_settings(CHANGE_FEED_SETTLE_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.token = ApiToken.objects.create(user=self.staff, name="CRM")
+
+    def feed(self, **params):
+        return self.client.get(reverse("core:api_changes"), params, HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_pages_follow_the_cursor_and_report_deletions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            service = Service.objects.create(name="Manicuría", description="-", price=3000)
+            message = ContactMessage.objects.create(name="Ana", email="ana@example.com", message="Hola")
+            service.price = 3500
+            service.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            message.delete()
+
+        first = self.feed(limit=2).json()
+        self.assertTrue(first["has_more"])
+        self.assertEqual([change["model"] for change in first["changes"]], ["service", "contact_message"])
+        self.assertEqual(first["changes"][0]["data"]["price"], "3500.00")
+        self.assertEqual(first["changes"][1]["action"], "delete")
+
+        second = self.feed(cursor=first["cursor"], limit=2).json()
+        self.assertFalse(second["has_more"])
+        self.assertEqual(
+            [(change["model"], change["action"]) for change in second["changes"]],
+            [("service", "upsert"), ("contact_message", "delete")],
+        )
+        self.assertEqual(self.feed(cursor=second["cursor"]).json()["changes"], [])
+
+    @override_settings(CHANGE_FEED_SETTLE_SECONDS=60)
+    def test_recent_entries_wait_until_settled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Service.objects.create(name="Manicuría", description="-", price=3000)
+        page = self.feed().json()
+        self.assertEqual(page["changes"], [])
+        self.assertEqual(page["cursor"], changes.encode_cursor(0))
+
+    def test_feed_is_staff_only_and_validates_the_cursor(self):
+        self.assertEqual(self.feed(cursor="nope").status_code, 400)
+        client_token = ApiToken.objects.create(user=User.objects.create_user(username="clienta", password="x"))
+        response = self.client.get(reverse("core:api_changes"), HTTP_AUTHORIZATION=f"Token {client_token.key}")
+        self.assertEqual(response.status_code, 403)
+
+
+class BranchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="clienta", password="secret123")
+        self.central = Branch.objects.get(is_default=True)
+        self.norte = Branch.objects.create(name="Sucursal Norte", slug="norte", address="Av. Norte 123", phone="555-0101")
+        self.manicure = Service.objects.create(name="Manicuría", description="-", price=3000)
+        self.nail_art = Service.objects.create(branch=self.norte, name="Nail art", description="-", price=4500)
+        self.tomorrow = date.today() + timedelta(days=1)
+
+    def book(self, url, service):
+        return self.client.post(url, {
+            "service": service.pk,
+            "appointment_date": self.tomorrow.isoformat(),
+            "appointment_time": "10:00",
+            "payment_method": Appointment.PaymentMethod.TRANSFER,
+            "payment_reference": "REF",
+        })
+
+    def test_each_branch_books_the_same_slot_once(self):
+        self.client.force_login(self.user)
+        norte_url = reverse("core:branch:appointments", kwargs={"branch": "norte"})
+        self.assertRedirects(self.book(reverse("core:appointments"), self.manicure), reverse("core:appointments"))
+        self.assertRedirects(self.book(norte_url, self.nail_art), norte_url)
+        self.book(norte_url, self.nail_art)
+        # Services of another branch are not offered.
+        self.book(norte_url, self.manicure)
+        self.assertEqual(
+            sorted(Appointment.objects.values_list("branch__slug", "service__name")),
+            [("central", "Manicuría"), ("norte", "Nail art")],
+        )
+        self.assertNotIn("10:00", Availability(self.tomorrow, branch_id=self.norte.pk).available_slots(self.tomorrow))
+
+    def test_branch_pages_show_their_own_catalog_and_contact(self):
+        response = self.client.get(reverse("core:branch:home", kwargs={"branch": "norte"}))
+        self.assertEqual([service.name for service in response.context["services"]], ["Nail art"])
+        self.assertEqual(response.context["COMPANY_ADDRESS"], "Av. Norte 123")
+        self.assertContains(response, "/sucursales/norte/reservas/")
+        central = self.client.get(reverse("core:home"))
+        self.assertEqual([service.name for service in central.context["services"]], ["Manicuría"])
+        self.assertEqual(self.client.get("/sucursales/sur/").status_code, 404)
+
+    def test_edits_in_one_branch_keep_the_other_cached(self):
+        get_schedule(self.central.pk)
+        get_catalog(self.central.pk)
+        OpeningHours.objects.create(branch=self.norte, weekday=0, opens_at="10:00", closes_at="12:00")
+        self.nail_art.price = 5000
+        self.nail_art.save()
+        with self.assertNumQueries(0):
+            get_schedule(self.central.pk)
+            get_catalog(self.central.pk)
+
+    @override_settings(LIVE_EVENTS_STREAM_SECONDS=0.3, LIVE_EVENTS_KEEPALIVE_SECONDS=0.1, LIVE_EVENTS_POLL_SECONDS=0.05)
+    def test_dashboard_stream_only_carries_its_branch(self):
+        staff = User.objects.create_user(username="staff", password="secret123", is_staff=True)
+        self.client.force_login(staff)
+        sequence = events.current_sequence()
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(
+                user=self.user, service=self.nail_art, appointment_date=date.today(), appointment_time="10:00"
+            )
+        central = b"".join(self.client.get(reverse("core:dashboard_events"), {"desde": sequence}).streaming_content)
+        self.assertNotIn(b"event: appointment", central)
+        norte_url = reverse("core:branch:dashboard_events", kwargs={"branch": "norte"})
+        body = b"".join(self.client.get(norte_url, {"desde": sequence}).streaming_content).decode()
+        payload = json.loads(body.split("data: ", 1)[1].split("\n", 1)[0])
+        self.assertEqual(payload["stats"]["appointments_today"], 1)
+
+
+class SessionStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def session_queries(self, queries):
+        return [query["sql"] for query in queries.captured_queries if "django_session" in query["sql"]]
+
+    def test_anonymous_flash_message_never_touches_the_session_table(self):
+        payload = {
+            "form_type": "contact",
+            "name": "Lucía",
+            "email": "lucia@example.com",
+            "phone": "",
+            "message": "Hola, ¿tienen turnos el sábado?",
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("core:home"), payload, follow=True)
+        self.assertContains(response, "Gracias por tu mensaje")
+        self.assertEqual(self.session_queries(queries), [])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+    def test_logged_in_page_views_read_the_session_from_cache(self):
+        user = User.objects.create_user(username="clienta", password="secret123")
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("core:appointments"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session_queries(queries), [])
+
+    def test_cached_sessions_need_a_shared_cache(self):
+        self.assertEqual(settings.SESSION_ENGINE, "django.contrib.sessions.backends.db")
+        with override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db"):
+            self.assertEqual([warning.id for warning in check_session_cache(None)], ["core.W002"])
+
+    def test_sweeper_removes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for index in range(5):
+            Session.objects.create(session_key=f"vencida{index}", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="vigente", session_data="", expire_date=now + timedelta(days=1))
+        with self.assertNumQueries(6):
+            self.assertEqual(clear_expired(batch_size=2), 5)
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["vigente"])
+
+
+class ProgressiveWebAppTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def worker_config(self, script: str) -> dict:
+        return json.loads(script.split("self.PWA = ", 1)[1].split(";\n", 1)[0])
+
+    @override_settings(PWA_CACHE_VERSION="release-42")
+    def test_service_worker_is_root_scoped_and_versioned(self):
+        response = self.client.get("/sw.js")
+        self.assertEqual(response["Content-Type"], "text/javascript; charset=utf-8")
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        script = response.content.decode()
+        self.assertIn('importScripts("/static/pwa/sw.js?v=release-42")', script)
+        config = self.worker_config(script)
+        self.assertEqual(config["version"], "release-42")
+        availability = [re.compile(source) for source in config["availability"]]
+        self.assertTrue(any(pattern.match("/api/v1/disponibilidad/") for pattern in availability))
+        self.assertFalse(any(pattern.match("/reservas/") for pattern in availability))
+        pages = [re.compile(source) for source in config["pages"]]
+        for path in ("/", "/sucursales/norte/"):
+            self.assertTrue(any(pattern.match(path) for pattern in pages), path)
+        self.assertFalse(any(pattern.match("/gestion/") for pattern in pages))
+        self.assertEqual(config["logout"], "/accounts/logout/")
+        self.assertNotIn("networkTimeout", config)
+
+    def test_pages_of_a_logged_in_user_are_never_stored(self):
+        self.assertNotIn("no-store", self.client.get(reverse("core:home")).get("Cache-Control", ""))
+        self.client.force_login(User.objects.create_user(username="clienta", password="secret123"))
+        for name in ("core:home", "core:appointments"):
+            self.assertIn("no-store", self.client.get(reverse(name))["Cache-Control"])
+        response = self.client.post(reverse("logout"))
+        self.assertEqual(response["Clear-Site-Data"], '"cache"')
+
+    def test_shell_covers_the_bundles_the_pages_load(self):
+        user = User.objects.create_user(username="clienta", password="secret123")
+        self.client.force_login(user)
+        pages = self.client.get(reverse("core:home")).content.decode()
+        pages += self.client.get(reverse("core:appointments")).content.decode()
+        self.assertIn('rel="manifest" href="/manifest.webmanifest"', pages)
+        shell = self.worker_config(self.client.get("/sw.js").content.decode())["shell"]
+        for url in re.findall(r'(?:href|src)="(https://cdn\.jsdelivr\.net/[^"]+)"', pages):
+            self.assertIn(url, shell)
+        for url in shell:
+            if url.startswith("/static/"):
+                self.assertIsNotNone(finders.find(url.removeprefix("/static/")), url)
+
+    def test_manifest_points_at_the_booking_app(self):
+        response = self.client.get(reverse("core:web_manifest"))
+        self.assertEqual(response["Content-Type"], "application/manifest+json")
+        manifest = response.json()
+        self.assertEqual(manifest["start_url"], "/")
+        self.assertEqual(manifest["display"], "standalone")
+        self.assertEqual({icon["sizes"] for icon in manifest["icons"]}, {"192x192", "512x512"})
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
-from django.urls import path
+from django.urls import include, path
 
-from . import views
+from . import api, views
 
 app_name = "core"
 
+# Pages that belong to one branch. The default branch serves them unprefixed below;
+# the others under /sucursales/<slug>/ (reversed as "core:branch:<name>").
+branch_urlpatterns = [
+    path("", views.home, name="home"),
+    path("reservas/", views.appointment_view, name="appointments"),
+    path("gestion/", views.admin_dashboard, name="dashboard"),
+    path("gestion/eventos/", views.dashboard_events, name="dashboard_events"),
+]
+
 urlpatterns = [
     path("", views.home, name="home"),
     path("reservas/", views.appointment_view, name="appointments"),
@@ -16,4 +25,18 @@ urlpatterns = [
         views.verify_deposit,
         name="verify_deposit",
     ),
+    path("gestion/eventos/", views.dashboard_events, name="dashboard_events"),
+    path("gestion/conciliar-pagos/", views.reconcile_payments, name="reconcile_payments"),
+    path("calendario/<str:key>.ics", views.calendar_feed, name="calendar_feed"),
+    path("healthz/live/", views.health_live, name="health_live"),
+    path("healthz/ready/", views.health_ready, name="health_ready"),
+    path("metrics/", views.metrics_view, name="metrics"),
+    path("sw.js", views.service_worker, name="service_worker"),
+    path("manifest.webmanifest", views.web_manifest, name="web_manifest"),
+    path("api/v1/servicios/", api.services, name="api_services"),
+    path("api/v1/disponibilidad/", api.availability, name="api_availability"),
+    path("api/v1/turnos/", api.appointments, name="api_appointments"),
+    path("api/v1/turnos/<int:appointment_id>/cancelar/", api.cancel_appointment, name="api_cancel_appointment"),
+    path("api/v1/cambios/", api.change_feed, name="api_changes"),
+    path("sucursales/<slug:branch>/", include((branch_urlpatterns, "branch"))),
 ]
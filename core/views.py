@@ -1,28 +1,46 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import json
+import time
 from datetime import date, datetime, timedelta
-from decimal import Decimal, ROUND_HALF_UP
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db import IntegrityError
-from django.db.models import Avg, Count
-from django.http import HttpRequest, HttpResponse
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.urls import reverse
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from django.views.static import serve
 from django.utils import timezone
 
-from .forms import AppointmentForm, ContactForm, RegistrationForm, ReviewForm
-from .models import Appointment, ContactMessage, GalleryImage, Review, Service, TimeSlot
+from . import branches, changes, events, markers, metrics, pwa, warmup
+from .availability import Availability, SlotUnavailable, reserve
+from .branches import branch_view
+from .dedup import save_or_merge
+from .forms import AppointmentForm, ContactForm, ReconciliationUploadForm, RegistrationForm, ReviewForm
+from .ical import stream_feed
+from .models import Appointment, Branch, CalendarToken, ContactMessage, GalleryImage, ReconciliationItem, Review, Service
+from .pricing import get_catalog
+from .ratelimit import ratelimit
+from .reconciliation import reconcile
+from .schedule import get_schedule, slots_for
+from .storage import digest_from_name
+from .warmup import state as warmup_state
 
 
-def home(request: HttpRequest) -> HttpResponse:
-    services = Service.objects.filter(is_active=True)
-    gallery_items = GalleryImage.objects.all()[:8]
+@branch_view
+@ratelimit("core:home")
+def home(request: HttpRequest, branch: Branch) -> HttpResponse:
+    services = get_catalog(branch.pk).services
+    gallery_items = GalleryImage.objects.filter(Q(branch=branch) | Q(branch__isnull=True))[:8]
     visible_reviews_qs = Review.objects.filter(is_visible=True)
     visible_reviews = visible_reviews_qs.select_related("user")[:10]
     avg_rating = visible_reviews_qs.aggregate(promedio=Avg("rating"))
@@ -34,9 +52,11 @@ def home(request: HttpRequest) -> HttpResponse:
         if form_type == "contact":
             contact_form = ContactForm(request.POST)
             if contact_form.is_valid():
-                contact_form.save()
+                message = contact_form.save(commit=False)
+                message.branch = branch
+                save_or_merge(message)
                 messages.success(request, "Gracias por tu mensaje. Te responderemos a la brevedad.")
-                return redirect(f"{reverse('core:home')}#contacto")
+                return redirect(f"{branches.url('home', branch)}#contacto")
             messages.error(request, "Por favor revisá los datos del formulario de contacto.")
         elif form_type == "review":
             if not request.user.is_authenticated:
@@ -46,9 +66,9 @@ def home(request: HttpRequest) -> HttpResponse:
             if review_form.is_valid():
                 review = review_form.save(commit=False)
                 review.user = request.user
-                review.save()
+                save_or_merge(review, user=request.user)
                 messages.success(request, "Gracias por compartir tu experiencia.")
-                return redirect(f"{reverse('core:home')}#valoraciones")
+                return redirect(f"{branches.url('home', branch)}#valoraciones")
             messages.error(request, "No pudimos registrar tu valoración. Revisá los datos ingresados.")
 
     context = {
@@ -62,8 +82,10 @@ def home(request: HttpRequest) -> HttpResponse:
     return render(request, "core/home.html", context)
 
 
+@branch_view
 @login_required
-def appointment_view(request: HttpRequest) -> HttpResponse:
+@ratelimit("core:appointments")
+def appointment_view(request: HttpRequest, branch: Branch) -> HttpResponse:
     today = date.today()
     selected_date_str = request.GET.get("date") or today.isoformat()
     try:
@@ -82,53 +104,44 @@ def appointment_view(request: HttpRequest) -> HttpResponse:
         if selected_date < today:
             selected_date = today
 
-    taken_slots = set(
-        Appointment.objects.filter(appointment_date=selected_date).values_list("appointment_time", flat=True)
-    )
-    all_slots = [choice for choice, _ in TimeSlot.choices]
-    available_slots = [slot for slot in all_slots if slot not in taken_slots]
+    availability = Availability(selected_date, branch_id=branch.pk)
+    all_slots = slots_for(selected_date, branch.pk)
+    available_slots = availability.available_slots(selected_date)
+    taken_slots = set(all_slots) - set(available_slots)
 
     if request.method == "POST":
-        form = AppointmentForm(request.POST, time_choices=available_slots)
+        form = AppointmentForm(request.POST, time_choices=available_slots, branch=branch)
         if form.is_valid():
             appointment = form.save(commit=False)
             appointment.user = request.user
-            if appointment.appointment_time in taken_slots:
-                messages.error(request, "Ese horario ya fue reservado. Elegí otro horario disponible.")
+            try:
+                reserve(appointment, availability)
+            except SlotUnavailable as exc:
+                messages.error(request, str(exc))
             else:
-                try:
-                    appointment.deposit_status = Appointment.DepositStatus.PENDING
-                    appointment.save()
-                except IntegrityError:
-                    messages.error(request, "Otro turno se confirmó en ese horario. Elegí una nueva opción disponible.")
-                else:
-                    messages.success(
-                        request,
-                        "Tu turno fue reservado. Verificaremos la seña del 50% y te confirmaremos a la brevedad.",
-                    )
-                    return redirect("core:appointments")
+                deadline = ""
+                if appointment.payment_deadline:
+                    deadline = f" Si no la recibimos antes del {timezone.localtime(appointment.payment_deadline):%d/%m a las %H:%M}, el horario se libera."
+                messages.success(
+                    request,
+                    f"Tu turno fue reservado. Verificaremos la seña de $ {appointment.deposit_amount:.2f} "
+                    f"y te confirmaremos a la brevedad.{deadline}",
+                )
+                return redirect(branches.url("appointments", branch))
     else:
         initial_data = {
             "appointment_date": selected_date,
         }
-        form = AppointmentForm(initial=initial_data, time_choices=available_slots)
+        form = AppointmentForm(initial=initial_data, time_choices=available_slots, branch=branch)
 
+    # A client's own bookings are few, so they are listed across every branch.
     upcoming_appointments = (
         request.user.appointments.filter(appointment_date__gte=today)
+        .select_related("service", "branch")
         .order_by("appointment_date", "appointment_time")
     )
 
-    services_data = {
-        service.pk: {
-            "name": service.name,
-            "price": format(service.price, ".2f"),
-            "deposit": format(
-                (service.price * Decimal("0.50")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
-                ".2f",
-            ),
-        }
-        for service in Service.objects.filter(is_active=True)
-    }
+    catalog = get_catalog(branch.pk)
 
     context = {
         "form": form,
@@ -136,14 +149,17 @@ def appointment_view(request: HttpRequest) -> HttpResponse:
         "taken_slots": sorted(taken_slots),
         "available_slots": available_slots,
         "all_slots": all_slots,
+        "schedule_note": get_schedule(branch.pk).note_for(selected_date),
         "upcoming_appointments": upcoming_appointments,
         "today": today,
-        "deposit_percentage": 50,
-        "services_payment_data": services_data,
+        "deposit_percentage": catalog.uniform_percentage(),
+        "services_payment_data": catalog.as_json(selected_date),
+        "calendar_feed_key": CalendarToken.for_user(request.user).key,
     }
     return render(request, "core/appointment.html", context)
 
 
+@ratelimit("core:register")
 def register(request: HttpRequest) -> HttpResponse:
     if request.user.is_authenticated:
         return redirect("core:home")
@@ -162,47 +178,41 @@ def register(request: HttpRequest) -> HttpResponse:
     return render(request, "registration/register.html", {"form": form})
 
 
+@branch_view
 @staff_member_required
-def admin_dashboard(request: HttpRequest) -> HttpResponse:
+def admin_dashboard(request: HttpRequest, branch: Branch) -> HttpResponse:
     today = date.today()
     week_end = today + timedelta(days=7)
+    # Read before querying so the live stream resumes without missing changes.
+    events_sequence = events.current_sequence()
 
+    # Every branch query below leads with the branch, matching the (branch, ...) indexes.
+    appointments = Appointment.objects.filter(branch=branch)
     appointments_today = (
-        Appointment.objects.filter(appointment_date=today)
-        .select_related("user", "service")
+        appointments.filter(appointment_date=today)
+        .select_related("user", "service", "resource")
         .order_by("appointment_time")
     )
     upcoming_week = (
-        Appointment.objects.filter(appointment_date__gt=today, appointment_date__lte=week_end)
+        appointments.filter(appointment_date__gt=today, appointment_date__lte=week_end)
         .select_related("user", "service")
         .order_by("appointment_date", "appointment_time")
     )
-    pending_messages_qs = ContactMessage.objects.filter(is_resolved=False)
-    pending_messages = pending_messages_qs.order_by("-created_at")[:5]
+    pending_messages = ContactMessage.objects.filter(branch=branch, is_resolved=False).order_by("-created_at")[:5]
     recent_reviews = Review.objects.select_related("user").order_by("-created_at")[:5]
     service_summary = (
-        Service.objects.annotate(total_appointments=Count("appointments"))
+        Service.objects.filter(branch=branch)
+        .annotate(total_appointments=Count("appointments"))
         .order_by("-total_appointments", "name")[:5]
     )
 
-    average_rating = Review.objects.filter(is_visible=True).aggregate(promedio=Avg("rating"))["promedio"]
-
     pending_deposits = (
-        Appointment.objects.filter(deposit_status=Appointment.DepositStatus.PENDING)
+        appointments.filter(deposit_status=Appointment.DepositStatus.PENDING)
+        .exclude(status=Appointment.STATUS_CANCELLED)
         .select_related("user", "service")
         .order_by("appointment_date", "appointment_time")
     )
 
-    stats = {
-        "appointments_today": appointments_today.count(),
-        "appointments_week": upcoming_week.count(),
-        "services_active": Service.objects.filter(is_active=True).count(),
-        "pending_messages": pending_messages_qs.count(),
-        "average_rating": average_rating,
-        "total_clients": User.objects.filter(is_staff=False).count(),
-        "pending_deposits": pending_deposits.count(),
-    }
-
     context = {
         "today": today,
         "week_end": week_end,
@@ -211,37 +221,264 @@ def admin_dashboard(request: HttpRequest) -> HttpResponse:
         "pending_messages": pending_messages,
         "recent_reviews": recent_reviews,
         "service_summary": service_summary,
-        "stats": stats,
+        "stats": events.compute_stats(branch.pk),
+        "events_sequence": events_sequence,
         "pending_deposits": pending_deposits,
+        "calendar_feed_key": CalendarToken.for_user(request.user).key,
+        "reconciliation_form": ReconciliationUploadForm(),
+        "review_items": (
+            ReconciliationItem.objects.filter(is_resolved=False)
+            .select_related("run")
+            .prefetch_related("candidates__user")
+            .order_by("-run__created_at", "line_number")[:10]
+        ),
     }
     return render(request, "core/dashboard.html", context)
 
 
+def _event_stream(last: int, branch_id: int):
+    keepalive = getattr(settings, "LIVE_EVENTS_KEEPALIVE_SECONDS", 15)
+    deadline = time.monotonic() + getattr(settings, "LIVE_EVENTS_STREAM_SECONDS", 55)
+    yield "retry: 3000\n\n"
+    while time.monotonic() < deadline:
+        batch = events.wait_since(last, timeout=min(keepalive, max(deadline - time.monotonic(), 0)))
+        if not batch:
+            yield ": ping\n\n"
+            continue
+        if batch[0]["id"] != last + 1:
+            # Events expired from the cache while we were away: the page has to reload.
+            yield f"id: {batch[-1]['id']}\nevent: reload\ndata: {{}}\n\n"
+            last = batch[-1]["id"]
+            continue
+        last = batch[-1]["id"]
+        batch = [event for event in batch if events.visible_to(event, branch_id)]
+        if not batch:
+            # An id without data moves Last-Event-ID past other branches' events without dispatching anything.
+            yield f"id: {last}\n\n"
+            continue
+        for event in batch:
+            data = {**event, "item": events.item_for(event)} if "pk" in event else event
+            if event is batch[-1]:
+                data = {**data, "stats": events.stats_for(last, branch_id)}
+            yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@branch_view
+@staff_member_required
+@require_http_methods(["GET"])
+def dashboard_events(request: HttpRequest, branch: Branch) -> StreamingHttpResponse:
+    """Server-Sent Events feeding the dashboard; the browser reconnects when the stream ends."""
+    try:
+        last = int(request.headers.get("Last-Event-ID") or request.GET["desde"])
+    except (KeyError, ValueError):
+        last = events.current_sequence()
+    response = StreamingHttpResponse(_event_stream(last, branch.pk), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def logout_view(request: HttpRequest) -> HttpResponse:
     """End the authenticated session and send the user back home."""
     logout(request)
     messages.success(request, "Cerraste sesión correctamente.")
-    return redirect("core:home")
+    response = redirect("core:home")
+    # Drops pages the browser kept for this user; the service worker clears its own copies too.
+    response["Clear-Site-Data"] = '"cache"'
+    return response
 
 
 @staff_member_required
 @require_http_methods(["POST"])
 def verify_deposit(request: HttpRequest, appointment_id: int) -> HttpResponse:
-    appointment = get_object_or_404(Appointment.objects.select_related("service", "user"), pk=appointment_id)
-    appointment.deposit_status = Appointment.DepositStatus.VERIFIED
-    appointment.status = Appointment.STATUS_CONFIRMED
-    appointment.deposit_verified_by = request.user
-    appointment.deposit_verified_at = timezone.now()
-    appointment.save(update_fields=[
-        "deposit_status",
-        "status",
-        "deposit_verified_by",
-        "deposit_verified_at",
-    ])
+    appointment = get_object_or_404(Appointment.objects.select_related("user"), pk=appointment_id)
+    dashboard = branches.url("dashboard", branches.by_pk(appointment.branch_id))
+    with transaction.atomic():
+        # Re-check the state in the UPDATE itself, like core.expiry and core.reconciliation:
+        # SQLite has no row locks, so the sweeper may cancel the booking after the read above.
+        verified = (
+            Appointment.objects.filter(pk=appointment.pk, deposit_status=Appointment.DepositStatus.PENDING)
+            .exclude(status=Appointment.STATUS_CANCELLED)
+            .update(
+                deposit_status=Appointment.DepositStatus.VERIFIED,
+                status=Appointment.STATUS_CONFIRMED,
+                deposit_verified_by=request.user,
+                deposit_verified_at=timezone.now(),
+            )
+        )
+        if verified:
+            # Bulk updates skip signals, so move the change markers and publish by hand.
+            markers.touch(
+                "bookings", markers.scoped("bookings", appointment.branch_id), f"bookings:user:{appointment.user_id}"
+            )
+            changes.record(appointment)
+            events.publish_on_commit("appointment", "updated", branch=appointment.branch_id, pk=appointment.pk)
+    if not verified:
+        appointment.refresh_from_db(fields=["status", "deposit_status"])
+        if appointment.deposit_status == Appointment.DepositStatus.EXPIRED:
+            messages.error(
+                request,
+                "La seña de este turno venció y el horario ya fue liberado. Si la clienta pagó, creá un turno nuevo.",
+            )
+        elif appointment.status == Appointment.STATUS_CANCELLED:
+            # Its slot may already belong to another booking; confirming it would double-book.
+            messages.error(
+                request,
+                "Este turno fue cancelado y el horario ya fue liberado. Si la clienta pagó, creá un turno nuevo.",
+            )
+        else:
+            messages.info(request, "La seña de este turno ya no está pendiente de verificación.")
+        return redirect(dashboard)
+    metrics.inc("deposits_verified_total", source="dashboard")
     messages.success(
         request,
         f"Se verificó la seña del turno de {appointment.user.get_full_name() or appointment.user.username}.",
     )
-    return redirect("core:dashboard")
+    return redirect(dashboard)
+
+
+@require_http_methods(["GET", "HEAD"])
+def health_live(request: HttpRequest) -> JsonResponse:
+    """Liveness probe: the process is up and serving requests."""
+    return JsonResponse({"status": "alive"})
+
+
+@require_http_methods(["GET", "HEAD"])
+def health_ready(request: HttpRequest) -> JsonResponse:
+    """Readiness probe: 200 only once the warm-up stage has finished."""
+    # Workers forked from a preloaded master did not inherit its warm-up thread.
+    warmup.ensure_started()
+    payload = {
+        "status": "ready" if warmup_state["ready"] else "warming",
+        "duration": warmup_state["duration"],
+        "steps": warmup_state["steps"],
+    }
+    if warmup_state["error"]:
+        payload["error"] = warmup_state["error"]
+    return JsonResponse(payload, status=200 if warmup_state["ready"] else 503)
+
+
+@require_http_methods(["GET", "HEAD"])
+def service_worker(request: HttpRequest) -> HttpResponse:
+    """Root-scoped service worker entry point; the logic lives in ``static/pwa/sw.js``."""
+    response = HttpResponse(pwa.worker_script(), content_type="text/javascript; charset=utf-8")
+    # Browsers revalidate the worker on every navigation; a deploy must be seen right away.
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@require_http_methods(["GET", "HEAD"])
+def web_manifest(request: HttpRequest) -> JsonResponse:
+    return JsonResponse(
+        pwa.manifest(), content_type="application/manifest+json", json_dumps_params={"ensure_ascii": False}
+    )
+
+
+def _slot_occupancy() -> float:
+    """Booked share of the next 7 days, recomputed only after bookings or hours change."""
+    today = date.today()
+    stamps = markers.get_many("bookings", "schedule", "resources", "branches")
+    key = "metrics:occupancy:" + hashlib.sha1(repr((today, sorted(stamps.items()))).encode()).hexdigest()
+    ratio = cache.get(key)
+    if ratio is None:
+        booked = capacity = 0
+        for branch in branches.active():
+            availability = Availability(today, today + timedelta(days=6), branch_id=branch.pk)
+            for day in availability.days():
+                day_booked, day_capacity = availability.occupancy(day)
+                booked += day_booked
+                capacity += day_capacity
+        ratio = booked / capacity if capacity else 0
+        cache.set(key, ratio, timeout=24 * 3600)
+    return ratio
+
+
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape endpoint: ``Authorization: Bearer <METRICS_TOKEN>``, or a staff session."""
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorized = token and request.META.get("HTTP_AUTHORIZATION", "") == f"Bearer {token}"
+    if not authorized and not request.user.is_staff:
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+
+    samples = metrics.collect()
+    samples[("deposits_pending", ())] = Appointment.objects.filter(
+        deposit_status=Appointment.DepositStatus.PENDING,
+    ).exclude(status=Appointment.STATUS_CANCELLED).count()
+    samples[("slot_occupancy_ratio", ())] = _slot_occupancy()
+    return HttpResponse(metrics.render(samples), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@staff_member_required
+@require_http_methods(["POST"])
+def reconcile_payments(request: HttpRequest) -> HttpResponse:
+    # Statements cover every branch; only the way back depends on where the upload came from.
+    dashboard = branches.url("dashboard", branches.get(request.POST.get("sucursal")))
+    form = ReconciliationUploadForm(request.POST, request.FILES)
+    if not form.is_valid():
+        messages.error(request, "Elegí el origen y un archivo CSV para conciliar.")
+        return redirect(dashboard)
+    upload = form.cleaned_data["statement"]
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        run = reconcile(stream, form.cleaned_data["source"], user=request.user, filename=upload.name)
+    except (UnicodeDecodeError, ValueError) as exc:
+        messages.error(request, f"No pudimos leer el extracto: {exc}")
+        return redirect(dashboard)
+    messages.success(
+        request,
+        f"Conciliación lista: {run.matched} señas verificadas, {run.ambiguous} líneas para revisar "
+        f"y {run.unmatched} sin coincidencia ({run.total_lines} líneas).",
+    )
+    return redirect(dashboard)
+
+
+def _feed_owner(request: HttpRequest, key: str):
+    if not hasattr(request, "feed_owner"):
+        token = CalendarToken.objects.select_related("user").filter(key=key, user__is_active=True).first()
+        request.feed_owner = token.user if token else None
+    return request.feed_owner
+
+
+def _feed_markers(user) -> tuple[str, ...]:
+    return ("bookings" if user.is_staff else f"bookings:user:{user.pk}", "catalog")
+
+
+def _feed_etag(request: HttpRequest, key: str) -> str | None:
+    user = _feed_owner(request, key)
+    if user is None:
+        return None
+    stamps = markers.get_many(*_feed_markers(user))
+    # The feed window moves every day, so the date is part of the validator.
+    return hashlib.sha1(repr((key, user.is_staff, date.today(), sorted(stamps.items()))).encode()).hexdigest()
+
+
+def _feed_last_modified(request: HttpRequest, key: str) -> datetime | None:
+    user = _feed_owner(request, key)
+    if user is None:
+        return None
+    changed = markers.as_datetime(max(markers.get_many(*_feed_markers(user)).values()))
+    midnight = timezone.make_aware(datetime.combine(date.today(), datetime.min.time()))
+    return max(changed, midnight)
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def calendar_feed(request: HttpRequest, key: str) -> StreamingHttpResponse:
+    """iCalendar subscription: all upcoming bookings for staff, own bookings for clients."""
+    user = _feed_owner(request, key)
+    if user is None:
+        raise Http404("Calendario inexistente.")
+    response = StreamingHttpResponse(stream_feed(user), content_type="text/calendar; charset=utf-8")
+    response["Content-Disposition"] = 'inline; filename="turnos.ics"'
+    response["Cache-Control"] = "private, max-age=300"
+    return response
+
+
+def gallery_media(request: HttpRequest, path: str) -> HttpResponse:
+    """Serve gallery files in development; content-addressed ones are cached forever."""
+    response = serve(request, f"gallery/{path}", document_root=settings.MEDIA_ROOT)
+    if digest_from_name(path):
+        response["Cache-Control"] = f"public, max-age={settings.MEDIA_IMMUTABLE_MAX_AGE}, immutable"
+    return response
@@ -0,0 +1,159 @@
+"""Worker warm-up: pay template, URL and cache start-up costs before serving.
+
+``start_in_background`` is called from ``wsgi.py``/``asgi.py`` so the worker
+accepts liveness probes right away, while the readiness probe keeps the load
+balancer away until ``warm_up`` has finished. Only process-wide state is worth
+warming from that thread: database connections are per thread, so request
+threads open their own.
+
+Threads do not survive ``fork``: under ``gunicorn --preload`` the module is
+imported in the master, so a worker forked before the master's warm-up finished
+starts its own from the readiness probe (``ensure_started``).
+
+Every step is an optimisation, so a failing one is logged and skipped instead of
+keeping the worker out of rotation.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import NoReverseMatch, URLPattern, URLResolver, get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_start_lock = threading.Lock()
+_started_in: int | None = None  # pid of the process whose warm-up thread is running
+state = {"ready": False, "running": False, "duration": None, "steps": {}, "error": ""}
+
+
+def compile_templates() -> int:
+    count = 0
+    for engine in engines.all():
+        for directory in engine.dirs:
+            root = Path(directory)
+            for path in root.rglob("*.html"):
+                engine.get_template(path.relative_to(root).as_posix())
+                count += 1
+    return count
+
+
+def _url_names(patterns, namespace: str = ""):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            prefix = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            yield from _url_names(pattern.url_patterns, prefix)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            yield f"{namespace}{pattern.name}"
+
+
+def resolve_routes() -> int:
+    count = 0
+    for name in _url_names(get_resolver().url_patterns):
+        try:
+            reverse(name)
+        except NoReverseMatch:
+            # Routes with arguments are populated too; they just cannot be reversed blind.
+            pass
+        count += 1
+    return count
+
+
+def prime_caches() -> int:
+    """Fill the process-wide branch, schedule and catalog caches."""
+
+    from .branches import active
+    from .pricing import get_catalog
+    from .schedule import get_schedule
+
+    primed = 0
+    for branch in active():
+        get_schedule(branch.pk)
+        get_catalog(branch.pk)
+        primed += 2
+    return primed
+
+
+def digest_static() -> int:
+    from .pwa import static_digest
+
+    return static_digest()[1]
+
+
+STEPS = (
+    ("templates", compile_templates),
+    ("routes", resolve_routes),
+    ("caches", prime_caches),
+    ("static", digest_static),
+)
+
+
+def warm_up() -> dict:
+    """Run every warm-up step once and mark the process as ready."""
+
+    with _lock:
+        if state["ready"]:
+            return state
+        state["running"] = True
+        started = time.perf_counter()
+        errors = []
+        try:
+            for name, step in STEPS:
+                step_started = time.perf_counter()
+                try:
+                    count = step()
+                except Exception as exc:  # a cold cache is slower, not broken
+                    logger.exception("Warm-up step %s failed", name)
+                    errors.append(f"{name}: {exc}")
+                    count = 0
+                state["steps"][name] = {"items": count, "seconds": round(time.perf_counter() - step_started, 4)}
+        finally:
+            state["error"] = "; ".join(errors)
+            state["ready"] = True
+            state["running"] = False
+            state["duration"] = round(time.perf_counter() - started, 4)
+            # Queries ran on this thread's own connection; request threads open theirs.
+            if threading.current_thread() is not threading.main_thread():
+                connections.close_all()
+        return state
+
+
+def ensure_started() -> None:
+    """Start this process's warm-up thread unless it has finished or already runs here."""
+
+    global _started_in
+    if state["ready"] or _started_in == os.getpid() or not getattr(settings, "WARMUP_ON_BOOT", True):
+        return
+    with _start_lock:
+        if state["ready"] or _started_in == os.getpid():
+            return
+        _started_in = os.getpid()
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+
+def start_in_background() -> None:
+    if not getattr(settings, "WARMUP_ON_BOOT", True):
+        state["ready"] = True
+        return
+    ensure_started()
+
+
+def _after_fork() -> None:
+    """A forked worker keeps a finished warm-up (its caches came along) but not a running one."""
+
+    global _lock, _start_lock
+    # The parent's warm-up thread may have held these at fork time; it does not exist here.
+    _lock, _start_lock = threading.Lock(), threading.Lock()
+    if not state["ready"]:
+        state.update(running=False, steps={}, error="", duration=None)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
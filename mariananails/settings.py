@@ -24,11 +24,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.pwa.PrivatePagesMiddleware",
+    "core.ratelimit.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -61,6 +64,13 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "mariananails",
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -107,9 +117,93 @@ MESSAGE_TAGS = {
     message_constants.ERROR: "danger",
 }
 
+# Flash messages ride in a signed cookie and only fall back to an existing
+# session. Sessions are read from the cache (written through to the database)
+# only when the default cache is shared: with a per-process cache, a logout on
+# one worker would leave the other workers serving their cached copy.
+SESSION_ENGINE = "django.contrib.sessions.backends.db"
+if CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+):
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+MESSAGE_STORAGE = "core.sessions.MessageStorage"
+
 COMPANY_NAME = "Mariana Nails"
 COMPANY_EMAIL = "contacto@mariananails.com"
 COMPANY_PHONE = "+54 9 11 1234 5678"
 COMPANY_ADDRESS = "Av. Siempre Viva 123, CABA"
 WHATSAPP_NUMBER = "5491112345678"
 WHATSAPP_URL = f"https://wa.me/{WHATSAPP_NUMBER}"
+
+# Token bucket limits per URL name, expressed as "<tokens>/<s|m|h|d>".
+RATELIMIT_ENABLED = True
+RATELIMIT_CACHE = "default"
+RATELIMIT_METHODS = ("POST",)
+RATELIMIT_IP_HEADER = "REMOTE_ADDR"
+# Behind a proxy set RATELIMIT_IP_HEADER = "HTTP_X_FORWARDED_FOR" and this to the
+# number of proxies in front of Django; the client's own entries are ignored.
+RATELIMIT_TRUSTED_PROXIES = 1
+RATELIMITS = {
+    "core:home": "5/m",
+    "core:register": "3/h",
+    "core:appointments": "10/h",
+    "login": "10/m",
+    "core:api_appointments": "20/h",
+}
+
+# Identical contact messages and reviews within this window are merged.
+SUBMISSION_DEDUP_WINDOW_MINUTES = 60
+
+# Run core.warmup in a background thread when a WSGI/ASGI worker boots; the
+# readiness probe answers 503 until it finishes.
+WARMUP_ON_BOOT = True
+
+# Metrics: per-process samples are dumped to METRICS_DIR (one file per worker,
+# folded into retired.json once the worker exits) so the scrape endpoint can
+# sum them. Leave empty for single-process setups.
+METRICS_DIR = ""
+METRICS_FLUSH_SECONDS = 1.0
+# /metrics/ answers "Authorization: Bearer <METRICS_TOKEN>" or a logged-in staff user.
+METRICS_TOKEN = ""
+
+# Maximum difference between a statement amount and the expected deposit.
+RECONCILIATION_AMOUNT_TOLERANCE = "1.00"
+
+# Live dashboard (Server-Sent Events). Events are kept in the default cache,
+# which must be shared (Redis/Memcached) when running several workers. Every
+# open dashboard holds a server thread for LIVE_EVENTS_STREAM_SECONDS and then
+# reconnects, so serve the site with threads (gunicorn gthread) or ASGI.
+LIVE_EVENTS_TTL = 600
+LIVE_EVENTS_POLL_SECONDS = 1.0
+LIVE_EVENTS_KEEPALIVE_SECONDS = 15
+LIVE_EVENTS_STREAM_SECONDS = 55
+
+# Gallery files are stored under their SHA-256, so their URLs never change
+# content. Serve MEDIA_URL + "gallery/" with this max-age and "immutable".
+MEDIA_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Appointment reminders (manage.py send_reminders). The channel is any class
+# with a ``name`` and a ``send(reminders)`` method; email is the default.
+REMINDER_CHANNEL = "core.reminders.EmailChannel"
+REMINDER_BATCH_SIZE = 100
+# Failed sends are retried on later runs up to this many attempts in total; a
+# send still unconfirmed after the claim timeout (worker died) counts as failed.
+REMINDER_MAX_ATTEMPTS = 3
+REMINDER_CLAIM_TIMEOUT_MINUTES = 10
+
+# Unpaid bookings are cancelled by manage.py expire_unpaid_bookings once their
+# payment deadline (this many hours after booking, capped at the appointment
+# start) passes. Set to 0 to let bookings wait indefinitely.
+PAYMENT_DEADLINE_HOURS = 24
+PAYMENT_EXPIRY_NOTIFY = True
+
+# The change feed (/api/v1/cambios/) holds back entries younger than this, so
+# transactions committing out of order can never be skipped by a cursor.
+CHANGE_FEED_SETTLE_SECONDS = 5
+
+# Progressive Web App (/sw.js, /manifest.webmanifest). Cache names default to a
+# digest of the static files; set the release id here to tie them to deploys.
+PWA_CACHE_VERSION = ""
+# Seconds an offline copy of the availability API stays usable.
+PWA_AVAILABILITY_TTL = 300
@@ -6,7 +6,7 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
-from core.views import logout_view
+from core.views import gallery_media, logout_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -16,4 +16,5 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    urlpatterns.append(path(f"{settings.MEDIA_URL.lstrip('/')}gallery/<path:path>", gallery_media))
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
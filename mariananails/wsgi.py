@@ -8,3 +8,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mariananails.settings")
 
 application = get_wsgi_application()
+
+from core.warmup import start_in_background  # noqa: E402  (needs the app registry)
+
+start_in_background()
@@ -0,0 +1,159 @@
+/*
+ * Service worker. Loaded through /sw.js, which sets self.PWA (see core/pwa.py).
+ *
+ * - App shell (CDN bundles, styles, icons): precached on install, cache-first.
+ * - Gallery images and the service catalog API: stale-while-revalidate.
+ * - Availability API: network-first; offline, a cached copy is only used while
+ *   younger than availabilityTtl seconds. The home and booking pages render the
+ *   catalog and slots server-side, so these two API rules only serve API callers.
+ * - Home pages: network-first, falling back to the last copy only when the
+ *   network is unreachable. Pages are never served stale while online because
+ *   they carry flash messages and the login state.
+ * - Pages rendered for a logged-in user come with "Cache-Control: no-store" and
+ *   are never stored; logging out also drops every cached page.
+ *
+ * Cache names carry the deploy version, and activate() drops older ones.
+ */
+'use strict';
+
+const CONFIG = self.PWA;
+const PREFIX = 'mariananails-';
+const CACHE = {
+    shell: `${PREFIX}shell-${CONFIG.version}`,
+    assets: `${PREFIX}assets-${CONFIG.version}`,
+    pages: `${PREFIX}pages-${CONFIG.version}`,
+};
+const MAX_ENTRIES = {assets: 200, pages: 30};
+const CACHED_AT = 'X-SW-Cached-At';
+const ASSET_HOSTS = ['cdn.jsdelivr.net', 'fonts.googleapis.com', 'fonts.gstatic.com'];
+const STATIC_URL = new URL(CONFIG.static, self.location).href;
+const GALLERY_URL = new URL(CONFIG.gallery, self.location).href;
+const ROUTES = {
+    pages: CONFIG.pages.map((source) => new RegExp(source)),
+    catalog: CONFIG.catalog.map((source) => new RegExp(source)),
+    availability: CONFIG.availability.map((source) => new RegExp(source)),
+};
+
+self.addEventListener('install', (event) => {
+    event.waitUntil(
+        caches.open(CACHE.shell)
+            .then((cache) => cache.addAll(CONFIG.shell.map((url) => new Request(url, {mode: 'cors', credentials: 'omit'}))))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    const current = new Set(Object.values(CACHE));
+    event.waitUntil(
+        caches.keys()
+            .then((names) => Promise.all(
+                names.filter((name) => name.startsWith(PREFIX) && !current.has(name)).map((name) => caches.delete(name))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    const local = url.origin === self.location.origin;
+    if (local && url.pathname === CONFIG.logout) {
+        // Left to the network; the next visitor on this device must not see the previous one's pages.
+        event.waitUntil(caches.delete(CACHE.pages));
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+    if (local && matches(ROUTES.availability, url)) {
+        event.respondWith(networkFirst(event, CONFIG.availabilityTtl));
+    } else if (local && request.mode === 'navigate' && matches(ROUTES.pages, url)) {
+        event.respondWith(networkFirst(event, null));
+    } else if ((local && matches(ROUTES.catalog, url)) || url.href.startsWith(GALLERY_URL)) {
+        event.respondWith(staleWhileRevalidate(event));
+    } else if (url.href.startsWith(STATIC_URL) || ASSET_HOSTS.includes(url.hostname)) {
+        event.respondWith(cacheFirst(event));
+    }
+});
+
+function matches(patterns, url) {
+    return patterns.some((pattern) => pattern.test(url.pathname));
+}
+
+function cacheable(response) {
+    return response.ok
+        && (response.type === 'basic' || response.type === 'cors')
+        && !/no-store/.test(response.headers.get('Cache-Control') || '');
+}
+
+async function remember(cacheName, request, response, stamp) {
+    const cache = await caches.open(cacheName);
+    if (stamp) {
+        const headers = new Headers(response.headers);
+        headers.set(CACHED_AT, String(Date.now()));
+        response = new Response(await response.blob(), {status: response.status, statusText: response.statusText, headers});
+    }
+    await cache.put(request, response);
+    const keys = await cache.keys();
+    const limit = MAX_ENTRIES[cacheName === CACHE.pages ? 'pages' : 'assets'];
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - limit)).map((key) => cache.delete(key)));
+}
+
+async function networkFirst(event, ttl) {
+    const request = event.request;
+    let response;
+    try {
+        response = await fetch(request);
+    } catch (error) {
+        // Offline: a slow network still waits for the live page instead of getting a stale copy.
+        const cached = await caches.match(request, {cacheName: CACHE.pages});
+        if (cached && (ttl === null || Date.now() - Number(cached.headers.get(CACHED_AT)) <= ttl * 1000)) {
+            return cached;
+        }
+        return request.mode === 'navigate' ? offline() : Response.error();
+    }
+    if (cacheable(response)) {
+        event.waitUntil(remember(CACHE.pages, request, response.clone(), true));
+    } else {
+        // Now private or redirecting elsewhere: forget the copy kept from an earlier visit.
+        event.waitUntil(caches.open(CACHE.pages).then((cache) => cache.delete(request)));
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(event) {
+    const request = event.request;
+    const cached = await caches.match(request, {cacheName: CACHE.assets, ignoreVary: true});
+    const network = fetch(request).then((response) => {
+        if (cacheable(response)) {
+            event.waitUntil(remember(CACHE.assets, request, response.clone(), false));
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        return cached;
+    }
+    return network;
+}
+
+async function cacheFirst(event) {
+    const request = event.request;
+    const cached = await caches.match(request, {ignoreVary: true});
+    if (cached) {
+        return cached;
+    }
+    const response = await fetch(request);
+    if (cacheable(response)) {
+        event.waitUntil(remember(CACHE.assets, request, response.clone(), false));
+    }
+    return response;
+}
+
+function offline() {
+    const body = '<!DOCTYPE html><html lang="es"><head><meta charset="utf-8">'
+        + '<meta name="viewport" content="width=device-width, initial-scale=1"><title>Sin conexión</title></head>'
+        + '<body style="font-family: sans-serif; padding: 2rem"><h1>Sin conexión</h1>'
+        + '<p>No pudimos cargar la página. Revisá tu conexión y volvé a intentar.</p></body></html>';
+    return new Response(body, {status: 503, headers: {'Content-Type': 'text/html; charset=utf-8'}});
+}